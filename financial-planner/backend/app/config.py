@@ -0,0 +1,113 @@
+import os
+
+# -----------------------------
+# Embeddings & Vector Stores
+# -----------------------------
+
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "sentence-transformers/all-MiniLM-L6-v2")
+MARKET_INDEX_DIR = os.getenv("MARKET_INDEX_DIR", "faiss_index")
+FUND_INDEX_DIR = os.getenv("FUND_INDEX_DIR", "rag_fund_index")
+
+# -----------------------------
+# Ollama
+# -----------------------------
+
+OLLAMA_URL = os.getenv("OLLAMA_URL", "http://localhost:11434")
+OLLAMA_MODEL = os.getenv("OLLAMA_MODEL", "llama3.2:latest")
+OLLAMA_CONNECT_TIMEOUT = float(os.getenv("OLLAMA_CONNECT_TIMEOUT", "5"))
+OLLAMA_READ_TIMEOUT = float(os.getenv("OLLAMA_READ_TIMEOUT", "60"))  # max gap between streamed chunks
+OLLAMA_MAX_CONNECTIONS = int(os.getenv("OLLAMA_MAX_CONNECTIONS", "32"))
+OLLAMA_KEEPALIVE_SECONDS = float(os.getenv("OLLAMA_KEEPALIVE_SECONDS", "30"))
+
+# -----------------------------
+# LLM Response Cache
+# -----------------------------
+
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = os.getenv("LLM_CACHE_PATH", ".cache/llm_responses.sqlite3")
+LLM_CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024"))  # in-memory LRU size
+LLM_CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "86400"))
+LLM_CACHE_MAX_ROWS = int(os.getenv("LLM_CACHE_MAX_ROWS", "20000"))  # on disk; oldest rows go first
+# Concurrent misses for the same cache key share one in-flight generation
+LLM_SINGLE_FLIGHT_ENABLED = os.getenv("LLM_SINGLE_FLIGHT_ENABLED", "1") == "1"
+
+# -----------------------------
+# LLM Scheduler
+# -----------------------------
+
+# Generations the Ollama server is allowed to run at once; the rest queue by priority
+LLM_MAX_CONCURRENT_GENERATIONS = int(os.getenv("LLM_MAX_CONCURRENT_GENERATIONS", "2"))
+# Waiting generations per priority before new ones are rejected with 429
+LLM_QUEUE_LIMITS = {
+    "interactive": int(os.getenv("LLM_QUEUE_LIMIT_INTERACTIVE", "16")),
+    "standard": int(os.getenv("LLM_QUEUE_LIMIT_STANDARD", "32")),
+    "batch": int(os.getenv("LLM_QUEUE_LIMIT_BATCH", "64")),
+}
+# Seconds a generation may wait for a slot before giving up with 503
+LLM_QUEUE_TIMEOUTS = {
+    "interactive": float(os.getenv("LLM_QUEUE_TIMEOUT_INTERACTIVE", "10")),
+    "standard": float(os.getenv("LLM_QUEUE_TIMEOUT_STANDARD", "30")),
+    "batch": float(os.getenv("LLM_QUEUE_TIMEOUT_BATCH", "300")),
+}
+
+# -----------------------------
+# Startup
+# -----------------------------
+
+WARMUP_ON_STARTUP = os.getenv("WARMUP_ON_STARTUP", "0") == "1"
+IMPORT_TIME_BUDGET_SECONDS = float(os.getenv("IMPORT_TIME_BUDGET_SECONDS", "2.0"))
+
+# -----------------------------
+# RAG Ingestion
+# -----------------------------
+
+INGEST_MODE = os.getenv("INGEST_MODE", "live")  # live | record | replay
+INGEST_FIXTURES_DIR = os.getenv("INGEST_FIXTURES_DIR", "fixtures/ingestion")
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+
+# -----------------------------
+# Headline Sentiment (FinBERT)
+# -----------------------------
+
+SENTIMENT_BATCH_SIZE = int(os.getenv("SENTIMENT_BATCH_SIZE", "32"))
+SENTIMENT_MAX_LENGTH = int(os.getenv("SENTIMENT_MAX_LENGTH", "64"))  # tokens; headlines are short
+SENTIMENT_QUANTIZE = os.getenv("SENTIMENT_QUANTIZE", "0") == "1"  # dynamic int8 on CPU
+SENTIMENT_THREADS = int(os.getenv("SENTIMENT_THREADS", "0"))  # 0 = torch default
+
+# -----------------------------
+# Embedding Cache
+# -----------------------------
+
+EMBEDDING_CACHE_ENABLED = os.getenv("EMBEDDING_CACHE_ENABLED", "1") == "1"
+EMBEDDING_CACHE_DIR = os.getenv("EMBEDDING_CACHE_DIR", ".cache/embeddings")
+
+# -----------------------------
+# Retrieval Caches
+# -----------------------------
+
+QUERY_EMBEDDING_CACHE_SIZE = int(os.getenv("QUERY_EMBEDDING_CACHE_SIZE", "2048"))
+RETRIEVAL_CACHE_SIZE = int(os.getenv("RETRIEVAL_CACHE_SIZE", "4096"))
+
+# Hybrid (BM25 + vector) retrieval: chunks sent to the chat prompt, and how
+# many candidates each ranking contributes per returned chunk before fusion
+CHAT_RAG_K = int(os.getenv("CHAT_RAG_K", "3"))
+HYBRID_CANDIDATES_PER_RESULT = int(os.getenv("HYBRID_CANDIDATES_PER_RESULT", "4"))
+
+# -----------------------------
+# Monte Carlo Goal Simulation
+# -----------------------------
+
+MONTE_CARLO_ENABLED = os.getenv("MONTE_CARLO_ENABLED", "1") == "1"
+MONTE_CARLO_PATHS = int(os.getenv("MONTE_CARLO_PATHS", "10000"))
+MONTE_CARLO_CHUNK_PATHS = int(os.getenv("MONTE_CARLO_CHUNK_PATHS", "2500"))  # bounds peak memory
+MONTE_CARLO_SEED = int(os.getenv("MONTE_CARLO_SEED", "42"))  # fixed seed: same inputs, same answer
+
+# -----------------------------
+# Request Orchestration
+# -----------------------------
+
+# Per-stage deadlines (seconds) when analysis, retrieval and both generations run concurrently
+ANALYSIS_DEADLINE_SECONDS = float(os.getenv("ANALYSIS_DEADLINE_SECONDS", "5"))
+RETRIEVAL_DEADLINE_SECONDS = float(os.getenv("RETRIEVAL_DEADLINE_SECONDS", "15"))
+EXPLANATION_DEADLINE_SECONDS = float(os.getenv("EXPLANATION_DEADLINE_SECONDS", "90"))
+PORTFOLIO_DEADLINE_SECONDS = float(os.getenv("PORTFOLIO_DEADLINE_SECONDS", "120"))
@@ -0,0 +1,92 @@
+# Concurrent orchestration of a full advice request: deterministic analysis,
+# allocation explanation and portfolio picks.
+#
+#   t=0  ├─ retrieval (market context, thread) ─────────────┐
+#        └─ analysis (deterministic stages, thread) ─┐      │
+#                                                    ├─ explanation (LLM)
+#                                                    └─ portfolio (LLM, waits for retrieval)
+#
+# Retrieval does not depend on the user, and the two generations only need
+# the allocation, so latency approaches analysis + the slowest branch instead
+# of the sum of every stage. Each stage has its own deadline; a missed
+# deadline degrades that part of the response instead of failing it.
+# (A thread stage that times out keeps running in the background; only its
+# result is dropped.)
+import asyncio
+import time
+
+from app.config import (
+    ANALYSIS_DEADLINE_SECONDS,
+    EXPLANATION_DEADLINE_SECONDS,
+    PORTFOLIO_DEADLINE_SECONDS,
+    RETRIEVAL_DEADLINE_SECONDS,
+)
+from app.core.planner_service import EXPLANATION_UNAVAILABLE, PlannerService, record_stage
+from app.core.recommender_engine import generate_portfolio, retrieve_market_context
+from app.models.user import User
+
+STAGE_DEADLINES = {
+    "analysis": ANALYSIS_DEADLINE_SECONDS,
+    "retrieval": RETRIEVAL_DEADLINE_SECONDS,
+    "explanation": EXPLANATION_DEADLINE_SECONDS,
+    "portfolio": PORTFOLIO_DEADLINE_SECONDS,
+}
+
+
+async def _timed(name: str, awaitable, deadline: float, timings: dict):
+    start = time.perf_counter()
+    try:
+        return await asyncio.wait_for(awaitable, deadline)
+    finally:
+        seconds = time.perf_counter() - start
+        timings[name] = round(1000 * seconds, 1)
+        record_stage(name, seconds)
+
+
+async def analyze_and_recommend(user: User, planner: PlannerService | None = None, k: int = 5,
+                                deadlines: dict | None = None) -> dict:
+    """Analysis summary plus `allocation_explanation` and `recommendations`, computed concurrently."""
+    planner = planner or PlannerService()
+    deadlines = {**STAGE_DEADLINES, **(deadlines or {})}
+    timings = {}
+    started = time.perf_counter()
+
+    retrieval = asyncio.create_task(
+        _timed("retrieval", asyncio.to_thread(retrieve_market_context, k), deadlines["retrieval"], timings))
+    try:
+        # Without the allocation neither generation can start; this stage's failure is the request's
+        summary = await _timed("analysis", asyncio.to_thread(planner.summarize, user),
+                               deadlines["analysis"], timings)
+    except BaseException:
+        retrieval.cancel()
+        raise
+    allocation = summary['recommended_allocation']
+
+    async def explanation() -> str:
+        try:
+            return await _timed("explanation", planner._explain_allocation_with_llm(user, allocation),
+                                deadlines["explanation"], timings)
+        except asyncio.TimeoutError:
+            print("⚠️ Explanation missed its deadline")
+        except Exception as e:
+            print("LLM error:", e)
+        return EXPLANATION_UNAVAILABLE
+
+    async def portfolio():
+        try:
+            context = await retrieval
+        except Exception as e:
+            # Picks without market context beat no picks
+            print(f"⚠️ Market context unavailable ({type(e).__name__}); generating without it")
+            context = ""
+        try:
+            return await _timed("portfolio", generate_portfolio(user, allocation, context),
+                                deadlines["portfolio"], timings)
+        except asyncio.TimeoutError:
+            return {"error": "Portfolio generation missed its deadline"}
+        except Exception as e:
+            return {"error": f"Portfolio generation failed: {e}"}
+
+    summary['allocation_explanation'], recommendations = await asyncio.gather(explanation(), portfolio())
+    timings["total"] = round(1000 * (time.perf_counter() - started), 1)
+    return {**summary, "recommendations": recommendations, "timings_ms": timings}
@@ -0,0 +1,137 @@
+# Mean-variance allocation over the instruments of the fund catalog.
+# Built once per catalog load:
+#   1. expected return / volatility per scheme (longest return window,
+#      standard_deviation or the asset-class fallback) and a covariance
+#      matrix from an assumed correlation structure; each asset class holds
+#      its best-Sharpe schemes in equal weight, which gives a 3-asset
+#      return vector and covariance matrix;
+#   2. every long-only equity/bonds/commodities split on a 1% grid (5151
+#      points, the same resolution as the integer percentages we return)
+#      scored with vectorized covariance math and limited to
+#      MAX_CLASS_WEIGHT per asset class;
+#   3. the efficient frontier (non-dominated grid points) and a lookup table
+#      over (risk profile, equity cap 0..100%) holding the grid point that
+#      maximizes  return - risk_aversion / 2 * variance  under the cap.
+# The grid is exhaustive, so the table is exact and deterministic.
+# A request then reads one table row; nothing is optimized in-request.
+import numpy as np
+
+from app.core.monte_carlo import ASSET_CLASS_CORRELATION, ASSET_CLASSES, FALLBACK_VOLATILITY, RETURN_PREFERENCE
+
+# Risk profiles in RISK_CODES order (unknown profiles use "balanced")
+RISK_PROFILES = ("conservative", "balanced", "aggressive")
+RISK_CODES = {profile: code for code, profile in enumerate(RISK_PROFILES)}
+# Calibrated so uncapped equity lands near the old 30/50/70% templates
+RISK_AVERSION = {"conservative": 8.5, "balanced": 5.0, "aggressive": 3.6}
+
+# Assumed correlation between two schemes of the same asset class
+WITHIN_CLASS_CORRELATION = {"equity": 0.85, "bonds": 0.70, "commodities": 0.60}
+
+# Unconstrained mean-variance piles into gold/silver (high trailing returns,
+# low assumed correlation); a planner keeps commodities a satellite holding
+MAX_CLASS_WEIGHT = {"equity": 1.0, "bonds": 1.0, "commodities": 0.15}
+
+MAX_SCHEMES_PER_CLASS = 10  # best-Sharpe schemes per class, held in equal weight
+
+
+def _scheme_statistics(catalog) -> tuple:
+    frame = catalog.frame
+    keep = []
+    for asset_class in ASSET_CLASSES:
+        keep += catalog.screen_names(asset_class=asset_class, limit=MAX_SCHEMES_PER_CLASS)
+    frame = frame.loc[keep]
+
+    mu = frame[list(RETURN_PREFERENCE)].bfill(axis=1).iloc[:, 0].fillna(0).to_numpy() / 100
+    fallback = frame["asset_class"].map(FALLBACK_VOLATILITY).to_numpy(dtype=np.float64)
+    sigma = np.where(frame["standard_deviation"].isna(), fallback, frame["standard_deviation"] / 100)
+    class_of = frame["asset_class"].map({c: i for i, c in enumerate(ASSET_CLASSES)}).to_numpy()
+
+    correlation = ASSET_CLASS_CORRELATION[np.ix_(class_of, class_of)].copy()
+    same_class = class_of[:, None] == class_of[None, :]
+    within = np.array([WITHIN_CLASS_CORRELATION[c] for c in ASSET_CLASSES])[class_of]
+    correlation[same_class] = np.broadcast_to(within[:, None], correlation.shape)[same_class]
+    np.fill_diagonal(correlation, 1.0)
+    covariance = correlation * np.outer(sigma, sigma)
+    return mu, covariance, class_of
+
+
+def _class_statistics(catalog) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Return vector and covariance of the equal-weight scheme basket of each asset class.
+
+    Also returns which asset classes have any schemes at all.
+    """
+    mu, covariance, class_of = _scheme_statistics(catalog)
+    membership = np.eye(len(ASSET_CLASSES))[class_of]   # scheme -> asset class one-hot
+    counts = membership.sum(axis=0)
+    basket = membership / np.maximum(counts, 1)          # schemes x classes, columns sum to 1
+    return basket.T @ mu, basket.T @ covariance @ basket, counts > 0
+
+
+def _simplex_grid() -> np.ndarray:
+    """Every equity/bonds/commodities split in whole percent, (5151, 3) int."""
+    equity, commodities = np.meshgrid(np.arange(101), np.arange(101), indexing="ij")
+    inside = equity + commodities <= 100
+    equity, commodities = equity[inside], commodities[inside]
+    return np.stack([equity, 100 - equity - commodities, commodities], axis=1)
+
+
+class AllocationFrontier:
+    def __init__(self, catalog):
+        mu, covariance, available = _class_statistics(catalog)
+        max_weight = np.where(available, [MAX_CLASS_WEIGHT[c] * 100 for c in ASSET_CLASSES], 0)
+        grid = _simplex_grid()
+        grid = grid[np.all(grid <= max_weight + 1e-9, axis=1)]
+        weights = grid / 100
+
+        returns = weights @ mu
+        volatility = np.sqrt(np.einsum("ij,jk,ik->i", weights, covariance, weights))
+
+        # Efficient frontier: by increasing volatility, keep strictly better returns
+        order = np.argsort(volatility, kind="stable")
+        best_so_far = np.maximum.accumulate(returns[order])
+        efficient = order[np.r_[True, returns[order][1:] > best_so_far[:-1]]]
+        self.frontier = {
+            "volatility": volatility[efficient],
+            "expected_return": returns[efficient],
+            "allocation": grid[efficient],
+        }
+
+        # Lookup table: best utility among grid points whose equity share fits each cap
+        fits = grid[None, :, 0] <= np.arange(101)[:, None]   # caps x grid points
+        self.table = np.empty((len(RISK_PROFILES), 101, 3), dtype=np.int64)
+        for code, profile in enumerate(RISK_PROFILES):
+            utility = returns - RISK_AVERSION[profile] / 2 * volatility ** 2
+            self.table[code] = grid[np.argmax(np.where(fits, utility, -np.inf), axis=1)]
+
+    def lookup(self, risk_profile: str, equity_cap: int = 100) -> dict:
+        """Base equity/bonds/commodities split for a risk profile and maximum equity %."""
+        code = RISK_CODES.get(risk_profile.lower(), RISK_CODES["balanced"])
+        equity, bonds, commodities = self.table[code, int(np.clip(equity_cap, 0, 100))]
+        return {"equity": int(equity), "bonds": int(bonds), "commodities": int(commodities)}
+
+    def lookup_batch(self, risk_code: np.ndarray, equity_cap: np.ndarray) -> np.ndarray:
+        """Vectorized `lookup`: (n, 3) int array for arrays of risk codes and caps."""
+        return self.table[risk_code, np.clip(equity_cap, 0, 100)].copy()
+
+
+def get_allocation_frontier() -> AllocationFrontier:
+    from app.data.catalog import get_catalog
+    from app.llm.resource_registry import get_resource
+    return get_resource("allocation_frontier", lambda: AllocationFrontier(get_catalog()))
+
+
+if __name__ == "__main__":
+    import time
+
+    start = time.perf_counter()
+    frontier = get_allocation_frontier()
+    print(f"Built frontier in {time.perf_counter() - start:.2f}s "
+          f"({len(frontier.frontier['volatility'])} efficient points)")
+    for profile in RISK_PROFILES:
+        print(f"{profile:>12}: uncapped {frontier.lookup(profile)}, cap 60% {frontier.lookup(profile, 60)}")
+
+    risk_code = np.random.default_rng(0).integers(0, 3, 100000)
+    caps = np.random.default_rng(1).integers(0, 101, 100000)
+    start = time.perf_counter()
+    frontier.lookup_batch(risk_code, caps)
+    print(f"100k batch lookups in {1000 * (time.perf_counter() - start):.1f} ms")
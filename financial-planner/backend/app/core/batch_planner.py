@@ -0,0 +1,264 @@
+# Batch version of PlannerService.analyze_user for large client books.
+# Records are parsed from JSONL or CSV, grouped into chunks and the
+# deterministic analysis (surplus, emergency fund, asset allocation, goal
+# feasibility) is computed with NumPy across each chunk. LLM explanations are
+# optional and emitted afterwards as separate records.
+#
+# CLI:
+#   python -m app.core.batch_planner users.jsonl -o results.jsonl
+#   python -m app.core.batch_planner users.csv --format csv --explain
+import argparse
+import asyncio
+import csv
+import json
+import sys
+import time
+from typing import AsyncIterator, Iterable, Iterator, Sequence
+
+import numpy as np
+
+from app.core.allocation_optimizer import RISK_CODES, get_allocation_frontier
+from app.core.feasibility import feasibility_records, project_goals
+from app.core.planner_service import EXPLANATION_UNAVAILABLE, PlannerService
+from app.llm.llm_scheduler import set_llm_priority
+from app.models.user import User
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_EXPLAIN_CONCURRENCY = 4
+
+# Columns of a CSV export; insurances/loans/goals hold JSON arrays
+CSV_JSON_FIELDS = ("insurances", "loans", "goals")
+
+
+# -----------------------------
+# 1. Input Parsing
+# -----------------------------
+
+def _csv_row_to_dict(row: dict) -> dict:
+    record = dict(row)
+    for field in CSV_JSON_FIELDS:
+        value = (record.get(field) or "").strip()
+        if not value:
+            record[field] = []
+        elif value.startswith("["):
+            record[field] = json.loads(value)
+        else:
+            # insurances may also be a plain "Health;Life" list
+            record[field] = [item.strip() for item in value.split(";") if item.strip()]
+    return record
+
+
+def iter_user_records(lines: Iterable[str], fmt: str = "jsonl") -> Iterator[tuple[int, User | Exception]]:
+    """Yield (record number, User or the validation error) for every input record."""
+    if fmt == "csv":
+        rows, to_dict = csv.DictReader(lines), _csv_row_to_dict
+    elif fmt == "jsonl":
+        rows, to_dict = (line for line in lines if line.strip()), json.loads
+    else:
+        raise ValueError(f"Unsupported format: {fmt}")
+
+    for index, row in enumerate(rows):
+        try:
+            yield index, User(**to_dict(row))
+        except Exception as e:
+            yield index, e
+
+
+def chunked(items: Iterable, size: int) -> Iterator[list]:
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# -----------------------------
+# 2. Vectorized Analysis
+# -----------------------------
+
+def batch_asset_allocation(risk_code, age, income, expenses, total_emi, emergency_fund,
+                           short_term_goals, long_term_goals) -> np.ndarray:
+    """
+    Vectorized PlannerService._calculate_asset_allocation.
+    Returns an (n, 3) int array of equity/bonds/commodities percentages.
+    Rows with zero income or zero required emergency fund are undefined.
+    """
+    # Frontier base split, with the age rule as its equity cap
+    allocation = get_allocation_frontier().lookup_batch(risk_code, np.maximum(0, 110 - age))
+    equity, bonds, commodities = allocation[:, 0], allocation[:, 1], allocation[:, 2]
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # Emergency fund adjustment
+        required_emergency = 6 * (expenses + total_emi)
+        deficit_ratio = np.maximum(0, (required_emergency - emergency_fund) / required_emergency)
+        equity_cut = np.where(deficit_ratio > 0, np.nan_to_num(np.round(deficit_ratio * 20)), 0).astype(np.int64)
+        has_deficit = deficit_ratio > 0
+        equity[:] = np.where(has_deficit, np.maximum(10, equity - equity_cut), equity)
+        bonds[:] = np.where(has_deficit, np.minimum(90, bonds + equity_cut), bonds)
+
+        # Surplus adjustment
+        surplus_ratio = (income - expenses - total_emi) / income
+    low_surplus = surplus_ratio < 0.1
+    high_surplus = ~low_surplus & (surplus_ratio > 0.3)
+    equity[:] = np.where(low_surplus, np.maximum(10, equity - 10), equity)
+    bonds[:] = np.where(low_surplus, bonds + 10, bonds)
+    equity[:] = np.where(high_surplus, np.minimum(90, equity + 10), equity)
+    bonds[:] = np.where(high_surplus, np.maximum(0, bonds - 10), bonds)
+
+    # Goal horizon analysis
+    short_heavy = short_term_goals > long_term_goals
+    bonds[:] = np.where(short_heavy, np.minimum(90, bonds + 10), bonds)
+    equity[:] = np.where(short_heavy, np.maximum(10, equity - 10), equity)
+
+    # Normalize to 100%
+    commodities += 100 - allocation.sum(axis=1)
+    return allocation
+
+
+def analyze_batch(users: Sequence[User]) -> list[dict]:
+    """Deterministic `analyze_user` summaries for many users at once (no LLM explanation)."""
+    if not users:
+        return []
+
+    total_emi = np.array([sum(loan.installment for loan in u.loans) for u in users], dtype=np.float64)
+    income = np.array([u.income for u in users], dtype=np.float64)
+    expenses = np.array([u.expenses for u in users], dtype=np.float64)
+    emergency_fund = np.array([u.emergency_fund for u in users], dtype=np.float64)
+    age = np.array([u.age for u in users], dtype=np.int64)
+    risk_code = np.array([RISK_CODES.get(u.risk_profile.lower(), 1) for u in users], dtype=np.int64)
+
+    goals = [goal for u in users for goal in u.goals]
+    goal_counts = np.array([len(u.goals) for u in users], dtype=np.int64)
+    goal_months = np.array([g.months_to_achieve for g in goals], dtype=np.int64)
+    goal_owner = np.repeat(np.arange(len(users)), goal_counts)
+    short_term = np.bincount(goal_owner, weights=goal_months <= 24, minlength=len(users))
+    long_term = np.bincount(goal_owner, weights=goal_months >= 60, minlength=len(users))
+
+    surplus = income - expenses - total_emi
+    ideal_emergency = 6 * (expenses + total_emi)
+    allocation = batch_asset_allocation(risk_code, age, income, expenses, total_emi, emergency_fund,
+                                        short_term, long_term)
+    projection = project_goals(
+        goal_months,
+        [g.current_savings for g in goals],
+        [g.sip for g in goals],
+        [g.target_amount for g in goals],
+    )
+
+    summaries = []
+    offset = 0
+    for i, user in enumerate(users):
+        n_goals = int(goal_counts[i])
+        if income[i] == 0 or ideal_emergency[i] == 0:
+            summaries.append({"error": "Income and monthly expenses + EMIs must be non-zero"})
+        else:
+            summaries.append({
+                "monthly_surplus": float(surplus[i]),
+                "emergency_fund_ok": bool(emergency_fund[i] >= ideal_emergency[i]),
+                "ideal_emergency_fund": float(ideal_emergency[i]),
+                "goal_analysis": feasibility_records(user.goals, projection, offset),
+                "recommended_allocation": dict(zip(("equity", "bonds", "commodities"),
+                                                   map(int, allocation[i]))),
+            })
+        offset += n_goals
+    return summaries
+
+
+# -----------------------------
+# 3. Streaming Pipeline
+# -----------------------------
+
+async def _explain_chunk(planner: PlannerService, users: list[tuple[int, User]], summaries: list[dict],
+                         concurrency: int) -> AsyncIterator[dict]:
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def explain(index: int, user: User, summary: dict) -> dict:
+        async with semaphore:
+            try:
+                text = await planner._explain_allocation_with_llm(user, summary['recommended_allocation'])
+            except Exception as e:
+                print("LLM error:", e)
+                text = EXPLANATION_UNAVAILABLE
+        return {"index": index, "allocation_explanation": text}
+
+    tasks = [asyncio.ensure_future(explain(index, user, summary))
+             for (index, user), summary in zip(users, summaries) if "error" not in summary]
+    for task in asyncio.as_completed(tasks):
+        yield await task
+
+
+def _next_analyzed_chunk(chunks: Iterator[list]):
+    """Parse the next chunk of records and analyze its valid users; None when the input is done."""
+    chunk = next(chunks, None)
+    if chunk is None:
+        return None
+    users = [(index, item) for index, item in chunk if isinstance(item, User)]
+    return chunk, users, analyze_batch([user for _, user in users])
+
+
+async def stream_batch_analysis(lines: Iterable[str], fmt: str = "jsonl",
+                                chunk_size: int = DEFAULT_CHUNK_SIZE, explain: bool = False,
+                                explain_concurrency: int = DEFAULT_EXPLAIN_CONCURRENCY) -> AsyncIterator[dict]:
+    """
+    Yield one result per input record, chunk by chunk, as soon as each chunk is done.
+    `lines` must keep their line endings (a file opened with newline="" or
+    io.StringIO(text, newline="")) so quoted CSV fields may span lines.
+    With `explain`, explanation records ({"index", "allocation_explanation"})
+    follow the deterministic results of their chunk.
+    """
+    planner = PlannerService()
+    # One reader over the whole input: chunks are cut from parsed records, never raw lines
+    chunks = chunked(iter_user_records(lines, fmt), chunk_size)
+    while True:
+        # Parsing, validation and analysis are all CPU work; keep them off the event loop
+        parsed = await asyncio.to_thread(_next_analyzed_chunk, chunks)
+        if parsed is None:
+            break
+        chunk, users, summaries = parsed
+        by_index = {index: summary for (index, _), summary in zip(users, summaries)}
+
+        for index, item in chunk:
+            if isinstance(item, Exception):
+                yield {"index": index, "error": f"Invalid record: {item}"}
+            else:
+                yield {"index": index, "name": item.name, **by_index[index]}
+
+        if explain:
+            async for record in _explain_chunk(planner, users, summaries, explain_concurrency):
+                yield record
+
+
+# -----------------------------
+# 4. CLI Entry Point
+# -----------------------------
+
+async def _run_cli(args):
+    set_llm_priority("batch")
+    fmt = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    count = 0
+    try:
+        with open(args.input, newline="", encoding="utf-8") as f:
+            async for result in stream_batch_analysis(f, fmt, args.chunk_size, args.explain, args.concurrency):
+                out.write(json.dumps(result) + "\n")
+                count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"✅ Wrote {count} results in {time.perf_counter() - start:.2f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Analyze a batch of users from JSONL or CSV.")
+    parser.add_argument("input", help="Path to a .jsonl or .csv file of User records")
+    parser.add_argument("-o", "--output", help="Write NDJSON results here (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from extension)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--explain", action="store_true", help="Also generate LLM explanations (slow)")
+    parser.add_argument("--concurrency", type=int, default=DEFAULT_EXPLAIN_CONCURRENCY,
+                        help="Concurrent LLM explanations when --explain is set")
+    asyncio.run(_run_cli(parser.parse_args()))
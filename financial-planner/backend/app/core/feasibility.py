@@ -0,0 +1,117 @@
+# Vectorized goal feasibility engine.
+# Evaluates any number of goals (from one or many users) in a single NumPy
+# pass. Produces the same numbers as the original per-goal loop; the
+# "extend by months" search is solved in closed form instead of iterating.
+from typing import Sequence
+
+import numpy as np
+
+MAX_EXTENSION_MONTHS = 120
+
+
+def horizon_return_rates(months: np.ndarray) -> np.ndarray:
+    """Annual return assumed for each horizon: 6% up to 3y, 8% up to 7y, 10% beyond."""
+    return np.where(months <= 36, 0.06, np.where(months <= 84, 0.08, 0.10))
+
+
+def _future_value(P, SIP, r_monthly, n):
+    growth = np.power(1 + r_monthly, n)
+    return P * growth + SIP * (((growth - 1) / r_monthly) * (1 + r_monthly))
+
+
+def _search_extension(P, SIP, r_monthly, n, target):
+    """The original month-by-month search (first of 1..MAX months that reaches target, else MAX)."""
+    months = np.arange(1, MAX_EXTENSION_MONTHS + 1)
+    reached = _future_value(P[:, None], SIP[:, None], r_monthly[:, None], n[:, None] + months) >= target[:, None]
+    return np.where(reached.any(axis=1), reached.argmax(axis=1) + 1, MAX_EXTENSION_MONTHS)
+
+
+def project_goals(months, current_savings, sip, target) -> dict:
+    """
+    Project every goal at once. All inputs are 1-D arrays of equal length.
+
+    Returns a dict of arrays: expected_return_annual, projected_value,
+    feasible, suggested_sip and extend_by_months (the last two are only
+    meaningful where feasible is False).
+    """
+    n = np.asarray(months, dtype=np.int64)
+    P = np.asarray(current_savings, dtype=np.float64)
+    SIP = np.asarray(sip, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+
+    r_annual = horizon_return_rates(n)
+    r_monthly = r_annual / 12
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        growth = np.power(1 + r_monthly, n)
+        annuity = ((growth - 1) / r_monthly) * (1 + r_monthly)
+        future_value = P * growth + SIP * annuity
+        feasible = future_value >= target
+
+        # Higher SIP that reaches the target within the original horizon
+        suggested_sip = (target - P * growth) / annuity
+
+        # Smallest horizon t with FV(t) >= target. With A = SIP * (1 + r) / r,
+        # FV(t) = (P + A) * g^t - A, so t >= log((target + A) / (P + A)) / log(g).
+        # Only valid for P + A > 0 (negative savings or SIP); other rows use the search.
+        A = SIP * (1 + r_monthly) / r_monthly
+        t_min = np.ceil(np.log((target + A) / (P + A)) / np.log1p(r_monthly))
+        extension = np.clip(t_min - n, 1, MAX_EXTENSION_MONTHS)
+        extension = np.where(np.isfinite(extension), extension, MAX_EXTENSION_MONTHS).astype(np.int64)
+
+        # Guard against floating-point disagreement with the direct formula at
+        # the boundary: step down while the previous month already suffices,
+        # step up while the chosen month still falls short.
+        shorter = (extension > 1) & (_future_value(P, SIP, r_monthly, n + extension - 1) >= target)
+        extension = extension - shorter
+        longer = (extension < MAX_EXTENSION_MONTHS) & (_future_value(P, SIP, r_monthly, n + extension) < target)
+        extension = extension + longer
+
+        search = ~feasible & (P + A <= 0)
+        if search.any():
+            extension[search] = _search_extension(P[search], SIP[search], r_monthly[search], n[search],
+                                                  target[search])
+
+    return {
+        "expected_return_annual": r_annual,
+        "projected_value": future_value,
+        "feasible": feasible,
+        "suggested_sip": suggested_sip,
+        "extend_by_months": extension,
+    }
+
+
+def goal_feasibility(goals: Sequence) -> list[dict]:
+    """Feasibility report for each goal, in the `goal_analysis` response format."""
+    if not goals:
+        return []
+    projection = project_goals(
+        [g.months_to_achieve for g in goals],
+        [g.current_savings for g in goals],
+        [g.sip for g in goals],
+        [g.target_amount for g in goals],
+    )
+    return feasibility_records(goals, projection)
+
+
+def feasibility_records(goals: Sequence, projection: dict, offset: int = 0) -> list[dict]:
+    """Format rows `offset .. offset + len(goals)` of a projection as response dicts."""
+    results = []
+    for i, goal in enumerate(goals, start=offset):
+        feasible = bool(projection["feasible"][i])
+        result = {
+            "name": goal.name,
+            "target": round(goal.target_amount, 2),
+            "horizon_months": goal.months_to_achieve,
+            "expected_return_annual": round(float(projection["expected_return_annual"][i]) * 100, 2),
+            "projected_value": round(float(projection["projected_value"][i]), 2),
+            "feasible": feasible
+        }
+        if not feasible:
+            extension = int(projection["extend_by_months"][i])
+            result["recommendation"] = {
+                "suggested_sip": round(float(projection["suggested_sip"][i]), 2),
+                "extend_by_months": extension if extension > 0 else None
+            }
+        results.append(result)
+    return results
@@ -0,0 +1,241 @@
+# Declarative goal-suggestion rules.
+# Each user is reduced to a flat feature record in one pass over their
+# insurances, loans and goals; every rule is a predicate over those features
+# written with &, | and `no` so the same expression evaluates on plain
+# Python values (one user) and on whole feature columns (bulk mode).
+# Adding a rule adds an expression over existing features, not another scan
+# of the user.
+#
+# CLI (nightly job over the client book):
+#   python -m app.core.goal_rules users.jsonl -o suggestions.jsonl
+import argparse
+import json
+import sys
+import time
+from typing import Callable, Iterable, List, NamedTuple, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app.models.user import User
+
+
+def no(flag):
+    """Logical not for both a bool and a NumPy boolean mask (`~True` is -2)."""
+    return flag ^ True
+
+
+class GoalRule(NamedTuple):
+    goal: str
+    reason: str
+    when: Callable  # features -> bool (scalar) or boolean mask (bulk)
+
+
+# -----------------------------
+# 1. Feature Extraction
+# -----------------------------
+
+# Insurance features: substring tests on the lowercased insurance names
+INSURANCE_KEYWORDS = {
+    "has_life_insurance": ("life",),
+    "has_health_insurance": ("health",),
+    "has_auto_insurance": ("auto", "car"),
+    "has_home_insurance": ("home", "rent"),
+    "has_disability_insurance": ("disability",),
+    "has_long_term_care_insurance": ("long-term care",),
+    "has_travel_insurance": ("travel",),
+}
+
+
+def extract_features(user: User) -> dict:
+    """Everything the rules read, computed in one pass over each list on the user."""
+    features = dict.fromkeys(INSURANCE_KEYWORDS, False)
+    for ins in user.insurances:
+        ins = ins.lower()
+        for feature, keywords in INSURANCE_KEYWORDS.items():
+            if not features[feature] and any(keyword in ins for keyword in keywords):
+                features[feature] = True
+
+    total_emi = 0.0
+    has_car_loan = has_high_interest_loan = False
+    for loan in user.loans:
+        total_emi += loan.installment
+        has_car_loan = has_car_loan or "car" in loan.type.lower()
+        has_high_interest_loan = has_high_interest_loan or loan.interest_rate > 10
+
+    has_home_goal = has_travel_goal = has_retirement_goal = has_sip_goal = False
+    achieved_goals = []
+    for goal in user.goals:
+        name = goal.name.lower()
+        has_home_goal = has_home_goal or "home" in name
+        has_travel_goal = has_travel_goal or "travel" in name
+        has_retirement_goal = has_retirement_goal or name == "retirement"
+        has_sip_goal = has_sip_goal or name == "sip"
+        if goal.current_savings >= goal.target_amount:
+            achieved_goals.append(goal.name)
+
+    features.update(
+        age=user.age,
+        income=user.income,
+        expenses=user.expenses,
+        dependents=user.dependents,
+        emergency_fund=user.emergency_fund,
+        total_emi=total_emi,
+        monthly_surplus=user.income - user.expenses - total_emi,
+        has_car_loan=has_car_loan,
+        has_high_interest_loan=has_high_interest_loan,
+        has_home_goal=has_home_goal,
+        has_travel_goal=has_travel_goal,
+        has_retirement_goal=has_retirement_goal,
+        has_sip_goal=has_sip_goal,
+        achieved_goals=achieved_goals,
+    )
+    return features
+
+
+# -----------------------------
+# 2. Rules (output order)
+# -----------------------------
+
+GOAL_RULES: List[GoalRule] = [
+    GoalRule(
+        "Start/Increase Emergency Fund",
+        "You should ideally have 6 months' worth of expenses and EMIs saved to cover unexpected situations.",
+        lambda f: f["emergency_fund"] < 6 * (f["expenses"] + f["total_emi"]),
+    ),
+    GoalRule(
+        "Get Life Insurance",
+        "Since you have dependents, life insurance is essential to provide financial protection in case something happens to you.",
+        lambda f: (f["dependents"] > 0) & no(f["has_life_insurance"]),
+    ),
+    GoalRule(
+        "Get Health Insurance",
+        "Medical expenses can be unpredictable and costly. Health insurance helps prevent financial strain during medical emergencies.",
+        lambda f: (f["income"] > 0) & no(f["has_health_insurance"]),
+    ),
+    GoalRule(
+        "Get Auto Insurance",
+        "You have a car loan, but no auto insurance found. Insurance protects against vehicle damage, theft, and accidents.",
+        lambda f: f["has_car_loan"] & no(f["has_auto_insurance"]),
+    ),
+    GoalRule(
+        "Consider Homeowners or Renters Insurance",
+        "Property or rental insurance safeguards your living space and belongings against risks like fire, theft, and damage.",
+        lambda f: f["has_home_goal"] | ((f["expenses"] > 0.3 * f["income"]) & no(f["has_home_insurance"])),
+    ),
+    GoalRule(
+        "Get Disability Insurance",
+        "If you're earning well, disability insurance can protect your income in case you're unable to work due to illness or injury.",
+        lambda f: (f["income"] > 50000) & no(f["has_disability_insurance"]),
+    ),
+    GoalRule(
+        "Plan for Long-Term Care Insurance",
+        "As you age, the risk of needing long-term medical care increases. Planning ahead can ease the financial burden later.",
+        lambda f: (f["age"] >= 50) & no(f["has_long_term_care_insurance"]),
+    ),
+    GoalRule(
+        "Consider Travel Insurance",
+        "You have travel-related goals, but no travel insurance. It helps cover medical emergencies, cancellations, and losses abroad.",
+        lambda f: f["has_travel_goal"] & no(f["has_travel_insurance"]),
+    ),
+    # The two retirement rules are mutually exclusive on has_retirement_goal
+    GoalRule(
+        "Plan for Retirement Savings",
+        "Starting retirement planning early allows you to benefit from compounding and build a secure future.",
+        lambda f: (f["age"] >= 30) & no(f["has_retirement_goal"]),
+    ),
+    GoalRule(
+        "Accelerate Retirement Planning",
+        "As you near retirement, it's time to maximize contributions and align investments with your retirement goals.",
+        lambda f: (f["age"] >= 50) & f["has_retirement_goal"],
+    ),
+    GoalRule(
+        "Focus on High-Interest Debt Repayment",
+        "Loans with interest rates above 10% can eat into your savings. Prioritizing their repayment reduces long-term financial pressure.",
+        lambda f: f["has_high_interest_loan"],
+    ),
+    GoalRule(
+        "Start Wealth-Building SIP",
+        "With a healthy monthly surplus, starting a SIP (Systematic Investment Plan) can help build long-term wealth through disciplined investing.",
+        lambda f: (f["monthly_surplus"] > 10000) & no(f["has_sip_goal"]),
+    ),
+]
+
+# Emitted once per already-achieved goal, after all other rules
+ACHIEVED_GOAL_REASON = ("This goal has already been met. You can reallocate resources to other priorities "
+                        "or mark it as complete.")
+
+
+def _achieved(goal_names: Iterable[str]) -> List[Tuple[str, str]]:
+    return [(f"Review '{name}' — Already Achieved", ACHIEVED_GOAL_REASON) for name in goal_names]
+
+
+# -----------------------------
+# 3. Evaluation
+# -----------------------------
+
+def suggest_goals(user: User, rules: Sequence[GoalRule] = GOAL_RULES) -> List[Tuple[str, str]]:
+    """(goal, reason) suggestions for one user, in rule order."""
+    features = extract_features(user)
+    suggestions = [(rule.goal, rule.reason) for rule in rules if rule.when(features)]
+    return suggestions + _achieved(features["achieved_goals"])
+
+
+def features_frame(users: Sequence[User]) -> pd.DataFrame:
+    return pd.DataFrame.from_records([extract_features(user) for user in users])
+
+
+def suggest_goals_bulk(users: Sequence[User], rules: Sequence[GoalRule] = GOAL_RULES) -> List[List[Tuple[str, str]]]:
+    """`suggest_goals` for many users: every rule is one boolean mask over the feature frame."""
+    if not users:
+        return []
+    frame = features_frame(users)
+    columns = {column: frame[column].to_numpy() for column in frame.columns if column != "achieved_goals"}
+    masks = np.column_stack([np.asarray(rule.when(columns), dtype=bool) for rule in rules])
+
+    suggestions = [[] for _ in users]
+    for row, rule_index in zip(*np.nonzero(masks)):  # row-major: rule order within each user
+        rule = rules[rule_index]
+        suggestions[row].append((rule.goal, rule.reason))
+    for row, achieved in enumerate(frame["achieved_goals"]):
+        if achieved:
+            suggestions[row].extend(_achieved(achieved))
+    return suggestions
+
+
+# -----------------------------
+# 4. CLI Entry Point
+# -----------------------------
+
+if __name__ == "__main__":
+    from app.core.batch_planner import DEFAULT_CHUNK_SIZE, chunked, iter_user_records
+
+    parser = argparse.ArgumentParser(description="Suggest goals for a batch of users from JSONL or CSV.")
+    parser.add_argument("input", help="Path to a .jsonl or .csv file of User records")
+    parser.add_argument("-o", "--output", help="Write NDJSON results here (default: stdout)")
+    parser.add_argument("--format", choices=["jsonl", "csv"], help="Input format (default: from extension)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    fmt = args.format or ("csv" if args.input.endswith(".csv") else "jsonl")
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    start = time.perf_counter()
+    count = 0
+    try:
+        with open(args.input, newline="", encoding="utf-8") as f:
+            records = iter_user_records(f, fmt)
+            for chunk in chunked(records, args.chunk_size):
+                users = [user for _, user in chunk if isinstance(user, User)]
+                by_user = iter(suggest_goals_bulk(users))
+                for index, item in chunk:
+                    if isinstance(item, Exception):
+                        result = {"index": index, "error": f"Invalid record: {item}"}
+                    else:
+                        result = {"index": index, "name": item.name,
+                                  "suggested_goals": [{"goal": g, "reason": r} for g, r in next(by_user)]}
+                    out.write(json.dumps(result) + "\n")
+                    count += 1
+    finally:
+        if out is not sys.stdout:
+            out.close()
+    print(f"✅ Wrote {count} results in {time.perf_counter() - start:.2f}s", file=sys.stderr)
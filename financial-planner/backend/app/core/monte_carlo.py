@@ -0,0 +1,210 @@
+# Monte Carlo goal-success simulation.
+# Monthly portfolio log-returns are drawn i.i.d. normal, with mean and
+# volatility taken from the recommended allocation and the asset-class
+# statistics of the fund catalog. All goals of a request share one set of
+# paths; with C_n the cumulative log-return after n months, wealth at month
+# n (SIP paid at the start of each month, as in feasibility.py) is
+#     W_n = e^{C_n} * (P + SIP * sum_{t=1..n} e^{-C_{t-1}})
+# so every goal is read off two cumulative sums. The normal draws come from a
+# fixed seed, so responses are reproducible and the draws, which dominate the
+# cost, are made once per process and reused (see cumulative_shocks). They
+# come in antithetic pairs (z, -z): half the draws, and lower variance for the
+# same path count. Paths are evaluated in chunks to bound memory and stay in
+# float32 until they are combined with the (float64) goal amounts.
+import threading
+import time
+from typing import Sequence
+
+import numpy as np
+
+from app.config import MONTE_CARLO_CHUNK_PATHS, MONTE_CARLO_PATHS, MONTE_CARLO_SEED
+
+ASSET_CLASSES = ("equity", "bonds", "commodities")
+
+# The catalog has no bond volatility; these fill any missing asset-class volatility
+FALLBACK_VOLATILITY = {"equity": 0.18, "bonds": 0.03, "commodities": 0.15}
+
+# Assumed correlation between asset-class returns (rows/columns as ASSET_CLASSES)
+ASSET_CLASS_CORRELATION = np.array([
+    [1.00, 0.10, 0.05],
+    [0.10, 1.00, 0.20],
+    [0.05, 0.20, 1.00],
+])
+
+PERCENTILES = (10, 25, 50, 75, 90)
+
+# Longest return window first: a scheme's expected return is its longest track record
+RETURN_PREFERENCE = ("return_10yr", "return_5yr", "return_since_inception", "return_3yr", "return_1yr")
+
+
+def asset_class_assumptions(catalog) -> tuple[np.ndarray, np.ndarray]:
+    """Annual expected return and volatility per asset class (as fractions)."""
+    frame = catalog.frame
+    expected = frame[list(RETURN_PREFERENCE)].bfill(axis=1).iloc[:, 0]
+    grouped = frame.assign(expected_return=expected).groupby("asset_class")
+    means = grouped["expected_return"].mean()
+    vols = grouped["standard_deviation"].mean()
+
+    mu = np.array([means.get(c, np.nan) for c in ASSET_CLASSES], dtype=np.float64) / 100
+    sigma = np.array([vols.get(c, np.nan) for c in ASSET_CLASSES], dtype=np.float64) / 100
+    sigma = np.where(np.isnan(sigma), [FALLBACK_VOLATILITY[c] for c in ASSET_CLASSES], sigma)
+    mu = np.nan_to_num(mu)
+    return mu, sigma
+
+
+def get_asset_class_assumptions() -> tuple[np.ndarray, np.ndarray]:
+    from app.data.catalog import get_catalog
+    from app.llm.resource_registry import get_resource
+    return get_resource("asset_class_assumptions", lambda: asset_class_assumptions(get_catalog()))
+
+
+def portfolio_assumptions(allocation: dict, assumptions=None) -> tuple[float, float]:
+    """Annual expected return and volatility (fractions) of an equity/bonds/commodities allocation."""
+    mu, sigma = assumptions if assumptions is not None else get_asset_class_assumptions()
+    weights = np.array([allocation.get(c, 0) for c in ASSET_CLASSES], dtype=np.float64) / 100
+    covariance = ASSET_CLASS_CORRELATION * np.outer(sigma, sigma)
+    return float(weights @ mu), float(np.sqrt(weights @ covariance @ weights))
+
+
+_shock_cache = {}  # (seed, pairs) -> cumulative standard-normal draws, months x pairs
+_shock_lock = threading.Lock()
+
+
+def _running_sum(months_first: np.ndarray) -> np.ndarray:
+    """In-place cumulative sum over the rows (months) of a months x paths array.
+
+    One vector add per month over a contiguous row; np.cumsum along either axis
+    is several times slower on float32.
+    """
+    for t in range(1, months_first.shape[0]):
+        np.add(months_first[t - 1], months_first[t], out=months_first[t])
+    return months_first
+
+
+def cumulative_shocks(seed: int, pairs: int, horizon: int) -> np.ndarray:
+    """S_t = z_1 + ... + z_t of `pairs` standard-normal paths, months x pairs (float32, read-only).
+
+    The draws depend only on the seed, so they are generated once per process
+    and shared by every request. Rows fill month by month, so a shorter horizon
+    is a prefix of a longer one and results never depend on earlier requests.
+    """
+    with _shock_lock:
+        shocks = _shock_cache.get((seed, pairs))
+        if shocks is None or len(shocks) < horizon:
+            rng = np.random.Generator(np.random.SFC64(seed))
+            shocks = _running_sum(rng.standard_normal((horizon, pairs), dtype=np.float32))
+            shocks.flags.writeable = False
+            _shock_cache[(seed, pairs)] = shocks
+    return shocks[:horizon]
+
+
+def warm_up_shocks(horizon: int = 360):
+    """Make the default draws for goals up to `horizon` months ahead of the first request."""
+    return cumulative_shocks(MONTE_CARLO_SEED, (MONTE_CARLO_PATHS + 1) // 2, horizon)
+
+
+def simulate_goals(months, current_savings, sip, target, annual_return: float, annual_volatility: float,
+                   paths: int = MONTE_CARLO_PATHS, seed: int = MONTE_CARLO_SEED,
+                   chunk_paths: int = MONTE_CARLO_CHUNK_PATHS) -> dict:
+    """
+    Simulate `paths` return paths and evaluate every goal on them.
+
+    Inputs are 1-D arrays (one entry per goal). Returns a dict with
+    success_probability and mean (per goal) and percentiles (goals x PERCENTILES).
+    """
+    n = np.maximum(np.asarray(months, dtype=np.int64), 0)
+    P = np.asarray(current_savings, dtype=np.float64)
+    SIP = np.asarray(sip, dtype=np.float64)
+    target = np.asarray(target, dtype=np.float64)
+    horizon = int(n.max()) if len(n) else 0
+
+    monthly_vol = annual_volatility / np.sqrt(12)
+    # Drift chosen so the arithmetic mean monthly growth is (1 + annual_return)^(1/12)
+    monthly_drift = np.log1p(annual_return) / 12 - monthly_vol ** 2 / 2
+
+    pairs = (paths + 1) // 2
+    finals = np.empty((len(n), 2 * pairs), dtype=np.float64)
+    if horizon == 0:
+        finals[:] = P[:, None]
+    else:
+        shocks = cumulative_shocks(seed, pairs, horizon)
+        drift = (np.float32(monthly_drift) * np.arange(1, horizon + 1, dtype=np.float32))[:, None]
+        at_n = np.maximum(n - 1, 0)      # row of C_n
+        before_n = np.maximum(n - 2, 0)  # row of the discount sum up to t = n - 1
+        reached = (n > 0)[:, None]
+        annuity_mask = (n >= 2)[:, None]
+        chunk_pairs = max(1, chunk_paths // 2)
+
+        for start in range(0, pairs, chunk_pairs):
+            width = min(chunk_pairs, pairs - start)
+            # C_t = vol * S_t + drift * t for the draws, and -vol * S_t + drift * t for their
+            # antithetic twins, side by side in one months x paths float32 block
+            cumulative = np.empty((horizon, 2 * width), dtype=np.float32)
+            np.multiply(shocks[:, start:start + width], np.float32(monthly_vol), out=cumulative[:, :width])
+            np.negative(cumulative[:, :width], out=cumulative[:, width:])
+            cumulative += drift
+            discount_sum = np.negative(cumulative)
+            _running_sum(np.exp(discount_sum, out=discount_sum))           # sum_{t=1..k} e^{-C_t}
+
+            growth = np.exp(cumulative[at_n])                              # goals x paths, float32
+            annuity = 1 + np.where(annuity_mask, discount_sum[before_n], 0)
+            wealth = growth * (P[:, None] + SIP[:, None] * annuity)        # float64 from here on
+            finals[:, 2 * start:2 * (start + width)] = np.where(reached, wealth, P[:, None])
+    finals = finals[:, :paths]
+
+    return {
+        "success_probability": (finals >= target[:, None]).mean(axis=1),
+        "mean": finals.mean(axis=1),
+        "percentiles": np.percentile(finals, PERCENTILES, axis=1).T,
+    }
+
+
+def goal_success(goals: Sequence, allocation: dict, paths: int = MONTE_CARLO_PATHS,
+                 seed: int = MONTE_CARLO_SEED) -> list[dict]:
+    """Per-goal `monte_carlo` section for `goal_analysis` under the given allocation."""
+    if not goals:
+        return []
+    annual_return, annual_volatility = portfolio_assumptions(allocation)
+    result = simulate_goals(
+        [g.months_to_achieve for g in goals],
+        [g.current_savings for g in goals],
+        [g.sip for g in goals],
+        [g.target_amount for g in goals],
+        annual_return, annual_volatility, paths=paths, seed=seed,
+    )
+    return [
+        {
+            "paths": paths,
+            "expected_return_annual": round(annual_return * 100, 2),
+            "volatility_annual": round(annual_volatility * 100, 2),
+            "success_probability": round(float(result["success_probability"][i]), 4),
+            "percentiles": {f"p{p}": round(float(v), 2) for p, v in zip(PERCENTILES, result["percentiles"][i])},
+        }
+        for i in range(len(goals))
+    ]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Time the Monte Carlo goal simulator.")
+    parser.add_argument("--paths", type=int, default=MONTE_CARLO_PATHS)
+    parser.add_argument("--months", type=int, default=360)
+    parser.add_argument("--goals", type=int, default=3)
+    parser.add_argument("--chunk-paths", type=int, default=MONTE_CARLO_CHUNK_PATHS)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    months = np.linspace(args.months // args.goals, args.months, args.goals).astype(np.int64)
+    timings = []
+    for _ in range(args.repeat + 1):
+        start = time.perf_counter()
+        result = simulate_goals(months, np.full(args.goals, 100000.0), np.full(args.goals, 10000.0),
+                                np.full(args.goals, 5e6), 0.10, 0.15, paths=args.paths,
+                                chunk_paths=args.chunk_paths)
+        timings.append(time.perf_counter() - start)
+    # The first run also makes the (cached) normal draws
+    print(f"{args.paths} paths x {args.months} months, {args.goals} goals: first {1000 * timings[0]:.1f} ms, "
+          f"then best {1000 * min(timings[1:]):.1f} ms, median {1000 * float(np.median(timings[1:])):.1f} ms")
+    for m, p, pct in zip(months, result["success_probability"], result["percentiles"]):
+        print(f"  {m:>4} months: P(success)={p:.3f} p10={pct[0]:,.0f} p50={pct[2]:,.0f} p90={pct[-1]:,.0f}")
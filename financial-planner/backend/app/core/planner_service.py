@@ -1,57 +1,133 @@
-import json
-import requests
-from math import pow
+import asyncio
+import threading
+import time
+from typing import AsyncIterator
+
+from app.config import MONTE_CARLO_ENABLED
+from app.core.allocation_optimizer import get_allocation_frontier
+from app.core.feasibility import goal_feasibility
+from app.core.monte_carlo import goal_success
+from app.llm.response_cache import cached_generate, cached_stream_generate
 from app.models.user import User
 
+EXPLANATION_UNAVAILABLE = "Explanation not available due to a system error."
+
+
+# Pipeline stages in execution (and response key) order, with the stages
+# each one needs. Callers pick the stages they return; dependencies are added.
+STAGES = {
+    "cash_flow": (),              # monthly_surplus
+    "emergency_fund": (),         # emergency_fund_ok, ideal_emergency_fund
+    "goal_analysis": (),          # goal_analysis (deterministic projection)
+    "allocation": (),             # recommended_allocation
+    "monte_carlo": ("goal_analysis", "allocation"),  # goal_analysis[*].monte_carlo
+    "explanation": ("allocation",),                  # allocation_explanation (LLM)
+}
+DETERMINISTIC_STAGES = tuple(name for name in STAGES if name != "explanation")
+
+_stage_lock = threading.Lock()
+_stage_stats = {}
+
+
+def record_stage(name: str, seconds: float):
+    with _stage_lock:
+        stats = _stage_stats.setdefault(name, {"runs": 0, "total_seconds": 0.0, "max_seconds": 0.0})
+        stats["runs"] += 1
+        stats["total_seconds"] += seconds
+        stats["max_seconds"] = max(stats["max_seconds"], seconds)
+
+
+def stage_stats() -> dict:
+    with _stage_lock:
+        return {
+            name: {
+                "runs": stats["runs"],
+                "avg_ms": round(1000 * stats["total_seconds"] / stats["runs"], 2),
+                "max_ms": round(1000 * stats["max_seconds"], 2),
+            }
+            for name, stats in _stage_stats.items()
+        }
+
+
+def resolve_stages(stages) -> list[str]:
+    """Requested stages plus their dependencies, in pipeline order."""
+    wanted = set()
+    pending = list(STAGES if stages is None else stages)
+    while pending:
+        name = pending.pop()
+        if name not in STAGES:
+            raise ValueError(f"Unknown planner stage: {name}")
+        if name not in wanted:
+            wanted.add(name)
+            pending.extend(STAGES[name])
+    if "monte_carlo" in wanted and not MONTE_CARLO_ENABLED:
+        wanted.discard("monte_carlo")
+    return [name for name in STAGES if name in wanted]
+
 
 class PlannerService:
 
-    def analyze_user(self, user: User) -> dict:
+    async def analyze_user(self, user: User, stages=None) -> dict:
+        """Run the selected stages (all by default) and return their results."""
+        selected = resolve_stages(stages)
+        # NumPy simulation work; keep it off the event loop
+        summary = await asyncio.to_thread(self.summarize, user, [s for s in selected if s != "explanation"])
+
+        # 5. LLM Explanation
+        if "explanation" in selected:
+            start = time.perf_counter()
+            try:
+                explanation = await self._explain_allocation_with_llm(user, summary['recommended_allocation'])
+            except Exception as e:
+                explanation = EXPLANATION_UNAVAILABLE
+                print("LLM error:", e)
+            record_stage("explanation", time.perf_counter() - start)
+            summary['allocation_explanation'] = explanation
+
+        return summary
+
+    def summarize(self, user: User, stages=DETERMINISTIC_STAGES) -> dict:
+        """Deterministic stages of the analysis (everything except the LLM explanation)."""
         summary = {}
+        for name in resolve_stages(stages):
+            if name == "explanation":
+                continue
+            start = time.perf_counter()
+            getattr(self, f"_stage_{name}")(user, summary)
+            record_stage(name, time.perf_counter() - start)
+        return summary
 
-        # 1. Monthly surplus
+    # 1. Monthly surplus
+    def _stage_cash_flow(self, user: User, summary: dict):
         total_emi = sum(loan.installment for loan in user.loans)
-        surplus = user.income - user.expenses - total_emi
-        summary['monthly_surplus'] = surplus
+        summary['monthly_surplus'] = user.income - user.expenses - total_emi
 
-        # 2. Emergency fund check
+    # 2. Emergency fund check
+    def _stage_emergency_fund(self, user: User, summary: dict):
+        total_emi = sum(loan.installment for loan in user.loans)
         ideal_emergency = 6 * (user.expenses + total_emi)
-        emergency_ok = user.emergency_fund >= ideal_emergency
-        summary['emergency_fund_ok'] = emergency_ok
+        summary['emergency_fund_ok'] = user.emergency_fund >= ideal_emergency
         summary['ideal_emergency_fund'] = ideal_emergency
 
-        # 3. Goal feasibility
-        summary['goal_analysis'] = [self._check_goal_feasibility(goal) for goal in user.goals]
+    # 3. Goal feasibility
+    def _stage_goal_analysis(self, user: User, summary: dict):
+        summary['goal_analysis'] = goal_feasibility(user.goals)
 
-        # 4. Asset Allocation
-        allocation = self._calculate_asset_allocation(user)
-        summary['recommended_allocation'] = allocation
+    # 4. Asset Allocation
+    def _stage_allocation(self, user: User, summary: dict):
+        summary['recommended_allocation'] = self._calculate_asset_allocation(user)
 
-        # 5. LLM Explanation
-        try:
-            explanation = self._explain_allocation_with_llm(user, allocation)
-        except Exception as e:
-            explanation = "Explanation not available due to a system error."
-            print("LLM error:", e)
-        summary['allocation_explanation'] = explanation
-
-        return summary
+    # 3b. Goal success odds under the recommended allocation
+    def _stage_monte_carlo(self, user: User, summary: dict):
+        simulations = goal_success(user.goals, summary['recommended_allocation'])
+        for record, simulation in zip(summary['goal_analysis'], simulations):
+            record['monte_carlo'] = simulation
 
     def _calculate_asset_allocation(self, user: User) -> dict:
-        base = {
-            'conservative': {'equity': 30, 'bonds': 60, 'commodities': 10},
-            'balanced': {'equity': 50, 'bonds': 40, 'commodities': 10},
-            'aggressive': {'equity': 70, 'bonds': 20, 'commodities': 10}
-        }
-
-        allocation = base.get(user.risk_profile.lower(), base['balanced']).copy()
-
-        # Age adjustment
+        # Base split from the precomputed efficient frontier; the age rule
+        # (equity at most 110 - age) is applied as the frontier's equity cap
         age_limit = max(0, 110 - user.age)
-        if allocation['equity'] > age_limit:
-            shift = allocation['equity'] - age_limit
-            allocation['equity'] -= shift
-            allocation['bonds'] += shift
+        allocation = get_allocation_frontier().lookup(user.risk_profile, equity_cap=age_limit)
 
         # Emergency fund adjustment
         required_emergency = 6 * (user.expenses + sum(l.installment for l in user.loans))
@@ -88,59 +164,34 @@ class PlannerService:
         return allocation
 
     def _check_goal_feasibility(self, goal) -> dict:
-        n = goal.months_to_achieve
-        P = goal.current_savings
-        SIP = goal.sip
-        target = goal.target_amount
-
-        # Return rate
-        if n <= 36:
-            r_annual = 0.06
-        elif 36 < n <= 84:
-            r_annual = 0.08
-        else:
-            r_annual = 0.10
-        r_monthly = r_annual / 12
-
-        # Future value
-        future_value = P * pow(1 + r_monthly, n) + SIP * (((pow(1 + r_monthly, n) - 1) / r_monthly) * (1 + r_monthly))
-        feasible = future_value >= target
-
-        result = {
-            "name": goal.name,
-            "target": round(target, 2),
-            "horizon_months": n,
-            "expected_return_annual": round(r_annual * 100, 2),
-            "projected_value": round(future_value, 2),
-            "feasible": feasible
-        }
+        return goal_feasibility([goal])[0]
 
-        if not feasible:
-            # Suggest higher SIP
-            remaining = target - (P * pow(1 + r_monthly, n))
-            sip_needed = remaining / (((pow(1 + r_monthly, n) - 1) / r_monthly) * (1 + r_monthly))
-            sip_needed = round(sip_needed, 2)
-
-            # Suggest extended time
-            extra_months = 0
-            fv = future_value
-            while fv < target and extra_months < 120:
-                extra_months += 1
-                total_months = n + extra_months
-                fv = P * pow(1 + r_monthly, total_months) + SIP * (
-                    ((pow(1 + r_monthly, total_months) - 1) / r_monthly) * (1 + r_monthly))
-
-            result["recommendation"] = {
-                "suggested_sip": sip_needed,
-                "extend_by_months": extra_months if extra_months > 0 else None
-            }
+    async def _explain_allocation_with_llm(self, user: User, allocation: dict) -> str:
+        inputs = self._explanation_inputs(user, allocation)
+        return await cached_generate(self._build_explanation_prompt(inputs), inputs)
+
+    async def stream_allocation_explanation(self, user: User, allocation: dict) -> AsyncIterator[str]:
+        """Yield explanation tokens as the model produces them."""
+        inputs = self._explanation_inputs(user, allocation)
+        async for token in cached_stream_generate(self._build_explanation_prompt(inputs), inputs):
+            yield token
 
-        return result
+    def _explanation_inputs(self, user: User, allocation: dict) -> dict:
+        """Everything the explanation prompt depends on; doubles as the cache key."""
+        total_emi = sum(l.installment for l in user.loans)
+        return {
+            "kind": "allocation_explanation",
+            "age": user.age,
+            "risk_profile": user.risk_profile.strip(),
+            "monthly_surplus": user.income - user.expenses - total_emi,
+            "emergency_fund": user.emergency_fund,
+            "ideal_emergency_fund": 6 * (user.expenses + total_emi),
+            "goals": [(g.name.strip(), g.months_to_achieve) for g in user.goals],
+            "allocation": {k: allocation[k] for k in ("equity", "bonds", "commodities")},
+        }
 
-    def _explain_allocation_with_llm(self, user: User, allocation: dict) -> str:
-        # Calculate derived fields
-        monthly_surplus = user.income - user.expenses - sum(l.installment for l in user.loans)
-        ideal_emergency_fund = 6 * (user.expenses + sum(l.installment for l in user.loans))
+    def _build_explanation_prompt(self, inputs: dict) -> str:
+        allocation = inputs['allocation']
 
         # Prepare prompt with strict structure and hallucination control
         prompt = f"""
@@ -150,17 +201,17 @@ class PlannerService:
 
         User Profile:
 
-        Age: {user.age}
+        Age: {inputs['age']}
 
-        Risk Profile: {user.risk_profile}
+        Risk Profile: {inputs['risk_profile']}
 
-        Monthly Surplus: ₹{monthly_surplus}
+        Monthly Surplus: ₹{inputs['monthly_surplus']}
 
-        Emergency Fund: ₹{user.emergency_fund}
+        Emergency Fund: ₹{inputs['emergency_fund']}
 
-        Ideal Emergency Fund: ₹{ideal_emergency_fund}
+        Ideal Emergency Fund: ₹{inputs['ideal_emergency_fund']}
 
-        Goals: {[(g.name, g.months_to_achieve) for g in user.goals]}
+        Goals: {inputs['goals']}
 
         Recommended Allocation:
 
@@ -201,27 +252,4 @@ class PlannerService:
 
         """
 
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": "llama3.2:latest",
-                "prompt": prompt,
-                "stream": True
-            },
-            stream=True
-        )
-
-        # Stream and assemble response
-        output_lines = []
-        for line in response.iter_lines():
-            if not line:
-                continue
-            try:
-                data = json.loads(line.decode('utf-8'))
-                chunk = data.get("response", "")
-                if chunk:
-                    output_lines.append(chunk)
-            except json.JSONDecodeError:
-                continue
-
-        return "".join(output_lines).strip()
+        return prompt
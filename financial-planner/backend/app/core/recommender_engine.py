@@ -1,25 +1,35 @@
-import os
-import json
-import requests
-
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-from app.llm.rag_recommender import build_financial_rag
+import asyncio
+import hashlib
+from typing import AsyncIterator, Tuple
+
+from app.config import MARKET_INDEX_DIR
+from app.data.catalog import get_catalog
+from app.llm.json_stream import JSONStreamParser
+from app.llm.response_cache import MARKET_INDEX_TAG, cached_generate, cached_stream_generate
+from app.llm.resource_registry import get_vector_store
+from app.llm.retrieval_cache import cached_similarity_search
 from app.models.user import User
 
 
-# Load the vector store
-def load_vector_store(index_dir="faiss_index"):
-    if not os.path.exists(os.path.join(index_dir, "index.faiss")):
-        print("⚠️ Index not found. Rebuilding...")
-        build_financial_rag()
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    return FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+# Load the vector store (resident after the first call)
+def load_vector_store(index_dir=MARKET_INDEX_DIR):
+    def build():
+        # Scrapers, yfinance and FinBERT are only needed to (re)build the index
+        from app.llm.rag_recommender import build_financial_rag
+        build_financial_rag(index_dir)
+
+    return get_vector_store(index_dir, build_fn=build)
+
+
+PICK_KEYS = ("equity_picks", "bond_picks", "commodity_picks")
 
 
 # Normalize keys (e.g., "Equity Picks" -> "equity_picks")
+def normalize_key(k):
+    return k.lower().replace(" ", "_")
+
+
 def normalize_keys(d):
-    def normalize_key(k): return k.lower().replace(" ", "_")
     if isinstance(d, dict):
         return {normalize_key(k): normalize_keys(v) for k, v in d.items()}
     elif isinstance(d, list):
@@ -27,17 +37,38 @@ def normalize_keys(d):
     return d
 
 
-# Query Ollama with context
-def query_ollama_for_portfolio(user_data: User, allocation: dict, k: int = 5, return_dict: bool = True):
-    """
-    Generate structured portfolio recommendation based on user profile, allocation, and market context.
-    """
+# Retrieve market context (blocking: embedding + FAISS search)
+def retrieve_market_context(k: int = 5) -> str:
+    results = cached_similarity_search(MARKET_INDEX_DIR, "market outlook and stock opportunities", k=k,
+                                       load_store=load_vector_store, hybrid=True)
+    return "\n\n".join([doc.page_content[:2000] for doc in results])
+
+
+# Catalog schemes for each bucket the allocation invests in, screened to the user's risk tolerance
+def catalog_funds(user_data: User, allocation: dict) -> dict:
+    return get_catalog().shortlist(user_data.risk_profile, allocation=allocation)
 
-    # Load market context
-    vectorstore = load_vector_store()
-    results = vectorstore.similarity_search("market outlook and stock opportunities", k=k)
-    context_chunks = "\n\n".join([doc.page_content[:2000] for doc in results])
 
+# Structured inputs of the portfolio prompt (cache key); keep in sync with build_portfolio_prompt
+def portfolio_prompt_inputs(user_data: User, allocation: dict, context_chunks: str) -> dict:
+    return {
+        "kind": "portfolio",
+        "name": user_data.name,
+        "age": user_data.age,
+        "risk_profile": user_data.risk_profile,
+        "income": round(user_data.income, 2),
+        "expenses": round(user_data.expenses, 2),
+        "emergency_fund": round(user_data.emergency_fund, 2),
+        "insurances": list(user_data.insurances),
+        "loans": [(loan.amount, loan.interest_rate) for loan in user_data.loans],
+        "goals": [(goal.name, goal.target_amount, goal.months_to_achieve) for goal in user_data.goals],
+        "allocation": {k: allocation[k] for k in ("equity", "bonds", "commodities")},
+        "catalog_funds": catalog_funds(user_data, allocation),
+        "context_sha256": hashlib.sha256(context_chunks.encode("utf-8")).hexdigest(),
+    }
+
+
+def build_portfolio_prompt(user_data: User, allocation: dict, context_chunks: str) -> str:
     # Format loans
     loans = "\n".join([f"   - {loan.__class__.__name__}: ${loan.amount} at {loan.interest_rate}% interest" for loan in
                        user_data.loans])
@@ -68,6 +99,10 @@ def query_ollama_for_portfolio(user_data: User, allocation: dict, k: int = 5, re
 - Commodities: {allocation['commodities']}%
 """
 
+    # Schemes from our own catalog the picks may include
+    funds = "\n".join(f"- {bucket.title()}: {', '.join(names)}"
+                      for bucket, names in catalog_funds(user_data, allocation).items() if names)
+
     # Prompt for LLM
     prompt = f"""
 You are a financial advisor AI.
@@ -85,6 +120,9 @@ Include:
 
 {alloc_text}
 
+### FUNDS FROM OUR CATALOG (may be included among the picks)
+{funds or "- None"}
+
 ### MARKET OUTLOOK
 {context_chunks}
 
@@ -105,42 +143,72 @@ RETURN OUTPUT IN JSON FORMAT AS:
 
 Only return the JSON — no extra explanation.
 """
+    return prompt
+
+
+# Query Ollama with context
+async def query_ollama_for_portfolio(user_data: User, allocation: dict, k: int = 5, return_dict: bool = True):
+    """
+    Generate structured portfolio recommendation based on user profile, allocation, and market context.
+    """
 
-    # Send to Ollama
-    response = requests.post(
-        "http://localhost:11434/api/generate",
-        json={
-            "model": "llama3.2:latest",
-            "prompt": prompt,
-            "stream": True
-        },
-        stream=True
-    )
-
-    # Collect streamed output
-    full_output = ""
-    for chunk in response.iter_lines():
-        if chunk:
-            try:
-                data = json.loads(chunk.decode("utf-8"))
-                full_output += data.get("response", "")
-            except json.JSONDecodeError:
-                continue
-
-    # Optional JSON parsing
-    if return_dict:
-        try:
-            json_start = full_output.find('{')
-            raw_output = json.loads(full_output[json_start:])
-
-            # Remove wrapper like "recommendations" and normalize keys
-            if isinstance(raw_output, dict) and "recommendations" in raw_output:
-                raw_output = raw_output["recommendations"]
-
-            cleaned = normalize_keys(raw_output)
-            return cleaned
-        except Exception as e:
-            print("⚠️ Error parsing JSON response:", e)
-            return {"error": "Failed to parse LLM output", "raw": full_output}
-    else:
-        return full_output.strip()
\ No newline at end of file
+    # Load market context off the event loop
+    context_chunks = await asyncio.to_thread(retrieve_market_context, k)
+    return await generate_portfolio(user_data, allocation, context_chunks, return_dict)
+
+
+async def generate_portfolio(user_data: User, allocation: dict, context_chunks: str, return_dict: bool = True):
+    """LLM half of `query_ollama_for_portfolio`, for callers that already have the market context."""
+    if not return_dict:
+        prompt = build_portfolio_prompt(user_data, allocation, context_chunks)
+        inputs = portfolio_prompt_inputs(user_data, allocation, context_chunks)
+        return (await cached_generate(prompt, inputs, tag=MARKET_INDEX_TAG, cacheable=portfolio_output_ok,
+                                      format="json")).strip()
+
+    parser = portfolio_parser()
+    recommendations = {bucket: [] for bucket in PICK_KEYS}
+    parsed = 0
+    async for kind, key, value in stream_portfolio(user_data, allocation, context_chunks, parser):
+        if kind == "item":
+            recommendations[key].append(value)
+        elif key is not None and key not in PICK_KEYS:
+            recommendations[key] = value
+        parsed += 1
+
+    if not parsed:
+        print("⚠️ Error parsing JSON response: no complete picks in the output")
+        return {"error": "Failed to parse LLM output", "raw": parser.text()}
+    if not parser.complete or parser.errors:
+        # Keep what closed cleanly rather than discarding the whole generation
+        print(f"⚠️ Partial JSON response: {parser.errors} malformed entries, complete={parser.complete}")
+        recommendations["incomplete"] = True
+    return recommendations
+
+
+def portfolio_parser() -> JSONStreamParser:
+    # Older prompts produced {"recommendations": {...}}; its members count as top-level
+    return JSONStreamParser(PICK_KEYS, normalize_key=normalize_key, wrappers=("recommendations",))
+
+
+def portfolio_output_ok(output: str) -> bool:
+    """Only well-formed outputs are cached; a truncated or malformed one is retried next time."""
+    parser = portfolio_parser()
+    parsed = parser.feed(output)
+    return bool(parsed) and parser.complete and not parser.errors
+
+
+async def stream_portfolio(user_data: User, allocation: dict, context_chunks: str,
+                           parser: JSONStreamParser | None = None) -> AsyncIterator[Tuple[str, str, object]]:
+    """
+    Yield ("item", bucket, pick) as soon as each pick's JSON object closes, and
+    ("field", key, value) for any other top-level member of the output.
+    """
+    prompt = build_portfolio_prompt(user_data, allocation, context_chunks)
+    inputs = portfolio_prompt_inputs(user_data, allocation, context_chunks)
+    parser = parser or portfolio_parser()
+
+    # JSON mode keeps the model from wrapping the object in prose or code fences
+    async for token in cached_stream_generate(prompt, inputs, tag=MARKET_INDEX_TAG,
+                                              cacheable=portfolio_output_ok, format="json"):
+        for kind, key, value in parser.feed(token):
+            yield kind, key, normalize_keys(value)
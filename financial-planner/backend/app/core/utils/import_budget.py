@@ -0,0 +1,69 @@
+# Measure (and enforce) how long it takes to import a module in a fresh
+# interpreter, and make sure no heavy ML dependency is loaded eagerly.
+#
+#   python -m app.core.utils.import_budget                # checks app.main
+#   python -m app.core.utils.import_budget --budget 1.0 --top 15
+import argparse
+import subprocess
+import sys
+
+from app.config import IMPORT_TIME_BUDGET_SECONDS
+
+# Modules that must only be imported on first use
+HEAVY_MODULES = ("torch", "transformers", "sentence_transformers", "faiss", "yfinance", "fitz",
+                 "langchain_community.vectorstores")
+
+
+def measure_import(module: str) -> tuple[float, list[tuple[int, str]], list[str]]:
+    """
+    Import `module` in a subprocess with -X importtime.
+    Returns (total seconds, [(cumulative us, module)], heavy modules that got imported).
+    """
+    probe = (
+        f"import sys; import {module}; "
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", probe],
+                          capture_output=True, text=True)
+    if proc.returncode != 0:
+        raise RuntimeError(f"Importing {module} failed:\n{proc.stderr[-2000:]}")
+
+    timings = []
+    for line in proc.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        timings.append((int(cumulative), name.rstrip()))
+
+    # Top-level entries (no indentation) add up to the whole import
+    total_us = sum(us for us, name in timings if not name.startswith("  "))
+    heavy = [m for m in proc.stdout.strip().split(",") if m]
+    return total_us / 1e6, timings, heavy
+
+
+def check_import_budget(module: str = "app.main", budget: float = IMPORT_TIME_BUDGET_SECONDS,
+                        top: int = 10) -> bool:
+    seconds, timings, heavy = measure_import(module)
+    print(f"⏱️ import {module}: {seconds:.3f}s (budget {budget:.3f}s)")
+    for us, name in sorted(timings, reverse=True)[:top]:
+        print(f"   {us / 1000:9.1f} ms  {name.strip()}")
+
+    ok = True
+    if seconds > budget:
+        print(f"❌ Import time over budget by {seconds - budget:.3f}s")
+        ok = False
+    if heavy:
+        print(f"❌ Heavy modules imported eagerly: {', '.join(heavy)}")
+        ok = False
+    if ok:
+        print("✅ Import budget OK")
+    return ok
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check the import-time budget of a module.")
+    parser.add_argument("--module", default="app.main")
+    parser.add_argument("--budget", type=float, default=IMPORT_TIME_BUDGET_SECONDS, help="Seconds")
+    parser.add_argument("--top", type=int, default=10, help="Show the N slowest imports")
+    args = parser.parse_args()
+    sys.exit(0 if check_import_budget(args.module, args.budget, args.top) else 1)
@@ -0,0 +1,224 @@
+# Columnar view of the fund universe with secondary indexes for screening.
+# The nested records in investment_data stay the source of truth; this module
+# flattens them into one pandas frame (one row per scheme) plus position
+# indexes on the categorical columns, so screens are index lookups followed
+# by vectorized numeric masks instead of scans over dicts.
+from collections import defaultdict
+
+import numpy as np
+import pandas as pd
+
+RETURN_WINDOWS = ("1yr", "3yr", "5yr", "10yr", "since_inception")
+NUMERIC_COLUMNS = ("expense_ratio", "sharpe_ratio", "standard_deviation", "drawdown", "aum_cr")
+INDEXED_COLUMNS = ("category", "sub_category", "risk_level", "term", "asset_class")
+
+RISK_RANK = {"Low": 0, "Low-Medium": 1, "Medium": 2, "Moderate": 2, "High": 3}
+
+# Highest scheme risk each user risk profile is shown
+PROFILE_MAX_RISK = {"conservative": "Low-Medium", "balanced": "Medium", "aggressive": "High"}
+
+# Bucket of the planner's allocation (equity / bonds / commodities) a scheme belongs to
+COMMODITY_SUB_CATEGORIES = {"Gold", "Silver"}
+
+
+ASSET_CLASSES = ("equity", "bonds", "commodities")
+
+
+def max_risk_for(risk_profile: str) -> str:
+    """Highest scheme risk level shown to a user risk profile (unknown profiles count as balanced)."""
+    return PROFILE_MAX_RISK.get((risk_profile or "").lower(), PROFILE_MAX_RISK["balanced"])
+
+
+def asset_class(record: dict) -> str:
+    if record.get("category") == "Bond":
+        return "bonds"
+    if record.get("sub_category") in COMMODITY_SUB_CATEGORIES:
+        return "commodities"
+    return "equity"
+
+
+class FundCatalog:
+    def __init__(self, records: dict):
+        self.records = records
+        rows = []
+        for name, record in records.items():
+            returns = record.get("returns") or {}
+            row = {
+                "name": name,
+                "category": record.get("category"),
+                "sub_category": record.get("sub_category"),
+                "term": record.get("term"),
+                "risk_level": record.get("risk_level"),
+                "asset_class": asset_class(record),
+                "fund_house": record.get("fund_house"),
+                "isin": record.get("isin"),
+            }
+            for column in NUMERIC_COLUMNS:
+                row[column] = record.get(column)
+            for window in RETURN_WINDOWS:
+                row[f"return_{window}"] = returns.get(window)
+            rows.append(row)
+
+        frame = pd.DataFrame(rows, columns=list(rows[0]) if rows else None)
+        numeric = list(NUMERIC_COLUMNS) + [f"return_{w}" for w in RETURN_WINDOWS]
+        frame[numeric] = frame[numeric].apply(pd.to_numeric, errors="coerce").astype(np.float64)
+        frame["risk_rank"] = frame["risk_level"].map(RISK_RANK).fillna(len(RISK_RANK)).astype(np.int64)
+        self.frame = frame.set_index("name", drop=False)
+        self._names = self.frame["name"].to_numpy()
+        self._arrays = {column: self.frame[column].to_numpy() for column in ["risk_rank"] + numeric}
+
+        # value -> row positions; "Short-Mid" terms are indexed under both "Short" and "Mid"
+        self._indexes = {}
+        for column in INDEXED_COLUMNS:
+            positions = defaultdict(list)
+            for position, value in enumerate(self.frame[column].tolist()):
+                if value is None:
+                    continue
+                keys = value.split("-") if column == "term" else [value]
+                for key in keys:
+                    positions[key].append(position)
+            self._indexes[column] = {k: np.array(v, dtype=np.int64) for k, v in positions.items()}
+
+    def __len__(self) -> int:
+        return len(self.frame)
+
+    def get(self, name: str) -> dict | None:
+        """Original nested record for a scheme."""
+        return self.records.get(name)
+
+    def values(self, column: str) -> list:
+        return sorted(self._indexes[column])
+
+    def _positions(self, column: str, wanted) -> np.ndarray:
+        wanted = [wanted] if isinstance(wanted, str) else list(wanted)
+        index = self._indexes[column]
+        hits = [index[value] for value in wanted if value in index]
+        return np.unique(np.concatenate(hits)) if hits else np.empty(0, dtype=np.int64)
+
+    def _select(self, category=None, sub_category=None, term=None, risk_level=None, asset_class=None,
+               max_risk: str | None = None, max_expense_ratio: float | None = None,
+               min_sharpe: float | None = None, min_returns: dict | None = None,
+               rank_by: str | None = "sharpe_ratio", ascending: bool = False,
+               limit: int | None = None) -> np.ndarray:
+        positions = None
+        for column, wanted in (("category", category), ("sub_category", sub_category), ("term", term),
+                               ("risk_level", risk_level), ("asset_class", asset_class)):
+            if wanted is not None:
+                hits = self._positions(column, wanted)
+                positions = hits if positions is None else np.intersect1d(positions, hits, assume_unique=True)
+        if positions is None:
+            positions = np.arange(len(self.frame))
+
+        columns = self._arrays
+        mask = np.ones(len(positions), dtype=bool)
+        if max_risk is not None:
+            if max_risk not in RISK_RANK:
+                raise ValueError(f"Unknown risk level {max_risk!r}; expected one of {', '.join(RISK_RANK)}")
+            mask &= columns["risk_rank"][positions] <= RISK_RANK[max_risk]
+        if max_expense_ratio is not None:
+            mask &= columns["expense_ratio"][positions] <= max_expense_ratio
+        if min_sharpe is not None:
+            mask &= columns["sharpe_ratio"][positions] >= min_sharpe
+        for window, minimum in (min_returns or {}).items():
+            mask &= columns[f"return_{window}"][positions] >= minimum
+        positions = positions[mask]
+
+        if rank_by is not None:
+            keys = columns[rank_by][positions] if rank_by in columns else self.frame[rank_by].to_numpy()[positions]
+            if not ascending:
+                keys = -keys
+            # NaN sorts last either way
+            positions = positions[np.argsort(keys, kind="stable")]
+        if limit is not None:
+            positions = positions[:limit]
+        return positions
+
+    def screen(self, **filters) -> pd.DataFrame:
+        """Schemes matching every given filter, ranked by `rank_by` (missing values last).
+
+        Categorical filters (category, sub_category, term, risk_level,
+        asset_class) take a value or a list of values. Numeric filters are
+        max_risk, max_expense_ratio, min_sharpe and `min_returns`, a mapping of
+        return window ("1yr", "3yr", ...) to a minimum return in %.
+        """
+        return self.frame.iloc[self._select(**filters)]
+
+    def screen_names(self, **filters) -> list[str]:
+        """Like `screen`, but only the scheme names (skips building a frame)."""
+        return self._names[self._select(**filters)].tolist()
+
+    def shortlist(self, risk_profile: str, per_asset_class: int = 2, allocation: dict | None = None) -> dict:
+        """Best-ranked scheme names per allocation bucket within a user's risk tolerance.
+
+        With an `allocation`, only buckets it puts money into are listed, and a
+        bucket with no scheme inside the tolerance gets its lowest-risk schemes
+        instead of none, so the shortlist never contradicts the allocation.
+        """
+        buckets = [b for b in ASSET_CLASSES if allocation is None or (allocation.get(b) or 0) > 0]
+        max_risk = max_risk_for(risk_profile)
+        shortlist = {}
+        for bucket in buckets:
+            names = self.screen_names(asset_class=bucket, max_risk=max_risk, limit=per_asset_class)
+            if not names and allocation is not None:
+                names = self.screen_names(asset_class=bucket, rank_by="risk_rank", ascending=True,
+                                          limit=per_asset_class)
+            shortlist[bucket] = names
+        return shortlist
+
+    def peers(self, name: str, risk_profile: str | None = None, limit: int = 2) -> list[str]:
+        """Best-ranked other schemes of the same allocation bucket, within a risk profile's tolerance."""
+        if name not in self.frame.index:
+            return []
+        bucket = self.frame.at[name, "asset_class"]
+        max_risk = max_risk_for(risk_profile) if risk_profile else None
+        names = self.screen_names(asset_class=bucket, max_risk=max_risk, limit=limit + 1)
+        return [peer for peer in names if peer != name][:limit]
+
+
+def get_catalog() -> FundCatalog:
+    from app.data.investment_data import extended_investment_db
+    from app.llm.resource_registry import get_resource
+    return get_resource("fund_catalog", lambda: FundCatalog(extended_investment_db))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description="Benchmark catalog screening on a synthetic fund universe.")
+    parser.add_argument("--funds", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    from app.data.investment_data import extended_investment_db
+
+    templates = list(extended_investment_db.items())
+    rng = np.random.default_rng(0)
+    universe = {}
+    for i in range(args.funds):
+        name, record = templates[i % len(templates)]
+        record = dict(record)
+        record["expense_ratio"] = round(float(rng.uniform(0.1, 2.0)), 2)
+        if record.get("sharpe_ratio") is not None:
+            record["sharpe_ratio"] = round(float(rng.normal(1.0, 0.3)), 2)
+        universe[f"{name} #{i}"] = record
+
+    start = time.perf_counter()
+    catalog = FundCatalog(universe)
+    print(f"Built catalog of {len(catalog)} schemes in {time.perf_counter() - start:.3f}s")
+
+    query = dict(asset_class="equity", term="Mid", max_risk="High", max_expense_ratio=1.0, min_sharpe=1.0)
+
+    def scan():
+        hits = [(name, r) for name, r in universe.items()
+                if asset_class(r) == "equity" and "Mid" in r["term"].split("-")
+                and RISK_RANK.get(r["risk_level"], 9) <= RISK_RANK["High"]
+                and r["expense_ratio"] <= 1.0 and (r.get("sharpe_ratio") or -np.inf) >= 1.0]
+        return sorted(hits, key=lambda item: -item[1]["sharpe_ratio"])
+
+    for label, fn in [("dict scan", scan), ("FundCatalog.screen", lambda: catalog.screen(**query)),
+                      ("FundCatalog.screen_names", lambda: catalog.screen_names(**query))]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            result = fn()
+        print(f"{label}: {1000 * (time.perf_counter() - start) / args.repeat:.3f} ms ({len(result)} hits)")
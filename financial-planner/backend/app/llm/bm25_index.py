@@ -0,0 +1,129 @@
+# Okapi BM25 inverted index over the documents of a resident FAISS store.
+# Dense MiniLM retrieval ranks exact terms ("exit load", "80C", "LTCG",
+# "Sharpe ratio") poorly; this index catches them and is fused with the
+# vector ranking by reciprocal rank fusion (RRF).
+# Per-posting BM25 weights are precomputed at build time, so a query is a few
+# numpy scatter-adds over the postings of its terms.
+import os
+import re
+import time
+from collections import Counter, defaultdict
+
+import numpy as np
+
+from app.llm.resource_registry import get_versioned_resource
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+RRF_K = 60
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    def __init__(self, documents: list, k1: float = 1.5, b: float = 0.75, version: int = 0):
+        self.version = version
+        self.documents = documents
+        self._field_rows = {}
+
+        term_counts = [Counter(tokenize(doc.page_content)) for doc in documents]
+        lengths = np.array([sum(counts.values()) for counts in term_counts], dtype=np.float32)
+        avg_length = float(lengths.mean()) if len(documents) else 0.0
+
+        rows = defaultdict(list)
+        freqs = defaultdict(list)
+        for row, counts in enumerate(term_counts):
+            for term, tf in counts.items():
+                rows[term].append(row)
+                freqs[term].append(tf)
+
+        n = len(documents)
+        norm = k1 * (1 - b + b * lengths / avg_length) if avg_length else lengths
+        self.postings = {}
+        for term, term_rows in rows.items():
+            term_rows = np.array(term_rows, dtype=np.int32)
+            tf = np.array(freqs[term], dtype=np.float32)
+            idf = np.log(1 + (n - len(term_rows) + 0.5) / (len(term_rows) + 0.5))
+            self.postings[term] = (term_rows, idf * tf * (k1 + 1) / (tf + norm[term_rows]))
+
+    @classmethod
+    def from_vectorstore(cls, vectorstore, version: int = 0) -> "BM25Index":
+        documents = [vectorstore.docstore.search(docstore_id)
+                     for docstore_id in vectorstore.index_to_docstore_id.values()]
+        return cls(documents, version=version)
+
+    def _rows_matching(self, filter: dict) -> np.ndarray:
+        allowed = None
+        for field, value in filter.items():
+            if field not in self._field_rows:
+                by_value = defaultdict(list)
+                for row, doc in enumerate(self.documents):
+                    by_value[doc.metadata.get(field)].append(row)
+                self._field_rows[field] = {v: np.array(r, dtype=np.int32) for v, r in by_value.items()}
+            rows = self._field_rows[field].get(value, np.empty(0, dtype=np.int32))
+            allowed = rows if allowed is None else np.intersect1d(allowed, rows)
+        return allowed
+
+    def search(self, query: str, k: int, filter: dict | None = None) -> list:
+        """Top-k documents by BM25 score; documents with no query term are never returned."""
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)):
+            posting = self.postings.get(term)
+            if posting is not None:
+                term_rows, weights = posting
+                scores[term_rows] += weights
+
+        if filter:
+            allowed = self._rows_matching(filter)
+            masked = np.zeros_like(scores)
+            masked[allowed] = scores[allowed]
+            scores = masked
+
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(-scores[hits], k - 1)[:k]]
+        hits = hits[np.argsort(-scores[hits], kind="stable")]
+        return [self.documents[row] for row in hits]
+
+
+def get_bm25_index(index_dir: str, vectorstore) -> BM25Index:
+    """BM25 over the resident index's documents, rebuilt whenever the index version changes."""
+    key = f"bm25:{os.path.abspath(index_dir)}"
+    version = vectorstore.version
+    return get_versioned_resource(key, version, lambda: BM25Index.from_vectorstore(vectorstore, version))
+
+
+def reciprocal_rank_fusion(rankings: list[list], k: int, rrf_k: int = RRF_K) -> list:
+    """Merge ranked document lists by sum of 1 / (rrf_k + rank)."""
+    scores = {}
+    docs = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking):
+            scores[id(doc)] = scores.get(id(doc), 0.0) + 1.0 / (rrf_k + rank + 1)
+            docs[id(doc)] = doc
+    best = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [docs[doc_id] for doc_id in best]
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from app.data.fund_notes import rag_documents_full
+    from langchain.schema import Document
+
+    parser = argparse.ArgumentParser(description="Time BM25 lookups over the curated fund notes.")
+    parser.add_argument("queries", nargs="*", default=["exit load", "80C tax saving", "LTCG", "Sharpe ratio"])
+    parser.add_argument("-k", type=int, default=3)
+    parser.add_argument("--repeat", type=int, default=1000)
+    args = parser.parse_args()
+
+    index = BM25Index([Document(page_content=text, metadata={"fund": fund})
+                       for fund, texts in rag_documents_full.items() for text in texts])
+    print(f"{len(index.documents)} documents, {len(index.postings)} terms")
+    for query in args.queries:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            hits = index.search(query, args.k)
+        per_query_us = 1e6 * (time.perf_counter() - start) / args.repeat
+        print(f"{query!r}: {per_query_us:.1f} µs -> {[doc.metadata['fund'] for doc in hits]}")
@@ -0,0 +1,169 @@
+# Persistent, content-addressed embedding cache.
+# Vectors are appended to a float32 matrix file (read through np.memmap) and
+# an SQLite offset index maps sha256(text) -> row. One directory per model, so
+# index builds, warm restarts and queries never re-run the transformer on
+# text that was embedded before, and the model itself is only loaded when
+# there is something new to embed.
+# Appends take an exclusive file lock (fcntl); where that is unavailable
+# (Windows) the cache is not used at all, see FILE_LOCKING.
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.config import EMBEDDING_CACHE_DIR
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+FILE_LOCKING = fcntl is not None
+
+
+def text_hash(text: str, kind: str = "document") -> str:
+    prefix = "" if kind == "document" else f"{kind}\0"
+    return hashlib.sha256(f"{prefix}{text}".encode("utf-8")).hexdigest()
+
+
+class EmbeddingStore:
+    """Append-only float32 matrix + hash -> row index for one embedding model."""
+
+    def __init__(self, model_name: str, root: str = EMBEDDING_CACHE_DIR):
+        self.directory = os.path.join(root, re.sub(r"[^A-Za-z0-9_.-]+", "__", model_name))
+        os.makedirs(self.directory, exist_ok=True)
+        self.vectors_path = os.path.join(self.directory, "vectors.f32")
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(os.path.join(self.directory, "index.sqlite3"), check_same_thread=False)
+        self._db.execute("CREATE TABLE IF NOT EXISTS rows (hash TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._db.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._db.commit()
+        self._rows = dict(self._db.execute("SELECT hash, row FROM rows"))
+        self.dim = None
+        self._load_dim()
+        self._matrix = None
+
+    def _load_dim(self) -> int | None:
+        # Set by whichever process wrote the first vectors, possibly after we opened the store
+        if self.dim is None:
+            dim = self._db.execute("SELECT value FROM meta WHERE key = 'dim'").fetchone()
+            self.dim = int(dim[0]) if dim else None
+        return self.dim
+
+    def __len__(self):
+        return len(self._rows)
+
+    def _refresh_rows(self, hashes: list[str]):
+        # Another process may have appended these since we loaded the index
+        placeholders = ",".join("?" * len(hashes))
+        for h, row in self._db.execute(f"SELECT hash, row FROM rows WHERE hash IN ({placeholders})", hashes):
+            self._rows[h] = row
+
+    def _matrix_view(self, min_rows: int) -> np.ndarray:
+        if self._matrix is None or self._matrix.shape[0] < min_rows:
+            dim = self._load_dim()
+            rows = os.path.getsize(self.vectors_path) // (4 * dim)
+            self._matrix = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, dim))
+        return self._matrix
+
+    def lookup(self, hashes: list[str]) -> dict[str, np.ndarray]:
+        with self._lock:
+            missing = [h for h in hashes if h not in self._rows]
+            if missing:
+                self._refresh_rows(missing)
+            found = {h: self._rows[h] for h in hashes if h in self._rows}
+            if not found:
+                return {}
+            matrix = self._matrix_view(max(found.values()) + 1)
+            return {h: np.array(matrix[row]) for h, row in found.items()}
+
+    def add(self, hashes: list[str], vectors: np.ndarray):
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        with self._lock:
+            if self._load_dim() is None:
+                self._db.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('dim', ?)",
+                                 (str(vectors.shape[1]),))
+                self._db.commit()
+                self._load_dim()
+            if vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding size {vectors.shape[1]} does not match the cache's {self.dim}")
+            # Exclusive file lock so concurrent processes never interleave rows
+            with open(self.vectors_path, "ab") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    f.seek(0, os.SEEK_END)
+                    first_row = f.tell() // (4 * self.dim)
+                    f.write(vectors.tobytes())
+                    f.flush()
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+            entries = [(h, first_row + i) for i, h in enumerate(hashes)]
+            self._db.executemany("INSERT OR IGNORE INTO rows (hash, row) VALUES (?, ?)", entries)
+            self._db.commit()
+            self._rows.update(entries)
+
+
+class CachedEmbeddings(Embeddings):
+    """LangChain Embeddings that serves vectors from an EmbeddingStore and only
+    loads/runs the underlying model (`load_model()`) for unseen text."""
+
+    def __init__(self, model_name: str, load_model, root: str = EMBEDDING_CACHE_DIR):
+        self.model_name = model_name
+        self._load_model = load_model
+        self._model = None
+        self._model_lock = threading.Lock()
+        self.store = EmbeddingStore(model_name, root)
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def model(self):
+        if self._model is None:
+            with self._model_lock:
+                if self._model is None:
+                    self._model = self._load_model()
+        return self._model
+
+    def _embed(self, texts: list[str], kind: str) -> list[list[float]]:
+        hashes = [text_hash(text, kind) for text in texts]
+        found = self.store.lookup(hashes)
+
+        missing = {}
+        for h, text in zip(hashes, texts):
+            if h not in found:
+                missing.setdefault(h, text)
+        self.hits += len(texts) - sum(h not in found for h in hashes)
+        self.misses += len(missing)
+
+        if missing:
+            new_texts = list(missing.values())
+            if kind == "query":
+                new_vectors = [self.model.embed_query(text) for text in new_texts]
+            else:
+                new_vectors = self.model.embed_documents(new_texts)
+            new_vectors = np.asarray(new_vectors, dtype=np.float32)
+            self.store.add(list(missing), new_vectors)
+            found.update(zip(missing, new_vectors))
+
+        return [found[h].tolist() for h in hashes]
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        return self._embed(list(texts), "document") if texts else []
+
+    def embed_query(self, text: str) -> list[float]:
+        return self._embed([text], "query")[0]
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "model": self.model_name,
+            "model_loaded": self._model is not None,
+            "cached_vectors": len(self.store),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
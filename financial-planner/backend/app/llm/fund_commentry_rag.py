@@ -1,9 +1,11 @@
-import os
-from langchain_community.vectorstores import FAISS
+import sys
+
 from langchain.schema import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
 
+from app.config import FUND_INDEX_DIR
 from app.data.fund_notes import rag_documents_full
+from app.llm.incremental_index import update_index
+from app.llm.response_cache import FUND_INDEX_TAG
 
 
 # ----------------------------------------
@@ -17,25 +19,22 @@ from app.data.fund_notes import rag_documents_full
 # ----------------------------------------
 
 def build_fund_documents():
-    documents = rag_documents_full;
+    documents = []
     for fund_name, chunks in rag_documents_full.items():
-        for chunk in chunks:
-            documents.append(Document(page_content=chunk, metadata={"fund": fund_name}))
+        for i, chunk in enumerate(chunks):
+            documents.append(Document(page_content=chunk, metadata={"fund": fund_name, "chunk": i}))
     return documents
 
 # ----------------------------------------
 # 3. Build and Save Vector Store
 # ----------------------------------------
 
-def build_fund_rag_index(index_dir="rag_fund_index"):
+def build_fund_rag_index(index_dir=FUND_INDEX_DIR, rebuild=False):
     print("🚀 Building RAG index for curated fund data...")
     docs = build_fund_documents()
     print(f"📄 Total fund chunks: {len(docs)}")
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vectorstore = FAISS.from_documents(docs, embeddings)
-    os.makedirs(index_dir, exist_ok=True)
-    vectorstore.save_local(index_dir)
+    update_index(docs, index_dir, tag=FUND_INDEX_TAG, rebuild=rebuild)
     print(f"✅ Fund RAG index saved to {index_dir}/")
 
 if __name__ == "__main__":
-    build_fund_rag_index()
+    build_fund_rag_index(rebuild="--full" in sys.argv)
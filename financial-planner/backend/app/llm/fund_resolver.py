@@ -0,0 +1,128 @@
+# Fund-name resolution for the chatbot, built once from the catalog.
+# Lookup order: exact hash of the normalized text (names, aliases, ISINs),
+# then a memoized rapidfuzz match against the pre-normalized choices.
+# The fuzzy step scores whole strings (fuzz.ratio), so a typo in a fund name
+# still resolves but a single generic word ("bond", "hdfc") does not.
+import re
+from functools import lru_cache
+
+from rapidfuzz import fuzz, process
+
+from app.llm.resource_registry import get_resource
+
+# Hand-maintained abbreviations users actually type (never bare category
+# names such as "gold etf", which would name every scheme of that kind)
+FUND_ALIASES = {
+    "hdfc flexi": "HDFC Flexi Cap Fund",
+    "hdfc flexicap": "HDFC Flexi Cap Fund",
+    "axis bluechip": "Axis Bluechip Fund",
+    "axis blue chip": "Axis Bluechip Fund",
+    "goi bond": "GOI Savings Bond 2030",
+    "goi 2030": "GOI Savings Bond 2030",
+    "psu bond": "PSU Bank Bond",
+    "nippon gold": "Nippon India Gold ETF",
+    "icici silver": "ICICI Prudential Silver ETF",
+}
+
+# Words dropped to derive a short alias from the full scheme name
+GENERIC_WORDS = {"fund", "etf", "india", "prudential", "mutual", "scheme", "plan"}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_ISIN = re.compile(r"^[A-Z]{2}[A-Z0-9]{9}[0-9]$")
+
+
+def normalize(text: str) -> str:
+    return _NON_ALNUM.sub(" ", text.lower()).strip()
+
+
+class FundResolver:
+    def __init__(self, catalog: dict, aliases: dict | None = None, threshold: int = 80, memo_size: int = 4096):
+        self.threshold = threshold
+        self._exact = {}
+        for name, meta in catalog.items():
+            self._exact[normalize(name)] = name
+            if _ISIN.match(meta.get("isin") or ""):
+                self._exact[normalize(meta["isin"])] = name
+            short = [w for w in normalize(name).split() if w not in GENERIC_WORDS]
+            if len(short) > 1:  # a one-word short name ("gold") is too generic to mean one fund
+                self._exact.setdefault(" ".join(short), name)
+        for alias, name in (FUND_ALIASES if aliases is None else aliases).items():
+            if name in catalog:
+                self._exact.setdefault(normalize(alias), name)
+
+        self._choices = list(self._exact)
+        self._max_words = max((len(key.split()) for key in self._choices), default=0)
+        self._fuzzy = lru_cache(maxsize=memo_size)(self._fuzzy_match)
+
+    def _fuzzy_match(self, text: str) -> str | None:
+        if not self._choices:
+            return None
+        match, score, _ = process.extractOne(text, self._choices, scorer=fuzz.ratio)
+        return self._exact[match] if score >= self.threshold else None
+
+    def resolve(self, user_input: str) -> str | None:
+        """Canonical fund name for a user-typed fund reference, or None."""
+        text = normalize(user_input)
+        if not text:
+            return None
+        return self._exact.get(text) or self._fuzzy(text)
+
+    def resolve_all(self, message: str) -> list[str]:
+        """Funds mentioned anywhere in `message`, in order of first mention.
+
+        Scans word n-grams against the exact table only (names, aliases, ISINs),
+        longest first, so "hdfc flexi cap fund" is not also read as "hdfc flexi".
+        There is no fuzzy step: free text is full of words close to fund names.
+        """
+        words = normalize(message).split()
+        found = []
+        i = 0
+        while i < len(words):
+            for n in range(min(self._max_words, len(words) - i), 0, -1):
+                name = self._exact.get(" ".join(words[i:i + n]))
+                if name:
+                    if name not in found:
+                        found.append(name)
+                    i += n
+                    break
+            else:
+                i += 1
+        return found
+
+
+def get_fund_resolver() -> FundResolver:
+    from app.data.catalog import get_catalog
+    return get_resource("fund_resolver", lambda: FundResolver(get_catalog().records))
+
+
+if __name__ == "__main__":
+    import argparse
+    import time
+
+    from app.data.investment_data import extended_investment_db
+
+    parser = argparse.ArgumentParser(description="Micro-benchmark fund resolution.")
+    parser.add_argument("--repeat", type=int, default=20000)
+    args = parser.parse_args()
+
+    queries = ["HDFC Flexi Cap Fund", "hdfc flexi", "INF179K01HQ2", "nippon gold",
+               "axis blue chip fund", "icici prudential silver", "unknown smallcap"]
+    names = list(extended_investment_db.keys())
+
+    def legacy(user_input):
+        match, score, _ = process.extractOne(user_input.lower(), names)  # default WRatio scorer
+        return match if score >= 80 else None
+
+    resolver = FundResolver(extended_investment_db)
+    for query in queries:
+        print(f"{query!r}: legacy={legacy(query)!r} resolver={resolver.resolve(query)!r}")
+    message = "Should I move from HDFC flexi to nippon gold or the Axis Bluechip Fund?"
+    print(f"resolve_all: {resolver.resolve_all(message)}")
+
+    for label, fn in [("legacy extractOne", legacy), ("FundResolver.resolve", resolver.resolve)]:
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            for query in queries:
+                fn(query)
+        per_call_us = 1e6 * (time.perf_counter() - start) / (args.repeat * len(queries))
+        print(f"{label}: {per_call_us:.2f} µs/call")
@@ -1,21 +1,21 @@
-import requests
 from bs4 import BeautifulSoup
-from transformers import pipeline
 from langchain.schema import Document
 
-# Load FinBERT sentiment analyzer
-sentiment_pipeline = pipeline("sentiment-analysis", model="ProsusAI/finbert")
+from app.llm.incremental_index import id_prefix
+from app.llm.ingestion import Fetcher, IngestionError
+from app.llm.sentiment_engine import get_sentiment_engine
 
-def fetch_yahoo_finance_headlines():
+
+HEADLINE_SOURCE = "Yahoo Finance"
+
+
+def fetch_yahoo_finance_headlines(fetcher: Fetcher | None = None):
     url = "https://finance.yahoo.com/most-active"
-    headers = {
-        "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
-    }
+    fetcher = fetcher or Fetcher()
 
     headlines = []
     try:
-        response = requests.get(url, headers=headers, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = BeautifulSoup(fetcher.get_text(url, timeout=10), "html.parser")
         # Find news headlines inside table rows or anchor tags
         for tag in soup.select("a[href*='/quote/']"):
             text = tag.get_text(strip=True)
@@ -29,13 +29,15 @@ def fetch_yahoo_finance_headlines():
 def analyze_headline_sentiments(headlines):
     docs = []
     try:
-        results = sentiment_pipeline(headlines)
+        results = get_sentiment_engine().score(headlines)
         for i, result in enumerate(results):
+            if result is None:  # its micro-batch failed
+                continue
             docs.append(
                 Document(
                     page_content=headlines[i],
                     metadata={
-                        "source": "Yahoo Finance",
+                        "source": HEADLINE_SOURCE,
                         "sentiment": result['label'],
                         "score": result['score']
                     }
@@ -45,11 +47,15 @@ def analyze_headline_sentiments(headlines):
         print(f"[FinBERT Error] {e}")
     return docs
 
-def get_sentiment_documents():
+def get_sentiment_documents(fetcher: Fetcher | None = None):
     print("📰 Fetching Yahoo Finance headlines...")
-    headlines = fetch_yahoo_finance_headlines()
+    origins = [id_prefix("source", HEADLINE_SOURCE)]
+    headlines = fetch_yahoo_finance_headlines(fetcher)
     if not headlines:
-        print("⚠️ No headlines found.")
-        return []
+        # Most likely a fetch or layout failure; keep the indexed headlines
+        raise IngestionError("⚠️ No headlines found.", origins)
     print(f"📈 Analyzing {len(headlines)} headlines with FinBERT...")
-    return analyze_headline_sentiments(headlines)
\ No newline at end of file
+    docs = analyze_headline_sentiments(headlines)
+    if len(docs) < len(headlines):
+        raise IngestionError(f"[FinBERT Error] {len(headlines) - len(docs)} headlines unscored", origins, docs)
+    return docs
\ No newline at end of file
@@ -0,0 +1,172 @@
+# Incremental FAISS indexing.
+# Every document gets a stable id (from its metadata) and a fingerprint
+# (hash of id + content + metadata). A manifest stored next to the index maps
+# ids to fingerprints, so a refresh only embeds new or changed documents and
+# deletes vectors whose documents disappeared, except those of sources that
+# failed to fetch in this run.
+import hashlib
+import json
+import os
+from itertools import islice
+from typing import Callable, Collection, Iterable
+
+from app.config import EMBEDDING_MODEL, EMBED_BATCH_SIZE
+from app.llm.resource_registry import MANIFEST_FILE, get_embeddings, put_vector_store
+from app.llm.response_cache import response_cache
+
+_ID_FIELDS = ("ticker", "fund", "source")
+# Metadata that changes on every fetch without the content changing (e.g. the
+# scrape date); left out of the fingerprint so unchanged text is not re-embedded
+VOLATILE_METADATA = ("date",)
+
+
+def _sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def document_id(doc) -> str:
+    """Stable identity: explicit doc_id, else ticker/fund/source (+ chunk number)."""
+    meta = doc.metadata
+    if "doc_id" in meta:
+        return str(meta["doc_id"])
+    for field in _ID_FIELDS:
+        if field in meta:
+            base = f"{field}:{meta[field]}"
+            return f"{base}:{meta['chunk']}" if "chunk" in meta else base
+    return f"content:{_sha256(doc.page_content)[:16]}"
+
+
+def id_prefix(field: str, value) -> str:
+    """Prefix shared by every document id derived from `field` = `value` (see `document_id`)."""
+    return f"{field}:{value}"
+
+
+def _has_prefix(doc_id: str, prefixes: Collection[str]) -> bool:
+    # ids extend a prefix with ":<chunk>" or "#<content hash>"
+    return any(doc_id == p or doc_id.startswith((f"{p}:", f"{p}#")) for p in prefixes)
+
+
+def document_fingerprint(doc_id: str, doc) -> str:
+    stable = {k: v for k, v in doc.metadata.items() if k not in VOLATILE_METADATA}
+    metadata = json.dumps(stable, sort_keys=True, default=str)
+    return _sha256(f"{doc_id}\0{doc.page_content}\0{metadata}")
+
+
+# -----------------------------
+# Manifest
+# -----------------------------
+
+def load_manifest(index_dir: str) -> dict:
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {"version": 0, "embedding_model": EMBEDDING_MODEL, "documents": {}}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_manifest(index_dir: str, manifest: dict):
+    path = os.path.join(index_dir, MANIFEST_FILE)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+# -----------------------------
+# Incremental Update
+# -----------------------------
+
+def _load_existing(index_dir: str, manifest: dict):
+    from langchain_community.vectorstores import FAISS
+
+    if manifest["embedding_model"] != EMBEDDING_MODEL or not manifest["documents"]:
+        return None
+    if not os.path.exists(os.path.join(index_dir, "index.faiss")):
+        return None
+    return FAISS.load_local(index_dir, get_embeddings(), allow_dangerous_deserialization=True)
+
+
+def update_index(documents: Iterable, index_dir: str, tag: str | None = None, prune: bool = True,
+                 rebuild: bool = False, batch_size: int = EMBED_BATCH_SIZE,
+                 keep: Callable[[], Collection[str] | None] | None = None) -> dict:
+    """
+    Bring the FAISS index in `index_dir` in line with `documents` (consumed lazily).
+    Only new/changed documents are embedded; with `prune`, documents not seen
+    in this run are removed. `keep` is called once `documents` is exhausted and
+    returns id prefixes (see `id_prefix`) of sources that failed to fetch; their
+    documents are kept. If it returns None, nothing is pruned.
+    `rebuild` ignores the existing index and manifest.
+    Returns counts of added/updated/removed/unchanged documents.
+    """
+    from langchain_community.vectorstores import FAISS
+
+    manifest = load_manifest(index_dir)
+    vectorstore = None if rebuild else _load_existing(index_dir, manifest)
+    known = manifest["documents"] if vectorstore is not None else {}
+    fingerprints = {}
+    report = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+
+    def changed_documents():
+        for doc in documents:
+            doc_id = document_id(doc)
+            if doc_id in fingerprints:
+                # Same identity twice in one run (e.g. repeated source): key by content
+                doc_id = f"{doc_id}#{_sha256(doc.page_content)[:16]}"
+                if doc_id in fingerprints:
+                    continue
+            fingerprint = document_fingerprint(doc_id, doc)
+            fingerprints[doc_id] = fingerprint
+            if known.get(doc_id) == fingerprint:
+                report["unchanged"] += 1
+                continue
+            report["updated" if doc_id in known else "added"] += 1
+            yield doc_id, doc
+
+    pending = changed_documents()
+    while batch := list(islice(pending, batch_size)):
+        ids = [doc_id for doc_id, _ in batch]
+        docs = [doc for _, doc in batch]
+        if vectorstore is None:
+            vectorstore = FAISS.from_documents(docs, get_embeddings(), ids=ids)
+        else:
+            stale = [doc_id for doc_id in ids if doc_id in known]
+            if stale:
+                vectorstore.delete(stale)
+            vectorstore.add_documents(docs, ids=ids)
+        print(f"🧮 Embedded {report['added'] + report['updated']} new/changed documents...")
+
+    kept = keep() if keep is not None else ()
+    if kept is None:
+        print("⚠️ Some sources failed without naming their documents; skipping pruning.")
+        prune = False
+    removed = []
+    if prune and vectorstore is not None:
+        removed = [doc_id for doc_id in known if doc_id not in fingerprints and not _has_prefix(doc_id, kept)]
+        if removed:
+            vectorstore.delete(removed)
+            report["removed"] = len(removed)
+
+    if vectorstore is None:
+        print("⚠️ No documents collected; keeping the existing index.")
+        return report
+
+    removed_ids = set(removed)
+    documents_now = {doc_id: fp for doc_id, fp in known.items() if doc_id not in removed_ids}
+    documents_now.update(fingerprints)
+    changed = report["added"] or report["updated"] or report["removed"] or rebuild
+
+    if changed:
+        os.makedirs(index_dir, exist_ok=True)
+        vectorstore.save_local(index_dir)
+        manifest = {
+            "version": manifest.get("version", 0) + 1,
+            "embedding_model": EMBEDDING_MODEL,
+            "documents": documents_now,
+        }
+        save_manifest(index_dir, manifest)
+        put_vector_store(index_dir, vectorstore, manifest["version"])
+        if tag:
+            response_cache.invalidate(tag)
+
+    print(f"✅ Index {index_dir}/ v{manifest['version']}: {report}")
+    return report
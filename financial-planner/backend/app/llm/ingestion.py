@@ -0,0 +1,203 @@
+# Concurrent document ingestion for the RAG index builders.
+# Each source (articles, PDFs, ticker batches, sentiment pages, ...) runs on
+# its own bounded thread pool with its own timeout and retry policy, and
+# documents are yielded as soon as any task finishes so the embedding stage
+# can start before the slowest download is done.
+#
+# All network access goes through `Fetcher`, which can record responses to a
+# fixtures directory and replay them offline for reproducible benchmarks.
+#
+# A task whose fetch fails raises IngestionError naming the document id
+# prefixes it would have produced, so the index update keeps those documents
+# instead of pruning them as gone.
+import hashlib
+import json
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+import requests
+
+from app.config import INGEST_FIXTURES_DIR, INGEST_MODE
+
+USER_AGENT = "Mozilla/5.0 (Windows NT 10.0; Win64; x64)"
+
+
+# -----------------------------
+# 1. Fetcher (live / record / replay)
+# -----------------------------
+
+class Fetcher:
+    def __init__(self, mode: str = INGEST_MODE, fixtures_dir: str = INGEST_FIXTURES_DIR):
+        if mode not in ("live", "record", "replay"):
+            raise ValueError(f"Unknown ingestion mode: {mode}")
+        self.mode = mode
+        self.fixtures_dir = fixtures_dir
+        self._session = requests.Session()
+        self._session.headers["User-Agent"] = USER_AGENT
+        adapter = requests.adapters.HTTPAdapter(pool_connections=16, pool_maxsize=32)
+        self._session.mount("http://", adapter)
+        self._session.mount("https://", adapter)
+
+    def _fixture_path(self, kind: str, key: str, ext: str) -> str:
+        digest = hashlib.sha1(key.encode("utf-8")).hexdigest()
+        return os.path.join(self.fixtures_dir, kind, f"{digest}.{ext}")
+
+    def _require_fixture(self, path: str, key: str):
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"No recorded fixture for {key}")
+
+    def _replay(self, path: str, key: str) -> bytes:
+        self._require_fixture(path, key)
+        with open(path, "rb") as f:
+            return f.read()
+
+    def _record(self, path: str, data: bytes):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as f:
+            f.write(data)
+
+    def _with_retries(self, fn, retries: int, label: str):
+        for attempt in range(retries + 1):
+            try:
+                return fn()
+            except Exception as e:
+                if attempt == retries:
+                    raise
+                delay = 0.5 * 2 ** attempt
+                print(f"[Retry {attempt + 1}/{retries}] {label}: {e} (waiting {delay:.1f}s)")
+                time.sleep(delay)
+
+    def get(self, url: str, timeout: float = 10, retries: int = 2) -> bytes:
+        """Response body of a GET request."""
+        path = self._fixture_path("http", url, "bin")
+        if self.mode == "replay":
+            return self._replay(path, url)
+
+        def request():
+            response = self._session.get(url, timeout=timeout)
+            response.raise_for_status()
+            return response.content
+
+        content = self._with_retries(request, retries, url)
+        if self.mode == "record":
+            self._record(path, content)
+        return content
+
+    def get_text(self, url: str, timeout: float = 10, retries: int = 2) -> str:
+        return self.get(url, timeout, retries).decode("utf-8", errors="replace")
+
+    def history(self, tickers: list[str], period: str = "1y", retries: int = 2):
+        """Daily OHLCV for many tickers in one bulk download (columns: ticker, field)."""
+        import pandas as pd
+
+        key = f"{period}:{','.join(tickers)}"
+        path = self._fixture_path("history", key, "pkl")
+        if self.mode == "replay":
+            self._require_fixture(path, key)
+            return pd.read_pickle(path)
+
+        def download():
+            import yfinance as yf
+            return yf.download(tickers, period=period, group_by="ticker", threads=True,
+                               progress=False, auto_adjust=False)
+
+        frame = self._with_retries(download, retries, f"history {key}")
+        if self.mode == "record":
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            frame.to_pickle(path)
+        return frame
+
+    def profile(self, symbol: str, retries: int = 2) -> dict:
+        """yfinance `info` dict for one ticker."""
+        path = self._fixture_path("profile", symbol, "json")
+        if self.mode == "replay":
+            return json.loads(self._replay(path, symbol))
+
+        def info():
+            import yfinance as yf
+            return yf.Ticker(symbol).info
+
+        data = self._with_retries(info, retries, f"profile {symbol}")
+        if self.mode == "record":
+            self._record(path, json.dumps(data, default=str).encode("utf-8"))
+        return data
+
+
+# -----------------------------
+# 2. Sources & Pipeline
+# -----------------------------
+
+class IngestionError(Exception):
+    """A task could not fetch (all of) its data.
+
+    `origins`: id prefixes (incremental_index.id_prefix) of the documents it
+    failed to produce. `documents`: whatever it did produce.
+    """
+
+    def __init__(self, message: str, origins: Iterable[str], documents: list | None = None):
+        super().__init__(message)
+        self.origins = list(origins)
+        self.documents = documents or []
+
+
+@dataclass
+class Source:
+    """A named group of tasks; each task returns a list of Documents."""
+    name: str
+    tasks: list[Callable[[], list]]
+    workers: int = 4
+    stats: dict = field(default_factory=lambda: {"documents": 0, "errors": 0, "seconds": 0.0})
+    failed_origins: set = field(default_factory=set)
+    unscoped_failures: int = 0  # failures that did not say which documents they affect
+
+
+def iter_documents(sources: list[Source]) -> Iterator:
+    """
+    Run every source on its own bounded pool and yield documents as tasks finish.
+    A failing task is logged and counted; it never stops the other sources.
+    """
+    pools = []
+    futures = {}
+    started = time.perf_counter()
+    try:
+        for source in sources:
+            pool = ThreadPoolExecutor(max_workers=source.workers, thread_name_prefix=f"ingest-{source.name}")
+            pools.append(pool)
+            for task in source.tasks:
+                futures[pool.submit(task)] = source
+
+        for future in as_completed(futures):
+            source = futures[future]
+            source.stats["seconds"] = round(time.perf_counter() - started, 3)
+            try:
+                docs = future.result()
+            except IngestionError as e:
+                source.stats["errors"] += 1
+                source.failed_origins.update(e.origins)
+                print(e)
+                docs = e.documents
+            except Exception as e:
+                source.stats["errors"] += 1
+                source.unscoped_failures += 1
+                print(f"[{source.name} Error] {e}")
+                continue
+            source.stats["documents"] += len(docs)
+            yield from docs
+    finally:
+        for pool in pools:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+def failed_origins(sources: list[Source]) -> set[str] | None:
+    """Id prefixes of documents the last run failed to fetch; None if that is unknown."""
+    if any(source.unscoped_failures for source in sources):
+        return None
+    return set().union(*(source.failed_origins for source in sources))
+
+
+def ingestion_report(sources: list[Source]) -> dict:
+    """Per-source document/error counts and time until the source's last task finished."""
+    return {source.name: dict(source.stats) for source in sources}
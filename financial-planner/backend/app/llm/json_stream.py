@@ -0,0 +1,175 @@
+# Incremental parser for a JSON object arriving as a token stream.
+# Tokens are scanned once as they arrive; only the text of the value being
+# captured is kept (as a list of segments), so nothing is re-joined or
+# re-parsed per token. Each element of the arrays named in `item_keys` is
+# emitted as soon as its closing bracket arrives, and every other member of
+# the top-level object once it is complete:
+#
+#   {"equity_picks": [{...}, {...}], "note": "..."}
+#     -> ("item", "equity_picks", {...}), ("item", "equity_picks", {...}), ("field", "note", "...")
+#
+# Prose before the object and anything after it are ignored, and an element
+# that fails to parse is skipped, so a truncated or slightly malformed
+# generation still yields everything that closed cleanly.
+import json
+import re
+from typing import Callable, Iterable, List, Tuple
+
+_STRING_SPECIAL = re.compile(r'["\\]')
+_DELIMITERS = ",}]"
+
+
+class _Frame:
+    __slots__ = ("kind", "role", "key", "expecting_key")
+
+    def __init__(self, kind: str, role: str | None, key: str | None):
+        self.kind = kind          # "{" or "["
+        self.role = role          # "container" (members are reported), "items" (elements are) or None
+        self.key = key            # key of an "items" array
+        self.expecting_key = kind == "{"
+
+
+class JSONStreamParser:
+    def __init__(self, item_keys: Iterable[str], normalize_key: Callable[[str], str] = str,
+                 wrappers: Iterable[str] = ()):
+        """
+        `item_keys`: members whose array elements are emitted one by one.
+        `wrappers`: members holding an object whose members are treated as top-level
+        (e.g. {"recommendations": {"equity_picks": [...]}}).
+        Keys are compared after `normalize_key`.
+        """
+        self.item_keys = set(item_keys)
+        self.wrappers = set(wrappers)
+        self.normalize_key = normalize_key
+        self.complete = False     # the top-level object closed
+        self.errors = 0           # captured values that failed to parse
+        self._chunks = []
+        self._stack: List[_Frame] = []
+        self._in_string = False
+        self._escaped = False     # a backslash ended the previous chunk
+        self._key_parts = None    # raw segments of the object key being read
+        self._pending_key = None
+        self._capture = None      # (kind, key, "container" | "string" | "literal", depth)
+        self._capture_parts = []
+
+    def text(self) -> str:
+        """Everything fed so far."""
+        return "".join(self._chunks)
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, object]]:
+        """Consume one token; return the (kind, key, value) events it completed."""
+        self._chunks.append(chunk)
+        events = []
+        i, n = 0, len(chunk)
+        capture_start = 0
+        key_start = 0
+        if self._escaped and chunk:  # an empty token does not consume the escaped character
+            self._escaped = False
+            i = 1
+
+        while i < n and not self.complete:
+            if self._in_string:
+                match = _STRING_SPECIAL.search(chunk, i)
+                if match is None:
+                    break
+                j = match.start()
+                if chunk[j] == "\\":
+                    if j + 1 == n:
+                        self._escaped = True
+                    i = j + 2
+                    continue
+                self._in_string = False
+                i = j + 1
+                if self._key_parts is not None:
+                    self._key_parts.append(chunk[key_start:j])
+                    self._pending_key = self._decode_key("".join(self._key_parts))
+                    self._key_parts = None
+                elif self._capture is not None and self._capture[2] == "string" \
+                        and self._capture[3] == len(self._stack):
+                    events.extend(self._end_capture(chunk[capture_start:i]))
+                continue
+
+            c = chunk[i]
+            if not self._stack:
+                # Skip anything before the top-level object
+                start = chunk.find("{", i)
+                if start < 0:
+                    break
+                self._stack.append(_Frame("{", "container", None))
+                i = start + 1
+                continue
+
+            if self._capture is not None and self._capture[2] == "literal" \
+                    and self._capture[3] == len(self._stack) and (c in _DELIMITERS or c.isspace()):
+                events.extend(self._end_capture(chunk[capture_start:i]))
+
+            frame = self._stack[-1]
+            if c.isspace():
+                pass
+            elif c == ":":
+                frame.expecting_key = False
+            elif c == ",":
+                frame.expecting_key = frame.kind == "{"
+            elif c in "}]":
+                self._stack.pop()
+                if self._capture is not None and self._capture[2] == "container" \
+                        and self._capture[3] == len(self._stack):
+                    events.extend(self._end_capture(chunk[capture_start:i + 1]))
+                if not self._stack:
+                    self.complete = True
+            elif c == '"' and frame.kind == "{" and frame.expecting_key:
+                self._in_string = True
+                if self._capture is None:  # keys inside a captured value are json.loads' job
+                    self._key_parts = []
+                    key_start = i + 1
+            elif self._capture is None or c in '{["':
+                # Start of a value (literals only start once; the rest of their characters pass through)
+                role, key = None, None
+                if self._capture is None:
+                    role, key = self._begin_value(frame, c)
+                    if self._capture is not None:
+                        capture_start = i
+                if c in "{[":
+                    self._stack.append(_Frame(c, role, key))
+                elif c == '"':
+                    self._in_string = True
+            i += 1
+
+        if self._in_string and self._key_parts is not None:
+            self._key_parts.append(chunk[key_start:])
+        if self._capture is not None:
+            self._capture_parts.append(chunk[capture_start:])
+        return events
+
+    def _decode_key(self, raw: str) -> str | None:
+        try:
+            return self.normalize_key(json.loads('"' + raw + '"'))
+        except json.JSONDecodeError:
+            return None
+
+    def _begin_value(self, frame: _Frame, c: str) -> Tuple[str | None, str | None]:
+        """Decide what a value starting here is; returns the role/key for a frame it opens."""
+        depth = len(self._stack)
+        shape = "container" if c in "{[" else "string" if c == '"' else "literal"
+        if frame.role == "items":
+            self._capture = ("item", frame.key, shape, depth)
+        elif frame.role == "container" and frame.kind == "{":
+            key = self._pending_key
+            if key in self.item_keys and c == "[":
+                return "items", key
+            if key in self.wrappers and c == "{":
+                return "container", None
+            self._capture = ("field", key, shape, depth)
+        return None, None
+
+    def _end_capture(self, tail: str) -> List[Tuple[str, str, object]]:
+        kind, key, _, _ = self._capture
+        self._capture_parts.append(tail)
+        raw = "".join(self._capture_parts)
+        self._capture = None
+        self._capture_parts = []
+        try:
+            return [(kind, key, json.loads(raw))]
+        except json.JSONDecodeError:
+            self.errors += 1
+            return []
@@ -0,0 +1,232 @@
+# Admission control for the local Ollama server.
+# The model serves only a few generations at once, so every generation first
+# takes one of LLM_MAX_CONCURRENT_GENERATIONS slots. Callers beyond that wait
+# in a bounded queue per priority; a freed slot goes to the oldest waiter of
+# the most urgent priority (interactive chat before standard analysis before
+# batch jobs). A full queue rejects at once (429) and a waiter that outlives
+# its queue deadline gives up (503), so overload surfaces as a fast, retryable
+# error instead of unbounded latency.
+#
+# The priority travels with the request in a context variable: endpoints set
+# it once and it follows into tasks they spawn. A generation shared by several
+# requests (single_flight.py) runs under a SharedPriority instead, which rises
+# to the most urgent of its subscribers and re-queues the slot request when it
+# does, so a chat request that joins a batch job's generation is not left
+# waiting in the batch queue.
+import asyncio
+import heapq
+import itertools
+import threading
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+
+from app.config import (
+    LLM_MAX_CONCURRENT_GENERATIONS,
+    LLM_QUEUE_LIMITS,
+    LLM_QUEUE_TIMEOUTS,
+)
+
+PRIORITIES = ("interactive", "standard", "batch")  # most urgent first
+DEFAULT_PRIORITY = "standard"
+
+llm_priority: ContextVar[str] = ContextVar("llm_priority", default=DEFAULT_PRIORITY)
+llm_shared_priority: ContextVar["SharedPriority | None"] = ContextVar("llm_shared_priority", default=None)
+
+
+def _rank(priority: str) -> int:
+    return PRIORITIES.index(priority)
+
+
+def set_llm_priority(priority: str):
+    """Set the priority of LLM calls made by the current request (or task)."""
+    if priority not in PRIORITIES:
+        raise ValueError(f"Unknown LLM priority: {priority}")
+    llm_priority.set(priority)
+
+
+class LLMUnavailable(RuntimeError):
+    """The scheduler did not admit a generation; safe to retry after `retry_after` seconds."""
+    status_code = 503
+
+    def __init__(self, message: str, retry_after: int = 1):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class LLMQueueFull(LLMUnavailable):
+    status_code = 429
+
+
+class LLMQueueTimeout(LLMUnavailable):
+    status_code = 503
+
+
+class SharedPriority:
+    """Priority of work done on behalf of several requests: the most urgent of theirs."""
+
+    def __init__(self, priority: str):
+        self.priority = priority
+        self._queued = None  # (scheduler, waiter) while a slot request is waiting
+
+    def raise_to(self, priority: str):
+        if _rank(priority) >= _rank(self.priority):
+            return
+        self.priority = priority
+        if self._queued is not None:
+            scheduler, waiter = self._queued
+            scheduler._promote(waiter, priority)
+
+
+class _Waiter:
+    __slots__ = ("priority", "arrival", "future", "deadline", "timer")
+
+    def __init__(self, priority: str, arrival: int, future: asyncio.Future, deadline: float):
+        self.priority = priority
+        self.arrival = arrival
+        self.future = future
+        self.deadline = deadline
+        self.timer = None
+
+
+class LLMScheduler:
+    def __init__(self, max_concurrency: int, queue_limits: dict, queue_timeouts: dict):
+        self.max_concurrency = max_concurrency
+        self.queue_limits = queue_limits
+        self.queue_timeouts = queue_timeouts
+        self.active = 0
+        self._waiters = []  # heap of (priority rank, arrival, future)
+        self._arrivals = itertools.count()
+        self._lock = threading.Lock()  # guards stats only; scheduling runs on the event loop
+        self._stats = {
+            priority: {"queued": 0, "admitted": 0, "rejected": 0, "timed_out": 0,
+                       "total_wait": 0.0, "max_wait": 0.0}
+            for priority in PRIORITIES
+        }
+
+    @asynccontextmanager
+    async def slot(self, priority: str | None = None):
+        """Hold one generation slot for the duration of the block.
+
+        Without an explicit `priority`, the task's SharedPriority (if any) or
+        request priority is used.
+        """
+        shared = llm_shared_priority.get() if priority is None else None
+        if priority is None:
+            priority = shared.priority if shared is not None else llm_priority.get()
+        await self._acquire(priority, shared)
+        try:
+            yield
+        finally:
+            self._release()
+
+    async def _acquire(self, priority: str, shared: SharedPriority | None = None):
+        stats = self._stats[priority]
+        if self.active < self.max_concurrency and not self._waiters:
+            self.active += 1
+            self._record_wait(stats, 0.0)
+            return
+
+        if stats["queued"] >= self.queue_limits[priority]:
+            with self._lock:
+                stats["rejected"] += 1
+            raise LLMQueueFull(f"LLM queue for {priority} requests is full", retry_after=1)
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        waiter = _Waiter(priority, next(self._arrivals), loop.create_future(),
+                         start + self.queue_timeouts[priority])
+        heapq.heappush(self._waiters, (_rank(priority), waiter.arrival, waiter.future))
+        waiter.timer = loop.call_at(waiter.deadline, self._expire, waiter)
+        stats["queued"] += 1
+        if shared is not None:
+            shared._queued = (self, waiter)
+        try:
+            await waiter.future
+        except LLMQueueTimeout:
+            with self._lock:
+                self._stats[waiter.priority]["timed_out"] += 1
+            raise
+        except asyncio.CancelledError:
+            # The slot may have been handed over just as we were cancelled; pass it on
+            future = waiter.future
+            if future.done() and not future.cancelled() and future.exception() is None:
+                self._release()
+            else:
+                self._forget(future)
+            raise
+        finally:
+            waiter.timer.cancel()
+            self._stats[waiter.priority]["queued"] -= 1
+            if shared is not None:
+                shared._queued = None
+        self._record_wait(self._stats[waiter.priority], loop.time() - start)
+
+    def _expire(self, waiter: _Waiter):
+        if waiter.future.done():
+            return  # admitted just as the deadline hit
+        self._forget(waiter.future)
+        timeout = self.queue_timeouts[waiter.priority]
+        waiter.future.set_exception(LLMQueueTimeout(
+            f"No LLM capacity for {waiter.priority} request within {timeout:g}s",
+            retry_after=max(1, round(timeout / 2)),
+        ))
+
+    def _promote(self, waiter: _Waiter, priority: str):
+        """Move a queued request to a more urgent priority, keeping its place by arrival."""
+        if waiter.future.done():
+            return
+        self._forget(waiter.future)
+        self._stats[waiter.priority]["queued"] -= 1
+        self._stats[priority]["queued"] += 1
+        waiter.priority = priority
+        heapq.heappush(self._waiters, (_rank(priority), waiter.arrival, waiter.future))
+        # Never wait longer than a request of the new priority would from now on
+        loop = asyncio.get_running_loop()
+        deadline = min(waiter.deadline, loop.time() + self.queue_timeouts[priority])
+        if deadline < waiter.deadline:
+            waiter.deadline = deadline
+            waiter.timer.cancel()
+            waiter.timer = loop.call_at(deadline, self._expire, waiter)
+
+    def _forget(self, future: asyncio.Future):
+        self._waiters = [waiter for waiter in self._waiters if waiter[2] is not future]
+        heapq.heapify(self._waiters)
+
+    def _release(self):
+        # Hand the slot straight to the next waiter, so nobody can jump the queue
+        while self._waiters:
+            _, _, future = heapq.heappop(self._waiters)
+            if not future.done():
+                future.set_result(None)
+                return
+        self.active -= 1
+
+    def _record_wait(self, stats: dict, seconds: float):
+        with self._lock:
+            stats["admitted"] += 1
+            stats["total_wait"] += seconds
+            stats["max_wait"] = max(stats["max_wait"], seconds)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "max_concurrency": self.max_concurrency,
+                "active": self.active,
+                "queue_depth": sum(stats["queued"] for stats in self._stats.values()),
+                "priorities": {
+                    priority: {
+                        "queued": stats["queued"],
+                        "queue_limit": self.queue_limits[priority],
+                        "admitted": stats["admitted"],
+                        "rejected": stats["rejected"],
+                        "timed_out": stats["timed_out"],
+                        "avg_wait_ms": round(1000 * stats["total_wait"] / stats["admitted"], 2)
+                        if stats["admitted"] else 0.0,
+                        "max_wait_ms": round(1000 * stats["max_wait"], 2),
+                    }
+                    for priority, stats in self._stats.items()
+                },
+            }
+
+
+llm_scheduler = LLMScheduler(LLM_MAX_CONCURRENT_GENERATIONS, LLM_QUEUE_LIMITS, LLM_QUEUE_TIMEOUTS)
@@ -1,54 +1,46 @@
 # This sets up a lightweight MCP-style chatbot using Ollama locally
 # It bypasses LangChain function-calling agents and uses prompt composition.
-import json
-import os
-import requests
-from rapidfuzz import process
+import asyncio
+from typing import AsyncIterator
 
+from app.config import CHAT_RAG_K, FUND_INDEX_DIR, OLLAMA_MODEL
 from app.core.utils.user_util import get_user_profile_summary
-from app.data.investment_data import extended_investment_db
+from app.data.catalog import get_catalog
 from app.models.user import User
-from app.llm.fund_commentry_rag import build_fund_rag_index
-from langchain_community.vectorstores import FAISS
-from langchain_community.embeddings import HuggingFaceEmbeddings
-
-# -------------------------------------------------
-# Fuzzy Fund Resolver Utility
-# -------------------------------------------------
-
-def resolve_fund_name(user_input: str, fund_names: list[str], threshold: int = 80) -> str | None:
-    match, score, _ = process.extractOne(user_input.lower(), fund_names)
-    return match if score >= threshold else None
+from app.llm.fund_resolver import get_fund_resolver
+from app.llm.llm_scheduler import LLMUnavailable
+from app.llm.response_cache import FUND_INDEX_TAG, cached_generate, cached_stream_generate
+from app.llm.resource_registry import get_vector_store
+from app.llm.retrieval_cache import cached_similarity_search
 
 # -------------------------------------------------
 # Structured Fund Info
 # -------------------------------------------------
 
 def get_fund_metadata(fund_query: str) -> dict:
-    fund_name = resolve_fund_name(fund_query, extended_investment_db.keys())
+    fund_name = get_fund_resolver().resolve(fund_query)
     if not fund_name:
         return {"error": f"Could not identify fund for input: '{fund_query}'"}
-    return extended_investment_db[fund_name]
+    return get_catalog().get(fund_name)
 
 # -------------------------------------------------
 # RAG Retriever (FAISS + LangChain)
 # -------------------------------------------------
 
-def load_fund_rag_vector_store(index_dir="faiss_index"):
-    if not os.path.exists(os.path.join(index_dir, "index.faiss")):
-        print("⚠️ Index not found. Building RAG index...")
-        build_fund_rag_index()
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    return FAISS.load_local(index_dir, embeddings, allow_dangerous_deserialization=True)
+def load_fund_rag_vector_store(index_dir=FUND_INDEX_DIR):
+    def build():
+        from app.llm.fund_commentry_rag import build_fund_rag_index
+        build_fund_rag_index(index_dir)
 
-vectorstore = load_fund_rag_vector_store()
+    return get_vector_store(index_dir, build_fn=build)
 
-def search_fund_rag(query: str, fund_query: str = "") -> list:
-    fund_name = resolve_fund_name(fund_query, extended_investment_db.keys()) if fund_query else None
-    if fund_name:
-        results = vectorstore.similarity_search(query, k=4, filter={"fund": fund_name})
-    else:
-        results = vectorstore.similarity_search(query, k=4)
+def search_fund_rag(query: str, fund_query: str = "", fund_name: str | None = None) -> list:
+    if fund_name is None and fund_query:
+        fund_name = get_fund_resolver().resolve(fund_query)
+    filter = {"fund": fund_name} if fund_name else None
+    results = cached_similarity_search(FUND_INDEX_DIR, query, k=CHAT_RAG_K, filter=filter,
+                                       load_store=load_fund_rag_vector_store, partition_by="fund",
+                                       hybrid=True)
     return [doc.page_content for doc in results]
 
 # -------------------------------------------------
@@ -73,52 +65,56 @@ def summarize_user_profile(user_dict: dict) -> str:
 # Ollama Local Chat Engine
 # -------------------------------------------------
 
-def query_ollama(prompt: str, model="llama3.2:latest") -> str:
+async def query_ollama(prompt: str, inputs: dict, model=OLLAMA_MODEL) -> str:
     try:
-        response = requests.post(
-            "http://localhost:11434/api/generate",
-            json={
-                "model": model,
-                "prompt": prompt,
-                "stream": True
-            },
-            stream=True,
-            timeout=60
-        )
-
-        full_output = ""
-        for chunk in response.iter_lines():
-            if chunk:
-                try:
-                    data = json.loads(chunk.decode("utf-8"))
-                    full_output += data.get("response", "")
-                except json.JSONDecodeError:
-                    continue
-        return full_output.strip()
+        return await cached_generate(prompt, inputs, model=model, tag=FUND_INDEX_TAG)
+    except LLMUnavailable:
+        raise  # overload is the caller's to report (429/503), not a chat reply
     except Exception as e:
         return f"[Ollama Error] {e}"
 
+async def stream_ollama(prompt: str, inputs: dict, model=OLLAMA_MODEL) -> AsyncIterator[str]:
+    try:
+        async for token in cached_stream_generate(prompt, inputs, model=model, tag=FUND_INDEX_TAG):
+            yield token
+    except LLMUnavailable:
+        raise
+    except Exception as e:
+        yield f"[Ollama Error] {e}"
+
 # -------------------------------------------------
 # MCP-style Advisor Chat Handler
 # -------------------------------------------------
 
-def run_chatbot(message: str, user_profile: dict, fund_query: str = "") -> str:
-    fund_name = resolve_fund_name(fund_query, list(extended_investment_db.keys())) if fund_query else None
-    fund_meta = extended_investment_db.get(fund_name) if fund_name else None
+async def build_chat_prompt(message: str, user_profile: dict, fund_query: str = "") -> tuple[str, dict]:
+    """Return the full prompt and the structured inputs it was built from (the cache key).
+
+    Without an explicit `fund_query`, funds named in the message by their exact name,
+    alias or ISIN are used; there is no fuzzy matching on free text.
+    """
+    resolver = get_fund_resolver()
+    if fund_query:
+        fund_names = [name for name in [resolver.resolve(fund_query)] if name]
+    else:
+        fund_names = resolver.resolve_all(message)
 
     # 1. Summarize user
+    risk_profile = None
     try:
         user = User(**user_profile)
         user_summary = get_user_profile_summary(user)
+        risk_profile = user.risk_profile
     except Exception as e:
         user_summary = f"Could not summarize user: {e}"
 
     # 2. Search RAG
     rag_context = ""
-    if fund_name:
+    if fund_names:
         try:
-            rag_docs = vectorstore.similarity_search(message, k=4, filter={"fund": fund_name})
-            rag_context = "\n\n".join([doc.page_content for doc in rag_docs])
+            rag_chunks = await asyncio.gather(*[
+                asyncio.to_thread(search_fund_rag, message, fund_name=fund_name) for fund_name in fund_names
+            ])
+            rag_context = "\n\n".join(chunk for chunks in rag_chunks for chunk in chunks)
         except Exception as e:
             rag_context = f"Could not retrieve RAG documents: {e}"
 
@@ -126,23 +122,52 @@ def run_chatbot(message: str, user_profile: dict, fund_query: str = "") -> str:
     prompt_parts = ["You are a financial advisor helping a client with a specific investment question.\n",
                     "=== USER PROFILE ===\n" + str(user_summary)]
 
-    if fund_name:
-        prompt_parts.append(f"=== FUND NAME ===\n{fund_name}")
-
-    if fund_meta:
-        fund_info = "\n".join([f"{k}: {v}" for k, v in fund_meta.items()])
-        prompt_parts.append(f"=== FUND METADATA ===\n{fund_info}")
+    if fund_names:
+        prompt_parts.append(f"=== FUND NAME ===\n{', '.join(fund_names)}")
+
+    catalog = get_catalog()
+    for fund_name in fund_names:
+        fund_info = "\n".join([f"{k}: {v}" for k, v in catalog.get(fund_name).items()])
+        header = "=== FUND METADATA ===" if len(fund_names) == 1 else f"=== FUND METADATA: {fund_name} ==="
+        prompt_parts.append(f"{header}\n{fund_info}")
+
+    # Best-ranked schemes of the same kind within the user's risk tolerance, for comparison
+    alternatives = []
+    for fund_name in fund_names:
+        alternatives += [peer for peer in catalog.peers(fund_name, risk_profile)
+                         if peer not in fund_names and peer not in alternatives]
+    if alternatives:
+        prompt_parts.append("=== ALTERNATIVES IN OUR CATALOG ===\n" + "\n".join(
+            f"- {name}: {catalog.get(name).get('category')} / {catalog.get(name).get('sub_category')}, "
+            f"risk {catalog.get(name).get('risk_level')}, expense ratio {catalog.get(name).get('expense_ratio')}"
+            for name in alternatives))
 
     if rag_context:
         prompt_parts.append(f"=== RAG CONTEXT ===\n{rag_context}")
 
     prompt_parts.append(f"=== USER QUESTION ===\n{message.strip()}")
 
-    full_prompt = "\n\n".join(prompt_parts)
+    inputs = {
+        "kind": "chat",
+        "user_summary": user_summary,
+        "fund_names": fund_names,
+        "alternatives": alternatives,
+        "rag_context": rag_context,
+        "message": message.strip(),
+    }
+    return "\n\n".join(prompt_parts), inputs
+
+async def run_chatbot(message: str, user_profile: dict, fund_query: str = "") -> str:
+    full_prompt, inputs = await build_chat_prompt(message, user_profile, fund_query)
 
     # 4. Send to Ollama
-    return query_ollama(full_prompt)
+    return await query_ollama(full_prompt, inputs)
+
+async def stream_chatbot(message: str, user_profile: dict, fund_query: str = "") -> AsyncIterator[str]:
+    full_prompt, inputs = await build_chat_prompt(message, user_profile, fund_query)
+    async for token in stream_ollama(full_prompt, inputs):
+        yield token
 
 # Example usage:
-# response = run_chatbot("What are the risks of this fund?", user_profile_dict, fund_query="ICICI Long Term")
+# response = await run_chatbot("What are the risks of this fund?", user_profile_dict, fund_query="ICICI Long Term")
 # print(response)
@@ -0,0 +1,75 @@
+# Shared async client for the local Ollama server.
+# One pooled keep-alive httpx.AsyncClient per event loop, so a single worker
+# can keep many generations in flight without opening a connection per call.
+# How many of those actually reach the model at once is up to llm_scheduler.
+import asyncio
+import json
+import weakref
+from typing import AsyncIterator
+
+import httpx
+
+from app.config import (
+    OLLAMA_CONNECT_TIMEOUT,
+    OLLAMA_KEEPALIVE_SECONDS,
+    OLLAMA_MAX_CONNECTIONS,
+    OLLAMA_MODEL,
+    OLLAMA_READ_TIMEOUT,
+    OLLAMA_URL,
+)
+from app.llm.llm_scheduler import llm_scheduler
+
+_clients = weakref.WeakKeyDictionary()
+
+
+def get_client() -> httpx.AsyncClient:
+    """Return the pooled client bound to the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            base_url=OLLAMA_URL,
+            timeout=httpx.Timeout(OLLAMA_READ_TIMEOUT, connect=OLLAMA_CONNECT_TIMEOUT),
+            limits=httpx.Limits(
+                max_connections=OLLAMA_MAX_CONNECTIONS,
+                max_keepalive_connections=OLLAMA_MAX_CONNECTIONS,
+                keepalive_expiry=OLLAMA_KEEPALIVE_SECONDS,
+            ),
+        )
+        _clients[loop] = client
+    return client
+
+
+async def close_clients():
+    for client in list(_clients.values()):
+        await client.aclose()
+    _clients.clear()
+
+
+# -----------------------------
+# Generation
+# -----------------------------
+
+async def stream_generate(prompt: str, model: str = OLLAMA_MODEL, **options) -> AsyncIterator[str]:
+    """Yield response tokens as Ollama emits them, holding a scheduler slot throughout."""
+    payload = {"model": model, "prompt": prompt, "stream": True, **options}
+    async with llm_scheduler.slot(), get_client().stream("POST", "/api/generate", json=payload) as response:
+        response.raise_for_status()
+        async for line in response.aiter_lines():
+            if not line:
+                continue
+            try:
+                data = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+            chunk = data.get("response", "")
+            if chunk:
+                yield chunk
+            if data.get("done"):
+                break
+
+
+async def generate(prompt: str, model: str = OLLAMA_MODEL, **options) -> str:
+    """Run a full generation and return the assembled text."""
+    chunks = [chunk async for chunk in stream_generate(prompt, model, **options)]
+    return "".join(chunks).strip()
@@ -0,0 +1,125 @@
+# Per-partition FAISS sub-indexes (e.g. one per fund) carved out of a global store.
+# LangChain's `similarity_search(filter=...)` fetches `fetch_k` neighbours from
+# the whole index and filters afterwards, so scoped queries over-fetch and can
+# come back with fewer than k hits. Here each partition gets its own flat index
+# with the same metric, and a scoped query only scans that partition's vectors.
+import os
+import time
+from collections import defaultdict
+
+import numpy as np
+
+from app.llm.resource_registry import get_versioned_resource
+
+
+class PartitionedIndex:
+    def __init__(self, vectorstore, field: str, version: int = 0):
+        import faiss
+
+        self.field = field
+        self.version = version
+        self.vectorstore = vectorstore
+        index = vectorstore.index
+        vectors = index.reconstruct_n(0, index.ntotal)
+
+        rows = defaultdict(list)
+        for position, docstore_id in vectorstore.index_to_docstore_id.items():
+            doc = vectorstore.docstore.search(docstore_id)
+            key = doc.metadata.get(field) if hasattr(doc, "metadata") else None
+            if key is not None:
+                rows[key].append((position, doc))
+
+        self.partitions = {}
+        for key, members in rows.items():
+            sub_index = faiss.IndexFlat(index.d, index.metric_type)
+            sub_index.add(vectors[[position for position, _ in members]])
+            self.partitions[key] = (sub_index, [doc for _, doc in members])
+
+    def search(self, vector, k: int, key) -> list:
+        """Top-k documents for `vector` within one partition (empty if unknown)."""
+        partition = self.partitions.get(key)
+        if partition is None:
+            return []
+        sub_index, docs = partition
+        query = np.asarray([vector], dtype=np.float32)
+        if self.vectorstore._normalize_L2:
+            import faiss
+            faiss.normalize_L2(query)
+        _, positions = sub_index.search(query, min(k, len(docs)))
+        return [docs[i] for i in positions[0] if i != -1]
+
+    def sizes(self) -> dict:
+        return {key: len(docs) for key, (_, docs) in self.partitions.items()}
+
+
+def get_partitioned_index(index_dir: str, vectorstore, field: str) -> PartitionedIndex:
+    """Partitions for the resident index, rebuilt whenever the index version changes."""
+    key = f"partitions:{os.path.abspath(index_dir)}:{field}"
+    version = vectorstore.version
+    return get_versioned_resource(key, version, lambda: PartitionedIndex(vectorstore, field, version))
+
+
+# -------------------------------------------------
+# Benchmark: partitioned search vs filtered global search
+# -------------------------------------------------
+
+def _synthetic_store(n_partitions: int, chunks_per_partition: int, dim: int, seed: int = 7):
+    from langchain_community.embeddings import DeterministicFakeEmbedding
+    from langchain_community.vectorstores import FAISS
+
+    rng = np.random.default_rng(seed)
+    n = n_partitions * chunks_per_partition
+    vectors = rng.standard_normal((n, dim)).astype(np.float32)
+    texts = [f"chunk {i}" for i in range(n)]
+    metadatas = [{"fund": f"fund-{i % n_partitions}", "chunk": i // n_partitions} for i in range(n)]
+    return FAISS.from_embeddings(list(zip(texts, vectors.tolist())),
+                                 DeterministicFakeEmbedding(size=dim), metadatas=metadatas)
+
+
+def benchmark(vectorstore, field: str = "fund", k: int = 4, queries: int = 200, seed: int = 11) -> dict:
+    partitioned = PartitionedIndex(vectorstore, field)
+    keys = list(partitioned.partitions)
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((queries, vectorstore.index.d)).astype(np.float32).tolist()
+    scoped = [keys[i % len(keys)] for i in range(queries)]
+
+    start = time.perf_counter()
+    filtered = [vectorstore.similarity_search_by_vector(v, k=k, filter={field: key})
+                for v, key in zip(vectors, scoped)]
+    filter_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    direct = [partitioned.search(v, k, key) for v, key in zip(vectors, scoped)]
+    partition_seconds = time.perf_counter() - start
+
+    expected = [min(k, partitioned.sizes()[key]) for key in scoped]
+    return {
+        "vectors": vectorstore.index.ntotal,
+        "partitions": len(keys),
+        "queries": queries,
+        "filter_ms_per_query": round(1000 * filter_seconds / queries, 3),
+        "partition_ms_per_query": round(1000 * partition_seconds / queries, 3),
+        "filter_short_results": sum(len(r) < e for r, e in zip(filtered, expected)),
+        "partition_short_results": sum(len(r) < e for r, e in zip(direct, expected)),
+    }
+
+
+if __name__ == "__main__":
+    import argparse
+    import json
+
+    parser = argparse.ArgumentParser(description="Benchmark per-fund partitions against filtered FAISS search.")
+    parser.add_argument("--index-dir", help="Existing fund index (defaults to a synthetic corpus)")
+    parser.add_argument("--partitions", type=int, default=200)
+    parser.add_argument("--chunks", type=int, default=25, help="Chunks per partition (synthetic)")
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("-k", type=int, default=4)
+    parser.add_argument("--queries", type=int, default=200)
+    args = parser.parse_args()
+
+    if args.index_dir:
+        from app.llm.mcp_chatbot import load_fund_rag_vector_store
+        store = load_fund_rag_vector_store(args.index_dir)
+    else:
+        store = _synthetic_store(args.partitions, args.chunks, args.dim)
+    print(json.dumps(benchmark(store, k=args.k, queries=args.queries), indent=2))
@@ -1,120 +1,199 @@
-import yfinance as yf
-import requests
-from bs4 import BeautifulSoup
-import fitz  # PyMuPDF
-import os
+import argparse
 import datetime
+import time
+from functools import partial
+from itertools import islice
 
-from langchain_community.vectorstores import FAISS
+from bs4 import BeautifulSoup
 from langchain.schema import Document
-from langchain_community.embeddings import HuggingFaceEmbeddings
 
+from app.config import INGEST_FIXTURES_DIR, INGEST_MODE, MARKET_INDEX_DIR
 from app.llm.headline_sentiment import get_sentiment_documents
+from app.llm.incremental_index import id_prefix, update_index
+from app.llm.ingestion import Fetcher, IngestionError, Source, failed_origins, ingestion_report, iter_documents
+from app.llm.response_cache import MARKET_INDEX_TAG
+from app.llm.stock_features import build_stock_documents
+
+ARTICLE_URLS = [
+    "https://www.reuters.com/markets/global-markets-recession-graphic-2025-05-08/",
+    "https://www.investopedia.com/what-will-it-take-for-stocks-to-keep-rising-what-experts-say-11729371",
+    "https://www.marketwatch.com/story/wall-streets-outlook-sours-on-second-quarter-with-bigger-forecast-cuts-than-normal-1d89bb5c",
+]
+
+PDF_URLS = [
+    "https://static.seekingalpha.com/uploads/sa_presentations/772/98772/original.pdf"
+]
+
+TICKERS = [
+    # Mega cap tech
+    "AAPL", "GOOGL", "MSFT", "AMZN", "TSLA", "META", "NVDA", "NFLX", "ADBE", "CRM",
+
+    # Large US financials
+    "JPM", "WFC", "BAC", "GS", "MS", "AXP", "C", "USB", "BK", "BLK",
+
+    # Healthcare
+    "JNJ", "PFE", "MRK", "ABBV", "UNH", "CVS", "LLY",
+
+    # ETFs (broad index)
+    "SPY", "VTI", "QQQ", "DIA", "IWM", "VOO",
+
+    # ETFs (sector)
+    "XLK", "XLF", "XLE", "XLY", "XLI", "XLV", "XLC", "XLU", "XLB", "XLRE",
+
+    # International & emerging
+    "EFA", "EEM", "VEA", "VWO", "FXI",
+
+    # Bonds
+    "TLT", "IEF", "SHY", "LQD", "HYG", "AGG", "BND",
+
+    # Commodities & metals
+    "GLD", "IAU", "SLV", "DBC", "DBA",
+
+    # Crypto-related (optional)
+    "COIN", "MSTR", "RIOT"
+]
+
+# Per-source parallelism, request timeout (s) and retries
+SOURCE_POLICIES = {
+    "articles": {"workers": 4, "timeout": 15, "retries": 2},
+    "pdfs": {"workers": 2, "timeout": 30, "retries": 2},
+    "tickers": {"workers": 3, "timeout": 30, "retries": 2},
+    "sentiment": {"workers": 3, "timeout": 10, "retries": 1},
+    "headlines": {"workers": 1, "timeout": 10, "retries": 1},
+}
+TICKER_BATCH_SIZE = 20
+
+
+def _batched(items, size):
+    iterator = iter(items)
+    while batch := list(islice(iterator, size)):
+        yield batch
 
 
 # -----------------------------
 # 1. PDF & Article Scraper
 # -----------------------------
 
-def scrape_pdf(url):
+def scrape_pdf(url, fetcher=None, timeout=30, retries=2):
+    import fitz  # PyMuPDF
+
+    fetcher = fetcher or Fetcher()
     docs = []
     try:
-        response = requests.get(url)
-        filename = "temp_report.pdf"
-        with open(filename, "wb") as f:
-            f.write(response.content)
-        with fitz.open(filename) as pdf:
-            text = ""
-            for page in pdf:
-                text += page.get_text()
-        os.remove(filename)
+        content = fetcher.get(url, timeout, retries)
+        with fitz.open(stream=content, filetype="pdf") as pdf:
+            text = "".join(page.get_text() for page in pdf)
         docs.append(Document(page_content=text, metadata={"source": url}))
     except Exception as e:
-        print(f"[PDF Error] {url}: {e}")
+        raise IngestionError(f"[PDF Error] {url}: {e}", [id_prefix("source", url)]) from e
     return docs
 
-def scrape_article(url):
+def scrape_article(url, fetcher=None, timeout=15, retries=2):
+    fetcher = fetcher or Fetcher()
     docs = []
     try:
-        html = requests.get(url).text
+        html = fetcher.get_text(url, timeout, retries)
         soup = BeautifulSoup(html, "html.parser")
         text = "\n".join([p.text for p in soup.find_all("p")])
         docs.append(Document(page_content=text, metadata={"source": url}))
     except Exception as e:
-        print(f"[Article Error] {url}: {e}")
+        raise IngestionError(f"[Article Error] {url}: {e}", [id_prefix("source", url)]) from e
     return docs
 
 # -----------------------------
 # 2. Yahoo Finance Scraper
 # -----------------------------
 
-def fetch_stock_data(tickers):
-    docs = []
-    for symbol in tickers:
+def fetch_stock_data(tickers, fetcher=None, retries=2, profile_workers=8):
+    """
+    One bulk history download for all tickers, profiles fetched concurrently.
+    Each ticker becomes a compact feature chunk plus small profile chunks.
+    """
+    from concurrent.futures import ThreadPoolExecutor
+
+    fetcher = fetcher or Fetcher()
+    origins = [id_prefix("ticker", symbol) for symbol in tickers]
+    try:
+        history = fetcher.history(list(tickers), period="1y", retries=retries)
+    except Exception as e:
+        raise IngestionError(f"[Stock Error] {', '.join(tickers)}: {e}", origins) from e
+
+    failed = []
+
+    def profile(symbol):
         try:
-            stock = yf.Ticker(symbol)
-            hist = stock.history(period="1y")
-            if hist.empty:
-                continue
-            hist_text = hist.reset_index().to_string(index=False)
-            profile = stock.info.get("longBusinessSummary", "")
-            content = f"Ticker: {symbol}\n\nProfile:\n{profile}\n\nHistory:\n{hist_text}"
-            docs.append(Document(page_content=content, metadata={"ticker": symbol}))
+            return fetcher.profile(symbol, retries).get("longBusinessSummary", "")
         except Exception as e:
             print(f"[Stock Error] {symbol}: {e}")
+            failed.append(symbol)
+            return ""
+
+    with ThreadPoolExecutor(max_workers=min(profile_workers, len(tickers))) as pool:
+        profiles = dict(zip(tickers, pool.map(profile, tickers)))
+
+    try:
+        docs = build_stock_documents(history, profiles)
+    except Exception as e:
+        raise IngestionError(f"[Stock Error] {', '.join(tickers)}: {e}", origins) from e
+    if failed:
+        # Keep the previous profile chunks of these tickers; their features are still fresh
+        raise IngestionError(f"[Stock Error] profiles unavailable: {', '.join(failed)}",
+                             [id_prefix("ticker", symbol) for symbol in failed], docs)
     return docs
 
 # -----------------------------
 # 3. Market Sentiment Scrapers
 # -----------------------------
 
-def scrape_aaii_sentiment():
+def scrape_aaii_sentiment(fetcher=None, timeout=10, retries=1):
     url = "https://www.aaii.com/sentimentsurvey"
+    fetcher = fetcher or Fetcher()
     docs = []
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = BeautifulSoup(fetcher.get_text(url, timeout, retries), "html.parser")
         result_block = soup.find("div", class_="sentiment-survey-results")
         if not result_block:
             raise Exception("Sentiment data not found on AAII page")
         text = result_block.get_text("\n", strip=True)
         docs.append(Document(page_content=text, metadata={"source": url, "type": "sentiment", "name": "AAII"}))
     except Exception as e:
-        print(f"[AAII Error] {e}")
+        raise IngestionError(f"[AAII Error] {e}", [id_prefix("source", url)]) from e
     return docs
 
-def scrape_sffed_sentiment():
+def scrape_sffed_sentiment(fetcher=None, timeout=10, retries=1):
     url = "https://www.frbsf.org/research-and-insights/data-and-indicators/daily-news-sentiment-index/"
+    fetcher = fetcher or Fetcher()
     docs = []
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = BeautifulSoup(fetcher.get_text(url, timeout, retries), "html.parser")
         paragraph = soup.find("div", class_="body-text").get_text("\n", strip=True)
         date_str = datetime.datetime.now().strftime("%Y-%m-%d")
         docs.append(Document(page_content=paragraph, metadata={"source": url, "type": "sentiment", "name": "SF Fed", "date": date_str}))
     except Exception as e:
-        print(f"[SF Fed Error] {e}")
+        raise IngestionError(f"[SF Fed Error] {e}", [id_prefix("source", url)]) from e
     return docs
 
-def scrape_sumgrowth_sentiment():
+def scrape_sumgrowth_sentiment(fetcher=None, timeout=10, retries=1):
     url = "https://www.sumgrowth.com/InfoPages/Market-Sentiment.aspx"
+    fetcher = fetcher or Fetcher()
     docs = []
     try:
-        response = requests.get(url, timeout=10)
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = BeautifulSoup(fetcher.get_text(url, timeout, retries), "html.parser")
         content_block = soup.find("div", id="content")
         summary = content_block.get_text("\n", strip=True) if content_block else ""
         docs.append(Document(page_content=summary, metadata={"source": url, "type": "sentiment", "name": "SumGrowth"}))
     except Exception as e:
-        print(f"[SumGrowth Error] {e}")
+        raise IngestionError(f"[SumGrowth Error] {e}", [id_prefix("source", url)]) from e
     return docs
 
-def collect_sentiment_documents():
+def collect_sentiment_documents(fetcher=None):
     print("📊 Collecting sentiment data...")
     docs = []
-    docs.extend(scrape_aaii_sentiment())
-    docs.extend(scrape_sffed_sentiment())
-    docs.extend(scrape_sumgrowth_sentiment())
+    for scrape in (scrape_aaii_sentiment, scrape_sffed_sentiment, scrape_sumgrowth_sentiment):
+        try:
+            docs.extend(scrape(fetcher))
+        except IngestionError as e:
+            print(e)
     print(f"✅ Sentiment documents collected: {len(docs)}")
     return docs
 
@@ -122,74 +201,70 @@ def collect_sentiment_documents():
 # 4. Build & Save Vector Store
 # -----------------------------
 
-def build_vector_store(documents, index_dir="faiss_index"):
-    embeddings = HuggingFaceEmbeddings(model_name="sentence-transformers/all-MiniLM-L6-v2")
-    vectorstore = FAISS.from_documents(documents, embeddings)
-    os.makedirs(index_dir, exist_ok=True)
-    vectorstore.save_local(index_dir)
-    print(f"✅ Vector store saved to {index_dir}/")
+def build_vector_store(documents, index_dir=MARKET_INDEX_DIR, rebuild=False, keep=None):
+    """Embed new/changed `documents` (any iterable, consumed lazily) into the index.
+
+    `keep` reports the sources that failed to fetch (see update_index).
+    """
+    return update_index(documents, index_dir, tag=MARKET_INDEX_TAG, rebuild=rebuild, keep=keep)
 
 # -----------------------------
 # 5. Entry Point
 # -----------------------------
 
-def build_financial_rag():
-    print("🚀 Starting RAG index creation...")
-
-    article_urls = [
-        "https://www.reuters.com/markets/global-markets-recession-graphic-2025-05-08/",
-        "https://www.investopedia.com/what-will-it-take-for-stocks-to-keep-rising-what-experts-say-11729371",
-        "https://www.marketwatch.com/story/wall-streets-outlook-sours-on-second-quarter-with-bigger-forecast-cuts-than-normal-1d89bb5c",
-    ]
-
-    pdf_urls = [
-        "https://static.seekingalpha.com/uploads/sa_presentations/772/98772/original.pdf"
+def market_sources(fetcher: Fetcher) -> list[Source]:
+    policy = SOURCE_POLICIES
+    return [
+        Source("articles", [partial(scrape_article, url, fetcher, policy["articles"]["timeout"],
+                                    policy["articles"]["retries"]) for url in ARTICLE_URLS],
+               workers=policy["articles"]["workers"]),
+        Source("pdfs", [partial(scrape_pdf, url, fetcher, policy["pdfs"]["timeout"],
+                                policy["pdfs"]["retries"]) for url in PDF_URLS],
+               workers=policy["pdfs"]["workers"]),
+        Source("tickers", [partial(fetch_stock_data, batch, fetcher, policy["tickers"]["retries"])
+                           for batch in _batched(TICKERS, TICKER_BATCH_SIZE)],
+               workers=policy["tickers"]["workers"]),
+        Source("sentiment", [partial(scrape, fetcher, policy["sentiment"]["timeout"], policy["sentiment"]["retries"])
+                             for scrape in (scrape_aaii_sentiment, scrape_sffed_sentiment, scrape_sumgrowth_sentiment)],
+               workers=policy["sentiment"]["workers"]),
+        Source("headlines", [partial(get_sentiment_documents, fetcher)],
+               workers=policy["headlines"]["workers"]),
     ]
 
-    tickers = [
-        # Mega cap tech
-        "AAPL", "GOOGL", "MSFT", "AMZN", "TSLA", "META", "NVDA", "NFLX", "ADBE", "CRM",
 
-        # Large US financials
-        "JPM", "WFC", "BAC", "GS", "MS", "AXP", "C", "USB", "BK", "BLK",
-
-        # Healthcare
-        "JNJ", "PFE", "MRK", "ABBV", "UNH", "CVS", "LLY",
-
-        # ETFs (broad index)
-        "SPY", "VTI", "QQQ", "DIA", "IWM", "VOO",
-
-        # ETFs (sector)
-        "XLK", "XLF", "XLE", "XLY", "XLI", "XLV", "XLC", "XLU", "XLB", "XLRE",
-
-        # International & emerging
-        "EFA", "EEM", "VEA", "VWO", "FXI",
-
-        # Bonds
-        "TLT", "IEF", "SHY", "LQD", "HYG", "AGG", "BND",
-
-        # Commodities & metals
-        "GLD", "IAU", "SLV", "DBC", "DBA",
-
-        # Crypto-related (optional)
-        "COIN", "MSTR", "RIOT"
-    ]
-
-    documents = []
+def build_financial_rag(index_dir=MARKET_INDEX_DIR, fetcher: Fetcher | None = None, rebuild=False):
+    print("🚀 Starting RAG index creation...")
+    start = time.perf_counter()
+    sources = market_sources(fetcher or Fetcher())
 
-    for url in article_urls:
-        documents.extend(scrape_article(url))
+    # Documents flow into the embedding stage as each source task completes
+    build_vector_store(iter_documents(sources), index_dir, rebuild, keep=partial(failed_origins, sources))
 
-    for url in pdf_urls:
-        documents.extend(scrape_pdf(url))
+    print(f"🧾 Ingestion report: {ingestion_report(sources)}")
+    print(f"⏱️ Rebuild finished in {time.perf_counter() - start:.2f}s")
 
-    documents.extend(fetch_stock_data(tickers))
-    documents.extend(collect_sentiment_documents())
-    documents.extend(get_sentiment_documents())
 
-    print(f"🧾 Total documents collected: {len(documents)}")
+def benchmark_ingestion(fetcher: Fetcher) -> dict:
+    """Run ingestion only (no embedding) and report per-source timings."""
+    sources = market_sources(fetcher)
+    start = time.perf_counter()
+    count = sum(1 for _ in iter_documents(sources))
+    return {"documents": count, "seconds": round(time.perf_counter() - start, 3),
+            "sources": ingestion_report(sources)}
 
-    build_vector_store(documents)
 
 if __name__ == "__main__":
-    build_financial_rag()
+    parser = argparse.ArgumentParser(description="Build the market RAG index.")
+    parser.add_argument("--mode", choices=["live", "record", "replay"], default=INGEST_MODE,
+                        help="replay runs offline against recorded fixtures")
+    parser.add_argument("--fixtures", default=INGEST_FIXTURES_DIR)
+    parser.add_argument("--index-dir", default=MARKET_INDEX_DIR)
+    parser.add_argument("--benchmark", action="store_true", help="Time ingestion only; do not build the index")
+    parser.add_argument("--full", action="store_true", help="Re-embed everything instead of updating incrementally")
+    args = parser.parse_args()
+
+    fetcher = Fetcher(args.mode, args.fixtures)
+    if args.benchmark:
+        print(benchmark_ingestion(fetcher))
+    else:
+        build_financial_rag(args.index_dir, fetcher, rebuild=args.full)
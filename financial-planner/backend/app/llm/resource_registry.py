@@ -0,0 +1,185 @@
+# Process-wide registry for heavy, read-mostly resources (embedding models,
+# FAISS indexes). Each resource is loaded lazily on first use and then kept
+# resident, so request handlers only pay for retrieval and generation.
+# A resident FAISS index carries the version recorded in the manifest next to
+# it on disk and is reloaded once that version moves on, so a rebuild by
+# another process (e.g. the rag_recommender CLI) reaches the server too.
+import json
+import os
+import resource
+import sys
+import threading
+import time
+
+from app.config import EMBEDDING_CACHE_ENABLED, EMBEDDING_MODEL
+
+_lock = threading.RLock()
+_resources = {}
+_stats = {}
+
+
+def _rss_mb() -> float:
+    """Current resident set size of this process in MB."""
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+        return pages * os.sysconf("SC_PAGE_SIZE") / (1024 * 1024)
+    except (OSError, ValueError, IndexError):
+        # Fallback: peak RSS (KB on Linux, bytes on macOS)
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# -----------------------------
+# Generic Registry
+# -----------------------------
+
+def get_resource(key: str, loader):
+    """Return the resource stored under `key`, calling `loader()` on first use."""
+    value = _resources.get(key)
+    if value is not None:
+        return value
+
+    with _lock:
+        value = _resources.get(key)
+        if value is not None:
+            return value
+
+        rss_before = _rss_mb()
+        start = time.perf_counter()
+        value = loader()
+        load_seconds = time.perf_counter() - start
+        rss_delta = _rss_mb() - rss_before
+
+        _resources[key] = value
+        _stats[key] = {
+            "load_seconds": round(load_seconds, 3),
+            "rss_delta_mb": round(rss_delta, 1),
+            "loaded_at": time.time(),
+        }
+        print(f"📦 Loaded {key} in {load_seconds:.2f}s (+{rss_delta:.1f} MB RSS)")
+        return value
+
+
+def put_resource(key: str, value):
+    """Replace a resident resource, e.g. with a freshly built index."""
+    with _lock:
+        _resources[key] = value
+        _stats[key] = {"load_seconds": 0.0, "rss_delta_mb": 0.0, "loaded_at": time.time()}
+
+
+def invalidate(key: str):
+    with _lock:
+        _resources.pop(key, None)
+        _stats.pop(key, None)
+
+
+def get_versioned_resource(key: str, version, loader):
+    """Like `get_resource`, but reload when the stored value was built for another version.
+
+    `loader()` must return an object with a `version` attribute.
+    """
+    value = get_resource(key, loader)
+    if value.version != version:
+        invalidate(key)
+        value = get_resource(key, loader)
+    return value
+
+
+def resource_stats() -> dict:
+    return {
+        "process_rss_mb": round(_rss_mb(), 1),
+        "resources": {key: dict(stats) for key, stats in _stats.items()},
+    }
+
+
+# -----------------------------
+# Embeddings & Vector Stores
+# -----------------------------
+
+def get_embeddings(model_name: str = EMBEDDING_MODEL):
+    """Embeddings for `model_name`, served through the persistent embedding cache."""
+    def load_model():
+        from langchain_community.embeddings import HuggingFaceEmbeddings
+        return HuggingFaceEmbeddings(model_name=model_name)
+
+    def load():
+        if not EMBEDDING_CACHE_ENABLED:
+            return load_model()
+        from app.llm.embedding_cache import FILE_LOCKING, CachedEmbeddings
+        if not FILE_LOCKING:
+            print("⚠️ No file locking on this platform; embedding cache disabled.")
+            return load_model()
+        return CachedEmbeddings(model_name, load_model)
+
+    return get_resource(f"embeddings:{model_name}", load)
+
+
+def embedding_cache_stats() -> dict:
+    embeddings = _resources.get(f"embeddings:{EMBEDDING_MODEL}")
+    stats = getattr(embeddings, "stats", None)
+    return stats() if stats else {"enabled": EMBEDDING_CACHE_ENABLED, "loaded": embeddings is not None}
+
+
+MANIFEST_FILE = "manifest.json"  # written next to each index by incremental_index
+_manifest_versions = {}  # manifest path -> (file stamp, version)
+
+
+def index_version(index_dir: str) -> int:
+    """Version of the index on disk, from its manifest (0 without one).
+
+    Bumped by every rebuild, whichever process ran it. The manifest is only
+    re-read when its file changes, so this is one stat() per call.
+    """
+    path = os.path.join(os.path.abspath(index_dir), MANIFEST_FILE)
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return 0
+    stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+    cached = _manifest_versions.get(path)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    try:
+        with open(path, encoding="utf-8") as f:
+            version = json.load(f).get("version", 0)
+    except (OSError, ValueError):
+        # Mid-replace or unreadable: keep what we had
+        return cached[1] if cached is not None else 0
+    _manifest_versions[path] = (stamp, version)
+    return version
+
+
+def _vector_store_key(index_dir: str) -> str:
+    return f"vectorstore:{os.path.abspath(index_dir)}"
+
+
+def get_vector_store(index_dir: str, build_fn=None):
+    """
+    Load the FAISS index in `index_dir` once per process, and again whenever its
+    on-disk version changes. The store's `version` attribute is the version it
+    was loaded at; key anything derived from the store on that, not on
+    `index_version`, which may already be newer.
+    If the index does not exist yet, `build_fn()` is called to create it first.
+    """
+    def load():
+        from langchain_community.vectorstores import FAISS
+        if not os.path.exists(os.path.join(index_dir, "index.faiss")):
+            if build_fn is None:
+                raise FileNotFoundError(f"No FAISS index found in {index_dir}/")
+            print(f"⚠️ Index not found in {index_dir}/. Building...")
+            build_fn()
+        # Read before loading: if a rebuild lands in between, the store looks older
+        # than it is and is reloaded once more, never the other way round
+        version = index_version(index_dir)
+        vectorstore = FAISS.load_local(index_dir, get_embeddings(), allow_dangerous_deserialization=True)
+        vectorstore.version = version
+        return vectorstore
+
+    return get_versioned_resource(_vector_store_key(index_dir), index_version(index_dir), load)
+
+
+def put_vector_store(index_dir: str, vectorstore, version: int):
+    """Make a freshly built index resident; `version` is the one its manifest records."""
+    vectorstore.version = version
+    put_resource(_vector_store_key(index_dir), vectorstore)
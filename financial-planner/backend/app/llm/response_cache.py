@@ -0,0 +1,254 @@
+# Cache for LLM generations, keyed on the model name plus the structured
+# inputs a prompt is built from (never the raw prompt string).
+# Misses go through single_flight, so concurrent misses for one key wait on a
+# single generation instead of each starting their own.
+# Hot entries live in an in-memory LRU; everything is persisted to SQLite so
+# the cache survives restarts and is shared between worker processes. Writes
+# periodically delete expired rows and the oldest rows beyond a row cap, and
+# invalidations are recorded in SQLite so other workers drop their LRU copies.
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import AsyncIterator, Callable
+
+from app.config import (
+    LLM_CACHE_ENABLED,
+    LLM_CACHE_MAX_ENTRIES,
+    LLM_CACHE_MAX_ROWS,
+    LLM_CACHE_PATH,
+    LLM_CACHE_TTL_SECONDS,
+    LLM_SINGLE_FLIGHT_ENABLED,
+    OLLAMA_MODEL,
+)
+from app.llm.ollama_client import generate, stream_generate
+from app.llm.single_flight import single_flight
+
+# Tags used to drop entries whose prompts embed retrieved context
+MARKET_INDEX_TAG = "market_index"
+FUND_INDEX_TAG = "fund_index"
+
+_TAG_REFRESH_SECONDS = 5.0
+_PRUNE_INTERVAL_SECONDS = 60.0
+_ALL_TAGS = "*"  # invalidations row recorded by an untagged invalidate()
+
+
+def make_cache_key(model: str, inputs: dict, options: dict | None = None) -> str:
+    """Canonical hash of the model plus structured prompt inputs."""
+    payload = {"model": model, "inputs": inputs, "options": options or {}}
+    canonical = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    def __init__(self, path: str, max_entries: int = 1024, ttl_seconds: float = 86400,
+                 max_rows: int = LLM_CACHE_MAX_ROWS):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.max_rows = max_rows
+        self._lock = threading.Lock()
+        self._memory = OrderedDict()  # key -> (value, created_at, tag)
+        self._tag_invalidated_at = {}
+        self._tags_loaded_at = 0.0
+        self._pruned_at = 0.0
+        self._conn = None
+        self.hits = 0
+        self.memory_hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.pruned = 0
+
+    def _db(self) -> sqlite3.Connection:
+        if self._conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            self._conn = sqlite3.connect(self.path, check_same_thread=False)
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, tag TEXT)"
+            )
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_tag ON responses (tag)")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS responses_created_at ON responses (created_at)")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS invalidations (tag TEXT PRIMARY KEY, invalidated_at REAL NOT NULL)"
+            )
+            self._conn.commit()
+        return self._conn
+
+    def _refresh_tags(self, now: float):
+        # Another process (e.g. an index rebuild) may have invalidated a tag
+        if now - self._tags_loaded_at < _TAG_REFRESH_SECONDS:
+            return
+        rows = self._db().execute("SELECT tag, invalidated_at FROM invalidations").fetchall()
+        self._tag_invalidated_at = dict(rows)
+        self._tags_loaded_at = now
+
+    def _is_fresh(self, created_at: float, tag: str | None, now: float) -> bool:
+        if now - created_at > self.ttl_seconds:
+            return False
+        if created_at <= self._tag_invalidated_at.get(_ALL_TAGS, 0.0):
+            return False
+        return tag is None or created_at > self._tag_invalidated_at.get(tag, 0.0)
+
+    def _remember(self, key: str, entry: tuple):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            self._refresh_tags(now)
+            entry = self._memory.get(key)
+            if entry is not None:
+                if self._is_fresh(entry[1], entry[2], now):
+                    self._memory.move_to_end(key)
+                    self.hits += 1
+                    self.memory_hits += 1
+                    return entry[0]
+                del self._memory[key]
+
+            row = self._db().execute(
+                "SELECT value, created_at, tag FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is not None and self._is_fresh(row[1], row[2], now):
+                self._remember(key, row)
+                self.hits += 1
+                return row[0]
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: str, tag: str | None = None):
+        entry = (value, time.time(), tag)
+        with self._lock:
+            self._remember(key, entry)
+            self._db().execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, tag) VALUES (?, ?, ?, ?)",
+                (key, *entry),
+            )
+            if entry[1] - self._pruned_at >= _PRUNE_INTERVAL_SECONDS:
+                self._prune(entry[1])
+            self._db().commit()
+
+    def _prune(self, now: float):
+        """Delete expired rows, then the oldest rows beyond `max_rows` (caller holds the lock)."""
+        db = self._db()
+        expired = db.execute("DELETE FROM responses WHERE created_at < ?", (now - self.ttl_seconds,)).rowcount
+        overflow = db.execute(
+            "DELETE FROM responses WHERE key IN "
+            "(SELECT key FROM responses ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (self.max_rows,)
+        ).rowcount
+        self.pruned += expired + overflow
+        self._pruned_at = now
+
+    def invalidate(self, tag: str | None = None):
+        """Drop every entry with `tag`, or the whole cache when no tag is given.
+
+        Other processes drop their in-memory copies within _TAG_REFRESH_SECONDS.
+        """
+        now = time.time()
+        with self._lock:
+            db = self._db()
+            if tag is None:
+                self._memory.clear()
+                db.execute("DELETE FROM responses")
+            else:
+                for key in [k for k, entry in self._memory.items() if entry[2] == tag]:
+                    del self._memory[key]
+                db.execute("DELETE FROM responses WHERE tag = ?", (tag,))
+            marker = _ALL_TAGS if tag is None else tag
+            db.execute(
+                "INSERT OR REPLACE INTO invalidations (tag, invalidated_at) VALUES (?, ?)", (marker, now)
+            )
+            self._tag_invalidated_at[marker] = now
+            db.commit()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "enabled": LLM_CACHE_ENABLED,
+            "hits": self.hits,
+            "memory_hits": self.memory_hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "pruned": self.pruned,
+            "memory_entries": len(self._memory),
+            "max_entries": self.max_entries,
+            "max_rows": self.max_rows,
+            "ttl_seconds": self.ttl_seconds,
+        }
+
+
+response_cache = ResponseCache(LLM_CACHE_PATH, LLM_CACHE_MAX_ENTRIES, LLM_CACHE_TTL_SECONDS)
+
+
+# -----------------------------
+# Cached Generation
+# -----------------------------
+
+def _store(key: str, tag: str | None, cacheable: Callable[[str], bool] | None):
+    def put(output: str):
+        if output and (cacheable is None or cacheable(output)):
+            response_cache.put(key, output, tag)
+
+    async def store(output: str):
+        # SQLite write (and the caller's check) off the event loop
+        await asyncio.to_thread(put, output)
+    return store
+
+
+async def _lookup(key: str) -> str | None:
+    return await asyncio.to_thread(response_cache.get, key) if LLM_CACHE_ENABLED else None
+
+
+async def cached_generate(prompt: str, inputs: dict, model: str = OLLAMA_MODEL, tag: str | None = None,
+                          cacheable: Callable[[str], bool] | None = None, **options) -> str:
+    """`generate()` behind the response cache. `inputs` must fully determine `prompt`.
+
+    `cacheable(output)` can veto storing an output (e.g. one that failed to parse).
+    """
+    key = make_cache_key(model, inputs, options)
+    cached = await _lookup(key)
+    if cached is not None:
+        return cached
+    on_complete = _store(key, tag, cacheable) if LLM_CACHE_ENABLED else None
+
+    if LLM_SINGLE_FLIGHT_ENABLED:
+        return await single_flight.generate(key, prompt, model, options, on_complete)
+    output = await generate(prompt, model=model, **options)
+    if on_complete is not None:
+        await on_complete(output)
+    return output
+
+
+async def cached_stream_generate(prompt: str, inputs: dict, model: str = OLLAMA_MODEL, tag: str | None = None,
+                                 cacheable: Callable[[str], bool] | None = None,
+                                 **options) -> AsyncIterator[str]:
+    """Streaming variant: a hit is replayed as one chunk, a miss is stored once complete."""
+    key = make_cache_key(model, inputs, options)
+    cached = await _lookup(key)
+    if cached is not None:
+        yield cached
+        return
+    on_complete = _store(key, tag, cacheable) if LLM_CACHE_ENABLED else None
+
+    if LLM_SINGLE_FLIGHT_ENABLED:
+        async for token in single_flight.stream(key, prompt, model, options, on_complete):
+            yield token
+        return
+    chunks = []
+    async for token in stream_generate(prompt, model=model, **options):
+        chunks.append(token)
+        yield token
+    if on_complete is not None:
+        await on_complete("".join(chunks).strip())
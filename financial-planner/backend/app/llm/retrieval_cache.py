@@ -0,0 +1,115 @@
+# In-process caches in front of FAISS similarity search.
+#   * query embeddings: normalized query text -> vector (LRU)
+#   * results: (index, index version, query, k, filter) -> documents (LRU)
+# The index version is the manifest version the resident store was loaded at
+# (see resource_registry.get_vector_store); a rebuild in any process bumps it,
+# the store is reloaded and results cached for the old version are never hit.
+import json
+import os
+import threading
+from collections import OrderedDict
+
+from app.config import HYBRID_CANDIDATES_PER_RESULT, QUERY_EMBEDDING_CACHE_SIZE, RETRIEVAL_CACHE_SIZE
+from app.llm.bm25_index import get_bm25_index, reciprocal_rank_fusion
+from app.llm.partitioned_index import get_partitioned_index
+from app.llm.resource_registry import get_vector_store
+
+
+class LRUCache:
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return None
+
+    def put(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._data),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+
+query_embedding_cache = LRUCache(QUERY_EMBEDDING_CACHE_SIZE)
+retrieval_cache = LRUCache(RETRIEVAL_CACHE_SIZE)
+
+
+def normalize_query(query: str) -> str:
+    # whitespace runs never change the tokenized query
+    return " ".join(query.split())
+
+
+def embed_query(embeddings, query: str) -> list[float]:
+    text = normalize_query(query)
+    vector = query_embedding_cache.get((id(embeddings), text))
+    if vector is None:
+        vector = embeddings.embed_query(text)
+        query_embedding_cache.put((id(embeddings), text), vector)
+    return vector
+
+
+def _dense_search(index_dir, vectorstore, query, k, filter, partition_by) -> list:
+    vector = embed_query(vectorstore.embeddings, query)
+    if partition_by and filter and list(filter) == [partition_by]:
+        partitioned = get_partitioned_index(index_dir, vectorstore, partition_by)
+        return partitioned.search(vector, k, filter[partition_by])
+    return vectorstore.similarity_search_by_vector(vector, k=k, filter=filter)
+
+
+def cached_similarity_search(index_dir: str, query: str, k: int = 4, filter: dict | None = None,
+                             load_store=get_vector_store, partition_by: str | None = None,
+                             hybrid: bool = False) -> list:
+    """`vectorstore.similarity_search` with query-embedding and result caching.
+
+    A filter on exactly `partition_by` is answered from that partition's
+    sub-index instead of post-filtering a global search. With `hybrid`, the
+    dense candidates are fused with BM25 candidates by reciprocal rank.
+    """
+    vectorstore = load_store(index_dir)
+    key = (
+        os.path.abspath(index_dir),
+        vectorstore.version,  # of this store, even if a newer one was swapped in since
+        normalize_query(query),
+        k,
+        json.dumps(filter, sort_keys=True) if filter else None,
+        hybrid,
+    )
+    docs = retrieval_cache.get(key)
+    if docs is None:
+        if hybrid:
+            candidates = k * HYBRID_CANDIDATES_PER_RESULT
+            dense = _dense_search(index_dir, vectorstore, query, candidates, filter, partition_by)
+            lexical = get_bm25_index(index_dir, vectorstore).search(query, candidates, filter)
+            docs = reciprocal_rank_fusion([dense, lexical], k)
+        else:
+            docs = _dense_search(index_dir, vectorstore, query, k, filter, partition_by)
+        retrieval_cache.put(key, docs)
+    return list(docs)
+
+
+def retrieval_cache_stats() -> dict:
+    return {"query_embeddings": query_embedding_cache.stats(), "results": retrieval_cache.stats()}
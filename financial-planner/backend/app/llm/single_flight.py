@@ -0,0 +1,156 @@
+# Single-flight coalescing for Ollama generations.
+# Concurrent requests with the same cache key (see response_cache.make_cache_key)
+# share one in-flight generation: the first caller starts it, later callers
+# subscribe to its token stream. Every token is kept on the flight, so a
+# subscriber that joins mid-generation first replays what it missed and then
+# follows live. Blocking (`generate`) and streaming callers share the same
+# flight, e.g. /analyze and /analyze/stream for the same profile.
+#
+# The generation runs in its own task, so one subscriber disconnecting does
+# not cut off the others; it is cancelled only when the last subscriber leaves.
+# It waits for a scheduler slot at the most urgent priority among its
+# subscribers (see llm_scheduler.SharedPriority).
+import asyncio
+import weakref
+from typing import AsyncIterator, Awaitable, Callable
+
+from app.llm.llm_scheduler import SharedPriority, llm_priority, llm_shared_priority
+from app.llm.ollama_client import stream_generate
+
+
+class Flight:
+    """One in-flight generation and the tokens it has produced so far."""
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks = []
+        self.done = False
+        self.error = None
+        self.subscribers = 0
+        self.task = None
+        self.priority = SharedPriority(llm_priority.get())
+        self._changed = asyncio.Condition()
+
+    async def _publish(self, chunk: str | None = None, error: BaseException | None = None, done: bool = False):
+        async with self._changed:
+            if chunk:
+                self.chunks.append(chunk)
+            if done:
+                self.error = error
+                self.done = True
+            self._changed.notify_all()
+
+    async def subscribe(self) -> AsyncIterator[str]:
+        """Replay the tokens produced so far, then follow the generation until it ends."""
+        position = 0
+        while True:
+            while position < len(self.chunks):
+                yield self.chunks[position]
+                position += 1
+            if self.done:
+                if self.error is not None:
+                    raise self.error
+                return
+            async with self._changed:
+                await self._changed.wait_for(lambda: self.done or position < len(self.chunks))
+
+
+class SingleFlight:
+    def __init__(self):
+        self._flights = weakref.WeakKeyDictionary()  # event loop -> {key: Flight}
+        self.generations = 0
+        self.coalesced = 0
+        self.late_joins = 0  # coalesced after the first token had already arrived
+        self.cancelled = 0
+        self.max_subscribers = 0
+
+    def _loop_flights(self) -> dict:
+        loop = asyncio.get_running_loop()
+        flights = self._flights.get(loop)
+        if flights is None:
+            flights = self._flights[loop] = {}
+        return flights
+
+    def _start(self, key: str, prompt: str, model: str, options: dict,
+               on_complete: Callable[[str], Awaitable[None]] | None) -> Flight:
+        flights = self._loop_flights()
+        flight = Flight(key)
+
+        async def produce():
+            llm_shared_priority.set(flight.priority)  # this task's own context
+            try:
+                async for chunk in stream_generate(prompt, model=model, **options):
+                    await flight._publish(chunk)
+            except asyncio.CancelledError as e:
+                await flight._publish(error=e, done=True)
+                raise
+            except Exception as e:
+                await flight._publish(error=e, done=True)
+            else:
+                await flight._publish(done=True)
+                if on_complete is not None:
+                    # Still registered while storing, so new callers replay this flight
+                    # instead of missing the cache and generating again
+                    try:
+                        await on_complete("".join(flight.chunks).strip())
+                    except Exception as e:
+                        print(f"⚠️ Could not store generation: {e}")
+            finally:
+                if flights.get(key) is flight:
+                    del flights[key]
+
+        flights[key] = flight
+        flight.task = asyncio.create_task(produce())
+        self.generations += 1
+        return flight
+
+    async def stream(self, key: str, prompt: str, model: str, options: dict,
+                     on_complete: Callable[[str], Awaitable[None]] | None = None) -> AsyncIterator[str]:
+        """Tokens of the generation for `key`, joining an in-flight one when there is one.
+
+        `on_complete(output)` is awaited once, after a successful generation has been
+        delivered and before the flight stops accepting new subscribers.
+        """
+        flight = self._loop_flights().get(key)
+        if flight is None:
+            flight = self._start(key, prompt, model, options, on_complete)
+        else:
+            self.coalesced += 1
+            if flight.chunks:
+                self.late_joins += 1
+            flight.priority.raise_to(llm_priority.get())
+
+        flight.subscribers += 1
+        self.max_subscribers = max(self.max_subscribers, flight.subscribers)
+        try:
+            async for chunk in flight.subscribe():
+                yield chunk
+        finally:
+            flight.subscribers -= 1
+            if flight.subscribers == 0 and not flight.done:
+                # Nobody is listening any more; free the model for other work
+                flights = self._loop_flights()
+                if flights.get(key) is flight:
+                    del flights[key]
+                flight.task.cancel()
+                self.cancelled += 1
+
+    async def generate(self, key: str, prompt: str, model: str, options: dict,
+                       on_complete: Callable[[str], Awaitable[None]] | None = None) -> str:
+        chunks = [chunk async for chunk in self.stream(key, prompt, model, options, on_complete)]
+        return "".join(chunks).strip()
+
+    def stats(self) -> dict:
+        requests = self.generations + self.coalesced
+        return {
+            "generations": self.generations,
+            "generations_saved": self.coalesced,
+            "late_joins": self.late_joins,
+            "cancelled": self.cancelled,
+            "coalesce_rate": round(self.coalesced / requests, 3) if requests else 0.0,
+            "in_flight": sum(len(flights) for flights in self._flights.values()),
+            "max_subscribers": self.max_subscribers,
+        }
+
+
+single_flight = SingleFlight()
@@ -0,0 +1,112 @@
+# Compact stock documents for the market RAG index.
+# Instead of embedding a year of OHLCV rows per ticker, compute a handful of
+# numeric features for all tickers at once (vectorized over a date x ticker
+# price matrix) and emit small, consistently sized chunks.
+import re
+import textwrap
+
+import numpy as np
+import pandas as pd
+from langchain.schema import Document
+
+TRADING_DAYS = 252
+RETURN_WINDOWS = {"1m": 21, "3m": 63, "6m": 126, "1y": 252}
+MOVING_AVERAGES = (50, 200)
+PROFILE_CHUNK_CHARS = 600
+
+
+def close_prices(history: pd.DataFrame, tickers: list[str] | None = None) -> pd.DataFrame:
+    """Date x ticker matrix of closing prices from a (ticker, field) bulk download."""
+    if isinstance(history.columns, pd.MultiIndex):
+        close = history.xs("Close", axis=1, level=1)
+    else:
+        # Single-ticker downloads come back with flat field columns
+        close = history[["Close"]]
+        if tickers:
+            close = close.rename(columns={"Close": tickers[0]})
+    return close.dropna(how="all").astype(float)
+
+
+def compute_stock_features(close: pd.DataFrame) -> pd.DataFrame:
+    """One row per ticker: returns, volatility, drawdown and moving-average position."""
+    close = close.ffill()
+    last = close.iloc[-1]
+    features = pd.DataFrame(index=close.columns)
+    features["price"] = last
+
+    for name, window in RETURN_WINDOWS.items():
+        base = close.iloc[-min(window, len(close))]
+        features[f"return_{name}"] = (last / base - 1) * 100
+
+    log_returns = np.log(close / close.shift(1))
+    features["volatility"] = log_returns.std() * np.sqrt(TRADING_DAYS) * 100
+    features["max_drawdown"] = (close / close.cummax() - 1).min() * 100
+
+    for window in MOVING_AVERAGES:
+        moving_average = close.rolling(window, min_periods=min(window, len(close))).mean().iloc[-1]
+        features[f"vs_ma{window}"] = (last / moving_average - 1) * 100
+
+    features["high_52w"] = close.max()
+    features["low_52w"] = close.min()
+    return features.round(2)
+
+
+def _describe(symbol: str, row: pd.Series) -> str:
+    def pct(value):
+        return "n/a" if pd.isna(value) else f"{value:+.2f}%"
+
+    returns = ", ".join(f"{name} {pct(row[f'return_{name}'])}" for name in RETURN_WINDOWS)
+    trend = ", ".join(f"{pct(row[f'vs_ma{w}'])} vs {w}-day MA" for w in MOVING_AVERAGES)
+    return (
+        f"Ticker: {symbol}\n"
+        f"Price: {row['price']:.2f} (52w range {row['low_52w']:.2f} - {row['high_52w']:.2f})\n"
+        f"Returns: {returns}\n"
+        f"Volatility (annualized): {row['volatility']:.2f}%\n"
+        f"Max drawdown (1y): {row['max_drawdown']:.2f}%\n"
+        f"Trend: {trend}"
+    )
+
+
+def chunk_text(text: str, max_chars: int = PROFILE_CHUNK_CHARS) -> list[str]:
+    """Split on sentence boundaries into chunks of at most max_chars.
+
+    A sentence longer than max_chars is hard-wrapped on whitespace (and, for a
+    single unbroken word, mid-word) so no chunk exceeds the limit.
+    """
+    sentences = []
+    for sentence in re.split(r"(?<=[.!?])\s+", text.strip()):
+        if len(sentence) > max_chars:
+            sentences.extend(textwrap.wrap(sentence, max_chars, break_on_hyphens=False))
+        else:
+            sentences.append(sentence)
+    chunks, current = [], ""
+    for sentence in sentences:
+        if current and len(current) + len(sentence) + 1 > max_chars:
+            chunks.append(current)
+            current = sentence
+        else:
+            current = f"{current} {sentence}".strip()
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def build_stock_documents(history: pd.DataFrame, profiles: dict[str, str]) -> list[Document]:
+    """Feature summary chunk plus profile chunks for every ticker with price data.
+
+    `profiles` maps every requested ticker, in request order, to its business summary.
+    """
+    close = close_prices(history, list(profiles))
+    close = close.loc[:, close.notna().any()]
+    if close.empty:
+        return []
+    features = compute_stock_features(close)
+
+    docs = []
+    for symbol, row in features.iterrows():
+        docs.append(Document(page_content=_describe(symbol, row),
+                             metadata={"ticker": symbol, "kind": "features", "chunk": 0}))
+        for i, chunk in enumerate(chunk_text(profiles.get(symbol, "")), start=1):
+            docs.append(Document(page_content=f"Ticker: {symbol}\n{chunk}",
+                                 metadata={"ticker": symbol, "kind": "profile", "chunk": i}))
+    return docs
@@ -0,0 +1,41 @@
+# Explicit warmup for production: load the resources request handlers need
+# (embedding model, both FAISS indexes, the fund catalog's allocation
+# frontier and the Monte Carlo draws) before the first request arrives.
+import time
+
+from app.llm.resource_registry import get_embeddings, resource_stats
+
+WARMUP_COMPONENTS = ("embeddings", "market_index", "fund_index", "allocation_frontier", "monte_carlo")
+
+
+def load_embedding_model():
+    """Load the embedding model itself; the cache wrapper only loads it on its first miss."""
+    embeddings = get_embeddings()
+    return getattr(embeddings, "model", embeddings)
+
+
+def warm_up(components=WARMUP_COMPONENTS) -> dict:
+    """Load the requested components; returns per-component seconds or error."""
+    from app.core.allocation_optimizer import get_allocation_frontier
+    from app.core.monte_carlo import warm_up_shocks
+    from app.core.recommender_engine import load_vector_store
+    from app.llm.mcp_chatbot import load_fund_rag_vector_store
+
+    loaders = {
+        "embeddings": load_embedding_model,
+        "market_index": load_vector_store,
+        "fund_index": load_fund_rag_vector_store,
+        "allocation_frontier": get_allocation_frontier,
+        "monte_carlo": warm_up_shocks,
+    }
+
+    report = {}
+    for name in components:
+        start = time.perf_counter()
+        try:
+            loaders[name]()
+            report[name] = {"seconds": round(time.perf_counter() - start, 3)}
+        except Exception as e:
+            print(f"[Warmup Error] {name}: {e}")
+            report[name] = {"error": str(e)}
+    return {"components": report, "resources": resource_stats()}
@@ -1,15 +1,48 @@
-from fastapi import FastAPI, HTTPException
+import asyncio
+import io
+import json
+
+from fastapi import Depends, FastAPI, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
 
-from app.core.goal_suggester import GoalSuggester
-from app.core.planner_service import PlannerService
-from app.core.recommender_engine import query_ollama_for_portfolio
-from app.llm.mcp_chatbot import run_chatbot
+from app.config import WARMUP_ON_STARTUP
+from app.core.batch_planner import stream_batch_analysis
+from app.core.advisor_orchestrator import analyze_and_recommend
+from app.core.goal_rules import suggest_goals as suggest_user_goals
+from app.core.planner_service import EXPLANATION_UNAVAILABLE, PlannerService, resolve_stages, stage_stats
+from app.core.recommender_engine import query_ollama_for_portfolio, retrieve_market_context, stream_portfolio
+from app.llm.llm_scheduler import LLMUnavailable, llm_scheduler, set_llm_priority
+from app.llm.mcp_chatbot import run_chatbot, stream_chatbot
+from app.llm.ollama_client import close_clients
+from app.llm.resource_registry import embedding_cache_stats, resource_stats
+from app.llm.response_cache import response_cache
+from app.llm.retrieval_cache import retrieval_cache_stats
+from app.llm.single_flight import single_flight
+from app.llm.warmup import warm_up
 from app.models.user import User
 
 app = FastAPI()
 planner = PlannerService()
 
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+def ndjson_event(event: str, data) -> str:
+    return json.dumps({"event": event, "data": data}) + "\n"
+
+
+def llm_priority(priority: str):
+    """Route dependency: LLM calls made while serving the request queue at `priority`."""
+    async def dependency():  # async: a sync dependency would set it in a worker thread's context
+        set_llm_priority(priority)
+    return Depends(dependency)
+
+
+INTERACTIVE = [llm_priority("interactive")]
+BATCH = [llm_priority("batch")]
+
+
 from fastapi.middleware.cors import CORSMiddleware
 
 app.add_middleware(
@@ -19,18 +52,92 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+
+@app.exception_handler(LLMUnavailable)
+async def llm_unavailable_handler(request: Request, exc: LLMUnavailable):
+    return JSONResponse(status_code=exc.status_code, content={"detail": str(exc)},
+                        headers={"Retry-After": str(exc.retry_after)})
+
+@app.on_event("startup")
+async def startup():
+    # Heavy resources load lazily; opt in to loading them before traffic arrives
+    if WARMUP_ON_STARTUP:
+        await asyncio.to_thread(warm_up)
+
+@app.on_event("shutdown")
+async def shutdown():
+    await close_clients()
+
 @app.get("/")
 def root():
     return {"message": "Financial Planner API is running!"}
 
+@app.get("/metrics")
+def metrics():
+    return {
+        "resources": resource_stats(),
+        "llm_cache": response_cache.stats(),
+        "llm_single_flight": single_flight.stats(),
+        "llm_scheduler": llm_scheduler.stats(),
+        "embedding_cache": embedding_cache_stats(),
+        "retrieval_cache": retrieval_cache_stats(),
+        "planner_stages": stage_stats(),
+    }
+
+@app.post("/warmup")
+async def warmup():
+    return await asyncio.to_thread(warm_up)
+
+@app.post("/llm-cache/invalidate")
+def invalidate_llm_cache(tag: str | None = None):
+    response_cache.invalidate(tag)
+    return {"invalidated": tag or "all"}
+
 @app.post("/analyze")
-def analyze_user(user: User):
-    return planner.analyze_user(user)
+async def analyze_user(user: User, stages: str | None = None):
+    """`stages` is an optional comma-separated subset, e.g. "allocation,monte_carlo"."""
+    selected = [s.strip() for s in stages.split(",") if s.strip()] if stages else None
+    try:
+        resolve_stages(selected)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await planner.analyze_user(user, stages=selected)
+
+@app.post("/analyze/stream")
+async def analyze_user_stream(user: User):
+    async def events():
+        # Deterministic results go out before the first LLM token
+        summary = await asyncio.to_thread(planner.summarize, user)
+        yield ndjson_event("summary", summary)
+        try:
+            async for token in planner.stream_allocation_explanation(user, summary['recommended_allocation']):
+                yield ndjson_event("token", token)
+        except Exception as e:
+            print("LLM error:", e)
+            yield ndjson_event("error", EXPLANATION_UNAVAILABLE)
+        yield ndjson_event("done", None)
+
+    return StreamingResponse(events(), media_type=NDJSON_MEDIA_TYPE)
+
+@app.post("/analyze/batch", dependencies=BATCH)
+async def analyze_batch(request: Request, format: str = "jsonl", explain: bool = False):
+    """Body: JSONL or CSV of User records. Streams one NDJSON result per record."""
+    if format not in ("jsonl", "csv"):
+        raise HTTPException(status_code=400, detail="format must be 'jsonl' or 'csv'")
+
+    # Read the body up front: the streaming response competes with request.stream() for receive()
+    # Keep line endings so quoted CSV fields can contain newlines
+    lines = io.StringIO((await request.body()).decode("utf-8"), newline="")
+
+    async def results():
+        async for result in stream_batch_analysis(lines, format, explain=explain):
+            yield json.dumps(result) + "\n"
+
+    return StreamingResponse(results(), media_type=NDJSON_MEDIA_TYPE)
 
 @app.post("/suggest-goals/")
 async def suggest_goals(user_data: User):
-    suggester = GoalSuggester(user_data)
-    suggested_goals = suggester.suggest_goals()
+    suggested_goals = suggest_user_goals(user_data)
     return {
         "suggested_goals": [
             {"goal": goal, "reason": reason}
@@ -42,24 +149,68 @@ async def suggest_goals(user_data: User):
 @app.post("/get_stock_recommendations/")
 async def get_stock_recommendations(user: User):
     try:
-        # First, analyze the user's financial situation
-        summary = planner.analyze_user(user)
+        # Only the allocation feeds the portfolio prompt; skip the explanation generation
+        summary = await planner.analyze_user(user, stages=("allocation",))
         allocation = summary.get('recommended_allocation')
         # Query Ollama for stock recommendations based on user's profile and allocation
-        stock_recommendations = query_ollama_for_portfolio(user, allocation)
+        stock_recommendations = await query_ollama_for_portfolio(user, allocation)
 
         return {"recommendations": stock_recommendations}
 
+    except LLMUnavailable:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"An error occurred: {str(e)}")
 
 
+@app.post("/get_stock_recommendations/stream")
+async def get_stock_recommendations_stream(user: User):
+    """NDJSON: one "pick" event per recommendation as soon as the model has finished it."""
+    summary = await planner.analyze_user(user, stages=("allocation",))
+    allocation = summary['recommended_allocation']
+    context = await asyncio.to_thread(retrieve_market_context)
+
+    async def events():
+        yield ndjson_event("allocation", allocation)
+        try:
+            async for kind, key, value in stream_portfolio(user, allocation, context):
+                if kind == "item":
+                    yield ndjson_event("pick", {"bucket": key, "pick": value})
+                else:
+                    yield ndjson_event("field", {"key": key, "value": value})
+        except Exception as e:
+            print("LLM error:", e)
+            yield ndjson_event("error", str(e) if isinstance(e, LLMUnavailable) else "Portfolio generation failed")
+        yield ndjson_event("done", None)
+
+    return StreamingResponse(events(), media_type=NDJSON_MEDIA_TYPE)
+
+
+@app.post("/advise")
+async def advise(user: User):
+    """Analysis, allocation explanation and portfolio picks in one call, computed concurrently."""
+    return await analyze_and_recommend(user, planner)
+
+
 class ChatRequest(BaseModel):
     message: str
     user_profile: dict
     fund_query: str = ""
 
-@app.post("/chat")
+@app.post("/chat", dependencies=INTERACTIVE)
 async def chat_endpoint(req: ChatRequest):
-    response = run_chatbot(req.message, req.user_profile, req.fund_query)
-    return {"response": response}
\ No newline at end of file
+    response = await run_chatbot(req.message, req.user_profile, req.fund_query)
+    return {"response": response}
+
+@app.post("/chat/stream", dependencies=INTERACTIVE)
+async def chat_stream_endpoint(req: ChatRequest):
+    async def events():
+        try:
+            async for token in stream_chatbot(req.message, req.user_profile, req.fund_query):
+                yield ndjson_event("token", token)
+        except LLMUnavailable as e:
+            # Headers are already sent; report overload in-band
+            yield ndjson_event("error", str(e))
+        yield ndjson_event("done", None)
+
+    return StreamingResponse(events(), media_type=NDJSON_MEDIA_TYPE)
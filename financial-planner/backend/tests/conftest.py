@@ -0,0 +1,22 @@
+# Keep the on-disk caches of the app out of the working tree during tests.
+import os
+import tempfile
+
+import pytest
+
+_cache_dir = tempfile.mkdtemp(prefix="financial-planner-tests-")
+os.environ.setdefault("LLM_CACHE_PATH", os.path.join(_cache_dir, "llm_responses.sqlite3"))
+os.environ.setdefault("EMBEDDING_CACHE_DIR", os.path.join(_cache_dir, "embeddings"))
+
+
+@pytest.fixture
+def fake_embeddings(monkeypatch):
+    """Deterministic hash embeddings in place of the sentence-transformers model."""
+    from langchain_core.embeddings import DeterministicFakeEmbedding
+
+    from app.config import EMBEDDING_MODEL
+    from app.llm import resource_registry
+
+    embeddings = DeterministicFakeEmbedding(size=16)
+    monkeypatch.setitem(resource_registry._resources, f"embeddings:{EMBEDDING_MODEL}", embeddings)
+    return embeddings
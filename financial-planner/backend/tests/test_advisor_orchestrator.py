@@ -0,0 +1,89 @@
+# /advise orchestration: concurrent stages and per-stage deadlines.
+#
+#   python -m pytest tests/test_advisor_orchestrator.py -q
+import asyncio
+import time
+
+import pytest
+
+from app.core import advisor_orchestrator
+from app.core.advisor_orchestrator import analyze_and_recommend
+from app.core.planner_service import EXPLANATION_UNAVAILABLE, PlannerService
+from tests.test_planner_service import make_user
+
+
+@pytest.fixture
+def stages(monkeypatch):
+    """Stub retrieval and generations; set `delays[stage]` to slow one down."""
+    delays = {"retrieval": 0.0, "explanation": 0.0, "portfolio": 0.0}
+    seen = {"running": set(), "overlapped": False}
+
+    async def generation(name):
+        seen["running"].add(name)
+        seen["overlapped"] |= seen["running"] == {"explanation", "portfolio"}
+        await asyncio.sleep(delays[name])
+        seen["running"].discard(name)
+
+    def retrieve(k):
+        time.sleep(delays["retrieval"])
+        return "market context"
+
+    async def explain(self, user, allocation):
+        await generation("explanation")
+        return "explained"
+
+    async def portfolio(user, allocation, context):
+        seen["context"] = context
+        await generation("portfolio")
+        return {"equity_picks": ["A"]}
+
+    monkeypatch.setattr(advisor_orchestrator, "retrieve_market_context", retrieve)
+    monkeypatch.setattr(advisor_orchestrator, "generate_portfolio", portfolio)
+    monkeypatch.setattr(PlannerService, "_explain_allocation_with_llm", explain)
+    return delays, seen
+
+
+def advise(**deadlines):
+    return asyncio.run(analyze_and_recommend(make_user(), deadlines=deadlines))
+
+
+def test_generations_run_side_by_side(stages):
+    delays, seen = stages
+    delays.update(explanation=0.2, portfolio=0.1)
+    result = advise()
+    assert result["allocation_explanation"] == "explained"
+    assert result["recommendations"] == {"equity_picks": ["A"]} and seen["context"] == "market context"
+    assert seen["overlapped"]
+    assert {"analysis", "retrieval", "explanation", "portfolio", "total"} <= set(result["timings_ms"])
+
+
+def test_missed_explanation_deadline_keeps_the_picks(stages):
+    delays, _ = stages
+    delays["explanation"] = 1.0
+    result = advise(explanation=0.05)
+    assert result["allocation_explanation"] == EXPLANATION_UNAVAILABLE
+    assert result["recommendations"] == {"equity_picks": ["A"]}
+
+
+def test_missed_retrieval_deadline_generates_without_context(stages):
+    delays, seen = stages
+    delays["retrieval"] = 0.5
+    result = advise(retrieval=0.05)
+    assert seen["context"] == "" and result["recommendations"] == {"equity_picks": ["A"]}
+
+
+def test_missed_portfolio_deadline_is_reported(stages):
+    delays, _ = stages
+    delays["portfolio"] = 1.0
+    result = advise(portfolio=0.05)
+    assert result["recommendations"] == {"error": "Portfolio generation missed its deadline"}
+    assert result["allocation_explanation"] == "explained"
+
+
+def test_failed_analysis_fails_the_request(stages, monkeypatch):
+    def broken(self, user):
+        raise RuntimeError("bad profile")
+
+    monkeypatch.setattr(PlannerService, "summarize", broken)
+    with pytest.raises(RuntimeError, match="bad profile"):
+        advise()
@@ -0,0 +1,60 @@
+# Precomputed allocation table: caps, determinism and the frontier.
+#
+#   python -m pytest tests/test_allocation_optimizer.py -q
+import numpy as np
+import pytest
+
+from app.core.allocation_optimizer import MAX_CLASS_WEIGHT, RISK_CODES, RISK_PROFILES, AllocationFrontier
+from app.data.catalog import FundCatalog
+from app.data.investment_data import extended_investment_db
+
+
+@pytest.fixture(scope="module")
+def frontier():
+    return AllocationFrontier(FundCatalog(extended_investment_db))
+
+
+@pytest.mark.parametrize("profile", RISK_PROFILES)
+def test_lookup_respects_equity_and_commodities_caps(frontier, profile):
+    for cap in range(101):
+        allocation = frontier.lookup(profile, equity_cap=cap)
+        assert sum(allocation.values()) == 100
+        assert min(allocation.values()) >= 0
+        assert allocation["equity"] <= cap
+        assert allocation["commodities"] <= MAX_CLASS_WEIGHT["commodities"] * 100
+
+
+def test_out_of_range_caps_are_clamped(frontier):
+    assert frontier.lookup("balanced", equity_cap=-20)["equity"] == 0
+    assert frontier.lookup("balanced", equity_cap=250) == frontier.lookup("balanced")
+
+
+def test_equity_rises_with_risk_appetite_and_cap(frontier):
+    uncapped = [frontier.lookup(profile)["equity"] for profile in RISK_PROFILES]
+    assert uncapped == sorted(uncapped) and uncapped[0] < uncapped[-1]
+    for code in RISK_CODES.values():
+        assert np.all(np.diff(frontier.table[code, :, 0]) >= 0)
+
+
+def test_table_is_deterministic(frontier):
+    rebuilt = AllocationFrontier(FundCatalog(extended_investment_db))
+    assert np.array_equal(rebuilt.table, frontier.table)
+
+
+def test_lookup_batch_matches_lookup(frontier):
+    codes, caps = np.array([0, 1, 2, 2]), np.array([100, 45, 60, 0])
+    batch = frontier.lookup_batch(codes, caps)
+    for row, code, cap in zip(batch, codes, caps):
+        assert dict(zip(("equity", "bonds", "commodities"), row)) == frontier.lookup(RISK_PROFILES[code], cap)
+
+
+def test_frontier_is_efficient(frontier):
+    volatility, expected = frontier.frontier["volatility"], frontier.frontier["expected_return"]
+    assert np.all(np.diff(volatility) >= 0) and np.all(np.diff(expected) > 0)
+
+
+def test_asset_class_without_schemes_gets_no_weight():
+    catalog = FundCatalog({name: scheme for name, scheme in extended_investment_db.items()
+                           if scheme.get("category") not in ("ETF", "Commodity")})
+    assert catalog.screen_names(asset_class="commodities") == []
+    assert np.all(AllocationFrontier(catalog).table[:, :, 2] == 0)
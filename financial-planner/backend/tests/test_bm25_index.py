@@ -0,0 +1,87 @@
+# BM25 lexical index and reciprocal rank fusion with the dense ranking.
+#
+#   python -m pytest tests/test_bm25_index.py -q
+import math
+from collections import Counter
+
+import numpy as np
+import pytest
+from langchain.schema import Document
+
+from app.llm import resource_registry
+from app.llm.bm25_index import BM25Index, get_bm25_index, reciprocal_rank_fusion, tokenize
+from app.llm.incremental_index import update_index
+from app.llm.retrieval_cache import cached_similarity_search, retrieval_cache
+
+NOTES = [
+    ("Alpha", "Exit load of 1% if redeemed within one year."),
+    ("Alpha", "Large cap equity fund with a Sharpe ratio of 1.2 and low expense ratio."),
+    ("Beta", "ELSS fund: tax saving under section 80C, three year lock-in."),
+    ("Beta", "No exit load. Gains above 1 lakh are taxed as LTCG at 10%."),
+    ("Gamma", "Gold ETF tracking domestic gold prices; no exit load, no lock-in."),
+]
+
+
+def notes():
+    return [Document(page_content=text, metadata={"fund": fund, "chunk": i}) for i, (fund, text) in enumerate(NOTES)]
+
+
+def reference_scores(documents, query, k1=1.5, b=0.75):
+    """Textbook Okapi BM25, one document at a time."""
+    counts = [Counter(tokenize(doc.page_content)) for doc in documents]
+    avg_length = sum(sum(c.values()) for c in counts) / len(counts)
+    scores = []
+    for c in counts:
+        length = sum(c.values())
+        score = 0.0
+        for term in set(tokenize(query)):
+            df = sum(term in other for other in counts)
+            tf = c.get(term, 0)
+            idf = math.log(1 + (len(counts) - df + 0.5) / (df + 0.5))
+            score += idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * length / avg_length))
+        scores.append(score)
+    return scores
+
+
+@pytest.mark.parametrize("query", ["exit load", "80C tax saving", "LTCG", "sharpe ratio expense", "gold lock-in"])
+def test_ranking_matches_reference_bm25(query):
+    documents = notes()
+    expected = reference_scores(documents, query)
+    ranked = [row for row in np.argsort(expected, kind="stable")[::-1] if expected[row] > 0]
+    hits = BM25Index(documents).search(query, k=len(documents))
+    assert [documents.index(doc) for doc in hits] == ranked
+
+
+def test_top_k_and_no_match():
+    index = BM25Index(notes())
+    assert [doc.page_content for doc in index.search("80C", k=1)] == [NOTES[2][1]]
+    assert len(index.search("exit load", k=2)) == 2
+    assert index.search("cryptocurrency", k=3) == []
+
+
+def test_filter_restricts_to_matching_metadata():
+    hits = BM25Index(notes()).search("exit load", k=5, filter={"fund": "Beta"})
+    assert [doc.metadata["fund"] for doc in hits] == ["Beta"]
+    assert BM25Index(notes()).search("exit load", k=5, filter={"fund": "Delta"}) == []
+
+
+def test_reciprocal_rank_fusion():
+    a, b, c, d = (Document(page_content=name) for name in "abcd")
+    # b is second in both lists and beats a and c, which lead one list each but miss the other
+    assert reciprocal_rank_fusion([[a, b, d], [c, b]], k=3) == [b, a, c]
+    assert reciprocal_rank_fusion([[a, b], []], k=5) == [a, b]
+
+
+def test_hybrid_search_surfaces_exact_terms(tmp_path, fake_embeddings):
+    index_dir = str(tmp_path / "notes")
+    update_index(notes(), index_dir)
+    try:
+        store = resource_registry.get_vector_store(index_dir)
+        bm25 = get_bm25_index(index_dir, store)
+        assert get_bm25_index(index_dir, store) is bm25 and bm25.version == store.version
+        hits = cached_similarity_search(index_dir, "LTCG", k=2, hybrid=True)
+        # Hash embeddings carry no meaning; only the lexical side can find the term
+        assert NOTES[3][1] in [doc.page_content for doc in hits]
+    finally:
+        resource_registry.invalidate(resource_registry._vector_store_key(index_dir))
+        retrieval_cache.clear()
@@ -0,0 +1,71 @@
+# Columnar fund catalog: secondary indexes, screening filters and ranking.
+#
+#   python -m pytest tests/test_catalog.py -q
+import pytest
+
+from app.data.catalog import FundCatalog
+
+
+def scheme(category, sub_category, term, risk, expense, sharpe=None, one_year=None):
+    return {"category": category, "sub_category": sub_category, "term": term, "risk_level": risk,
+            "expense_ratio": expense, "sharpe_ratio": sharpe, "returns": {"1yr": one_year}}
+
+
+catalog = FundCatalog({
+    "Growth": scheme("Mutual Fund", "Equity", "Long", "High", 1.0, 1.1, 18.0),
+    "Large Cap": scheme("Mutual Fund", "Large Cap", "Long", "Moderate", 1.2, 0.9, 14.0),
+    "Index": scheme("Mutual Fund", "Large Cap", "Long", "Moderate", 0.2, 1.3, 12.0),
+    "Gilt": scheme("Bond", "Government", "Long", "Low", 0.0, None, 7.0),
+    "Bank Bond": scheme("Bond", "PSU", "Short-Mid", "Low-Medium", 0.0, None, 7.5),
+    "Gold": scheme("ETF", "Gold", "Mid-Long", "Medium", 0.8, 0.7, 11.0),
+})
+
+
+def test_indexes_and_asset_classes():
+    assert catalog.values("asset_class") == ["bonds", "commodities", "equity"]
+    assert catalog.values("term") == ["Long", "Mid", "Short"]  # "Short-Mid" indexed under both parts
+    assert catalog.screen_names(asset_class="bonds", rank_by=None) == ["Gilt", "Bank Bond"]
+    assert catalog.screen_names(term="Mid", rank_by=None) == ["Bank Bond", "Gold"]
+
+
+def test_categorical_filters_intersect_and_accept_lists():
+    assert catalog.screen_names(category="Mutual Fund", sub_category="Large Cap") == ["Index", "Large Cap"]
+    assert catalog.screen_names(sub_category=["Gold", "Government"], rank_by=None) == ["Gilt", "Gold"]
+    assert catalog.screen_names(category="Unknown") == []
+
+
+def test_numeric_filters():
+    assert catalog.screen_names(max_risk="Moderate", asset_class="equity") == ["Index", "Large Cap"]
+    assert catalog.screen_names(max_expense_ratio=0.5, asset_class="equity") == ["Index"]
+    assert catalog.screen_names(min_sharpe=1.0) == ["Index", "Growth"]
+    assert catalog.screen_names(min_returns={"1yr": 12.0}, rank_by="return_1yr") == ["Growth", "Large Cap", "Index"]
+
+
+def test_ranking_puts_missing_values_last_and_limits():
+    assert catalog.screen_names(rank_by="sharpe_ratio")[-2:] == ["Gilt", "Bank Bond"]
+    assert catalog.screen_names(rank_by="expense_ratio", ascending=True, limit=2) == ["Gilt", "Bank Bond"]
+    frame = catalog.screen(asset_class="equity", limit=1)
+    assert frame["name"].tolist() == ["Index"] and frame.iloc[0]["expense_ratio"] == 0.2
+
+
+def test_unknown_risk_level_is_a_value_error():
+    with pytest.raises(ValueError, match="Low, Low-Medium"):
+        catalog.screen_names(max_risk="Very High")
+
+
+def test_shortlist_follows_risk_profile():
+    assert catalog.shortlist("conservative") == {"equity": [], "bonds": ["Gilt", "Bank Bond"], "commodities": []}
+    assert catalog.shortlist("aggressive", per_asset_class=1) == {
+        "equity": ["Index"], "bonds": ["Gilt"], "commodities": ["Gold"]}
+
+
+def test_shortlist_never_contradicts_the_allocation():
+    # Conservative users may still hold some equity: fall back to the lowest-risk schemes
+    shortlist = catalog.shortlist("conservative", allocation={"equity": 20, "bonds": 80, "commodities": 0})
+    assert shortlist == {"equity": ["Large Cap", "Index"], "bonds": ["Gilt", "Bank Bond"]}
+
+
+def test_peers():
+    assert catalog.peers("Growth") == ["Index", "Large Cap"]
+    assert catalog.peers("Growth", "balanced", limit=1) == ["Index"]
+    assert catalog.peers("Unknown") == []
@@ -0,0 +1,78 @@
+# Persistent embedding cache: sharing between processes and lazy model loading.
+#
+#   python -m pytest tests/test_embedding_cache.py -q
+import numpy as np
+import pytest
+
+from app.llm import embedding_cache, resource_registry
+from app.llm.embedding_cache import CachedEmbeddings, EmbeddingStore, text_hash
+
+
+class CountingModel:
+    def __init__(self):
+        self.calls = []
+
+    def embed_documents(self, texts):
+        self.calls.append(list(texts))
+        return [[float(len(text)), 1.0, 0.0] for text in texts]
+
+    def embed_query(self, text):
+        self.calls.append([text])
+        return [float(len(text)), 0.0, 1.0]
+
+
+def test_store_opened_before_the_first_write_elsewhere(tmp_path):
+    # The reader opens the empty store first; another process then writes the first vectors
+    reader = EmbeddingStore("model", str(tmp_path))
+    writer = EmbeddingStore("model", str(tmp_path))
+    assert reader.dim is None
+    writer.add(["a", "b"], np.array([[1, 2], [3, 4]], dtype=np.float32))
+
+    found = reader.lookup(["a", "b", "c"])
+    assert reader.dim == 2
+    assert found["b"].tolist() == [3.0, 4.0] and "c" not in found
+
+
+def test_appends_from_two_stores_do_not_overlap(tmp_path):
+    first = EmbeddingStore("model", str(tmp_path))
+    second = EmbeddingStore("model", str(tmp_path))
+    first.add(["a"], np.array([[1, 1]], dtype=np.float32))
+    second.add(["b"], np.array([[2, 2]], dtype=np.float32))
+    assert first.lookup(["b"])["b"].tolist() == [2.0, 2.0]
+    assert EmbeddingStore("model", str(tmp_path)).lookup(["a"])["a"].tolist() == [1.0, 1.0]
+
+
+def test_dimension_mismatch_is_rejected(tmp_path):
+    store = EmbeddingStore("model", str(tmp_path))
+    store.add(["a"], np.zeros((1, 2), dtype=np.float32))
+    with pytest.raises(ValueError, match="does not match"):
+        store.add(["b"], np.zeros((1, 3), dtype=np.float32))
+
+
+def test_model_only_loaded_and_run_for_unseen_text(tmp_path):
+    model = CountingModel()
+    embeddings = CachedEmbeddings("model", lambda: model, str(tmp_path))
+    first = embeddings.embed_documents(["alpha", "beta", "alpha"])
+    assert model.calls == [["alpha", "beta"]]
+
+    restarted = CachedEmbeddings("model", lambda: pytest.fail("model loaded for cached text"), str(tmp_path))
+    assert restarted.embed_documents(["beta", "alpha"]) == [first[1], first[0]]
+    assert restarted.stats()["model_loaded"] is False and restarted.hits == 2
+
+
+def test_queries_and_documents_are_cached_separately(tmp_path):
+    embeddings = CachedEmbeddings("model", CountingModel, str(tmp_path))
+    assert text_hash("x", "query") != text_hash("x")
+    assert embeddings.embed_query("same") != embeddings.embed_documents(["same"])[0]
+
+
+def test_no_file_locking_falls_back_to_the_model(monkeypatch):
+    import langchain_community.embeddings
+
+    monkeypatch.setattr(embedding_cache, "FILE_LOCKING", False)
+    monkeypatch.setattr(langchain_community.embeddings, "HuggingFaceEmbeddings", lambda model_name: CountingModel())
+    embeddings = resource_registry.get_embeddings("no-locking-model")
+    try:
+        assert isinstance(embeddings, CountingModel)
+    finally:
+        resource_registry.invalidate("embeddings:no-locking-model")
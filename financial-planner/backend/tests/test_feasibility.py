@@ -0,0 +1,60 @@
+# Vectorized goal feasibility against the original per-goal loop it replaced.
+#
+#   python -m pytest tests/test_feasibility.py -q
+import numpy as np
+
+from app.core.feasibility import project_goals
+
+
+def legacy_goal(n, P, SIP, target):
+    """The original PlannerService._check_goal_feasibility arithmetic."""
+    r_annual = 0.06 if n <= 36 else 0.08 if n <= 84 else 0.10
+    r_monthly = r_annual / 12
+    future_value = P * pow(1 + r_monthly, n) + SIP * (((pow(1 + r_monthly, n) - 1) / r_monthly) * (1 + r_monthly))
+    feasible = future_value >= target
+    extra_months = 0
+    if not feasible:
+        fv = future_value
+        while fv < target and extra_months < 120:
+            extra_months += 1
+            total_months = n + extra_months
+            fv = P * pow(1 + r_monthly, total_months) + SIP * (
+                ((pow(1 + r_monthly, total_months) - 1) / r_monthly) * (1 + r_monthly))
+    return feasible, future_value, extra_months
+
+
+def assert_matches_legacy(months, savings, sip, target):
+    projection = project_goals(months, savings, sip, target)
+    for i, args in enumerate(zip(months, savings, sip, target)):
+        feasible, future_value, extra_months = legacy_goal(*args)
+        assert bool(projection["feasible"][i]) == feasible, args
+        assert np.isclose(projection["projected_value"][i], future_value), args
+        if not feasible:
+            assert int(projection["extend_by_months"][i]) == extra_months, args
+
+
+def test_random_goals_match_legacy_loop():
+    rng = np.random.default_rng(0)
+    size = 20000
+    months = rng.integers(1, 400, size)
+    savings = rng.uniform(0, 2e6, size)
+    sip = rng.uniform(0, 5e4, size)
+    target = rng.uniform(1e4, 5e7, size)
+    assert_matches_legacy(months.tolist(), savings.tolist(), sip.tolist(), target.tolist())
+
+
+def test_negative_savings_or_sip_match_legacy_loop():
+    # P + A <= 0: the closed form does not apply
+    rng = np.random.default_rng(1)
+    size = 5000
+    months = rng.integers(1, 400, size)
+    savings = rng.uniform(-2e6, 2e6, size)
+    sip = rng.uniform(-5e4, 5e4, size)
+    target = rng.uniform(-5e6, 5e7, size)
+    assert_matches_legacy(months.tolist(), savings.tolist(), sip.tolist(), target.tolist())
+
+
+def test_negative_sip_hand_picked():
+    # Closed form alone gave 2 months here; the loop never reaches the target
+    assert_matches_legacy([12, 60, 240], [-1000.0, 0.0, 5000.0], [-500.0, -100.0, -200.0],
+                          [-20000.0, 1000.0, 10000.0])
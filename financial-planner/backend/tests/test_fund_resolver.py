@@ -0,0 +1,65 @@
+# Fund-name resolution: each lookup path, misses, and false positives in free text.
+# The micro-benchmark against the old rapidfuzz scan lives in the module CLI:
+#
+#   python -m app.llm.fund_resolver
+#   python -m pytest tests/test_fund_resolver.py -q
+import pytest
+
+from app.data.investment_data import extended_investment_db
+from app.llm.fund_resolver import FundResolver
+
+resolver = FundResolver(extended_investment_db)
+
+
+def test_exact_name_any_case_and_punctuation():
+    assert resolver.resolve("HDFC Flexi Cap Fund") == "HDFC Flexi Cap Fund"
+    assert resolver.resolve("  hdfc flexi-cap fund ") == "HDFC Flexi Cap Fund"
+
+
+def test_alias_and_derived_short_name():
+    assert resolver.resolve("nippon gold") == "Nippon India Gold ETF"
+    assert resolver.resolve("axis blue chip") == "Axis Bluechip Fund"
+    assert resolver.resolve("icici silver") == "ICICI Prudential Silver ETF"
+
+
+def test_isin():
+    assert resolver.resolve("INF179K01HQ2") == "HDFC Flexi Cap Fund"
+    assert resolver.resolve("in0020200071") == "GOI Savings Bond 2030"
+
+
+def test_placeholder_isin_is_not_indexed():
+    # PSU Bank Bond carries "N/A"; it must not make "n a" resolve to it
+    assert resolver.resolve_all("n a") == []
+
+
+def test_fuzzy_hits_on_typos():
+    assert resolver.resolve("axis bluechp fund") == "Axis Bluechip Fund"
+    assert resolver.resolve("hdfc flexicap fund") == "HDFC Flexi Cap Fund"
+    assert resolver.resolve("goi savings bond") == "GOI Savings Bond 2030"
+
+
+@pytest.mark.parametrize("query", ["", "unknown smallcap", "bond", "hdfc", "gold", "etf", "fund", "silver"])
+def test_misses(query):
+    assert resolver.resolve(query) is None
+
+
+def test_one_word_short_names_are_not_indexed():
+    catalog = {"Gold ETF": {"isin": "N/A"}, "Liquid Fund": {"isin": None}}
+    assert FundResolver(catalog, aliases={}).resolve_all("is gold or a liquid option better?") == []
+
+
+def test_resolve_all_multiple_funds_longest_match_first():
+    message = "Should I move from HDFC Flexi Cap Fund to nippon gold, or hold INF846K01V59?"
+    assert resolver.resolve_all(message) == ["HDFC Flexi Cap Fund", "Nippon India Gold ETF", "Axis Bluechip Fund"]
+    assert resolver.resolve_all("hdfc flexi vs hdfc flexi cap fund") == ["HDFC Flexi Cap Fund"]
+
+
+@pytest.mark.parametrize("message", [
+    "Should I buy more bonds or gold this year?",
+    "Is an HDFC fund better than an ICICI one?",
+    "What is a good silver ETF allocation for a balanced investor?",
+    "Compare flexi cap and bluechip funds in general",
+    "I hold a savings bond from 2030",
+])
+def test_resolve_all_ignores_generic_words(message):
+    assert resolver.resolve_all(message) == []
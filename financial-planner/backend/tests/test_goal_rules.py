@@ -0,0 +1,86 @@
+# Declarative goal rules: scalar and bulk evaluation against the original if-chain.
+#
+#   python -m pytest tests/test_goal_rules.py -q
+import random
+
+from app.core.goal_rules import ACHIEVED_GOAL_REASON, GOAL_RULES, suggest_goals, suggest_goals_bulk
+from app.core.goal_suggester import GoalSuggester
+from app.models.goal import Goal
+from app.models.loan import Loan
+from app.models.user import User
+
+
+def legacy_goals(user: User) -> list[str]:
+    """Goal names from the original GoalSuggester.suggest_goals if-chain."""
+    total_emi = sum(loan.installment for loan in user.loans)
+    goal_names = [goal.name.lower() for goal in user.goals]
+    insurances = [ins.lower() for ins in user.insurances]
+
+    def insured(*words):
+        return any(word in ins for ins in insurances for word in words)
+
+    goals = []
+    if user.emergency_fund < 6 * (user.expenses + total_emi):
+        goals.append("Start/Increase Emergency Fund")
+    if user.dependents > 0 and not insured("life"):
+        goals.append("Get Life Insurance")
+    if user.income > 0 and not insured("health"):
+        goals.append("Get Health Insurance")
+    if any("car" in loan.type.lower() for loan in user.loans) and not insured("auto", "car"):
+        goals.append("Get Auto Insurance")
+    if any("home" in name for name in goal_names) or (user.expenses > 0.3 * user.income and not insured("home", "rent")):
+        goals.append("Consider Homeowners or Renters Insurance")
+    if user.income > 50000 and not insured("disability"):
+        goals.append("Get Disability Insurance")
+    if user.age >= 50 and not insured("long-term care"):
+        goals.append("Plan for Long-Term Care Insurance")
+    if any("travel" in name for name in goal_names) and not insured("travel"):
+        goals.append("Consider Travel Insurance")
+    if user.age >= 30 and "retirement" not in goal_names:
+        goals.append("Plan for Retirement Savings")
+    elif user.age >= 50 and "retirement" in goal_names:
+        goals.append("Accelerate Retirement Planning")
+    if any(loan.interest_rate > 10 for loan in user.loans):
+        goals.append("Focus on High-Interest Debt Repayment")
+    if user.income - user.expenses - total_emi > 10000 and "sip" not in goal_names:
+        goals.append("Start Wealth-Building SIP")
+    for goal in user.goals:
+        if goal.current_savings >= goal.target_amount:
+            goals.append(f"Review '{goal.name}' — Already Achieved")
+    return goals
+
+
+INSURANCES = ["Life", "Health", "Car", "Auto", "Home", "Rent", "Disability", "Long-Term Care", "Travel"]
+GOAL_NAMES = ["Retirement", "Home Purchase", "Travel Fund", "SIP", "Education", "Wedding"]
+LOAN_TYPES = ["Car Loan", "Home Loan", "Personal"]
+
+
+def random_user(rng: random.Random) -> User:
+    return User(
+        name=f"user{rng.random():.6f}", age=rng.randint(20, 70), income=rng.choice([0, 30000, 60000, 200000]),
+        expenses=rng.uniform(5000, 80000), dependents=rng.randint(0, 3), emergency_fund=rng.uniform(0, 1e6),
+        insurances=rng.sample(INSURANCES, rng.randint(0, 4)),
+        loans=[Loan(type=rng.choice(LOAN_TYPES), amount=1e5, tenure_months=60, installment=rng.uniform(0, 20000),
+                    interest_rate=rng.uniform(6, 14)) for _ in range(rng.randint(0, 2))],
+        goals=[Goal(name=name, target_amount=1e5, months_to_achieve=24, current_savings=rng.uniform(0, 1.5e5),
+                    sip=1000, priority="high") for name in rng.sample(GOAL_NAMES, rng.randint(0, 3))],
+        risk_profile="balanced",
+    )
+
+
+def test_scalar_and_bulk_match_the_original_rules():
+    rng = random.Random(0)
+    users = [random_user(rng) for _ in range(2000)]
+    reasons = {rule.goal: rule.reason for rule in GOAL_RULES}
+    bulk = suggest_goals_bulk(users)
+    for user, bulk_suggestions in zip(users, bulk):
+        suggestions = suggest_goals(user)
+        assert [goal for goal, _ in suggestions] == legacy_goals(user), user
+        assert all(reason == reasons.get(goal, ACHIEVED_GOAL_REASON) for goal, reason in suggestions)
+        assert bulk_suggestions == suggestions
+
+
+def test_goal_suggester_wrapper_and_empty_batch():
+    user = random_user(random.Random(2))
+    assert GoalSuggester(user).suggest_goals() == suggest_goals(user)
+    assert suggest_goals_bulk([]) == []
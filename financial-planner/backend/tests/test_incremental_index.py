@@ -0,0 +1,106 @@
+# Incremental FAISS updates: only new/changed documents are embedded, missing ones pruned.
+#
+#   python -m pytest tests/test_incremental_index.py -q
+import pytest
+from langchain.schema import Document
+
+from app.llm import resource_registry
+from app.llm.incremental_index import id_prefix, load_manifest, update_index
+from app.llm.resource_registry import get_vector_store
+
+
+def doc(fund, text, chunk=0, **metadata):
+    return Document(page_content=text, metadata={"fund": fund, "chunk": chunk, **metadata})
+
+
+@pytest.fixture
+def index_dir(tmp_path, fake_embeddings):
+    directory = str(tmp_path / "index")
+    yield directory
+    resource_registry.invalidate(resource_registry._vector_store_key(directory))
+
+
+@pytest.fixture
+def embedded(fake_embeddings, monkeypatch):
+    """Texts passed to the embedding model."""
+    texts = []
+    embed_documents = fake_embeddings.embed_documents
+    monkeypatch.setattr(type(fake_embeddings), "embed_documents",
+                        lambda self, batch: texts.extend(batch) or embed_documents(batch))
+    return texts
+
+
+def stored(index_dir) -> dict:
+    """doc id -> page content of what the live vector store holds."""
+    store = get_vector_store(index_dir)
+    return {doc_id: store.docstore.search(doc_id).page_content for doc_id in store.index_to_docstore_id.values()}
+
+
+def test_first_run_adds_everything(index_dir, embedded):
+    report = update_index([doc("Alpha", "a0"), doc("Alpha", "a1", chunk=1), doc("Beta", "b0")], index_dir)
+    assert report == {"added": 3, "updated": 0, "removed": 0, "unchanged": 0}
+    assert stored(index_dir) == {"fund:Alpha:0": "a0", "fund:Alpha:1": "a1", "fund:Beta:0": "b0"}
+    assert sorted(embedded) == ["a0", "a1", "b0"]
+    assert load_manifest(index_dir)["version"] == 1
+
+
+def test_unchanged_documents_are_not_re_embedded(index_dir, embedded):
+    update_index([doc("Alpha", "a0", date="2024-01-01")], index_dir)
+    embedded.clear()
+    # The scrape date is volatile metadata and does not count as a change
+    report = update_index([doc("Alpha", "a0", date="2024-02-01")], index_dir)
+    assert report == {"added": 0, "updated": 0, "removed": 0, "unchanged": 1}
+    assert embedded == [] and load_manifest(index_dir)["version"] == 1
+
+
+def test_changed_document_replaces_its_vector(index_dir, embedded):
+    update_index([doc("Alpha", "old"), doc("Beta", "b0")], index_dir)
+    embedded.clear()
+    report = update_index([doc("Alpha", "new"), doc("Beta", "b0")], index_dir, batch_size=1)
+    assert report == {"added": 0, "updated": 1, "removed": 0, "unchanged": 1}
+    assert embedded == ["new"]
+    assert stored(index_dir) == {"fund:Alpha:0": "new", "fund:Beta:0": "b0"}
+    assert load_manifest(index_dir)["version"] == 2
+
+
+def test_missing_documents_are_pruned(index_dir):
+    update_index([doc("Alpha", "a0"), doc("Beta", "b0"), doc("Gamma", "g0")], index_dir)
+    report = update_index([doc("Alpha", "a0")], index_dir)
+    assert report["removed"] == 2
+    assert stored(index_dir) == {"fund:Alpha:0": "a0"}
+    assert set(load_manifest(index_dir)["documents"]) == {"fund:Alpha:0"}
+
+
+def test_failed_sources_are_kept(index_dir):
+    update_index([doc("Alpha", "a0"), doc("Beta", "b0"), doc("Beta", "b1", chunk=1), doc("Gamma", "g0")], index_dir)
+    report = update_index([doc("Alpha", "a0")], index_dir, keep=lambda: [id_prefix("fund", "Beta")])
+    assert report["removed"] == 1
+    assert set(stored(index_dir)) == {"fund:Alpha:0", "fund:Beta:0", "fund:Beta:1"}
+
+
+def test_unnamed_failures_and_prune_false_remove_nothing(index_dir):
+    update_index([doc("Alpha", "a0"), doc("Beta", "b0")], index_dir)
+    assert update_index([doc("Alpha", "a0")], index_dir, keep=lambda: None)["removed"] == 0
+    assert update_index([doc("Alpha", "a0")], index_dir, prune=False)["removed"] == 0
+    assert set(stored(index_dir)) == {"fund:Alpha:0", "fund:Beta:0"}
+
+
+def test_repeated_identity_is_keyed_by_content(index_dir):
+    report = update_index([doc("Alpha", "first"), doc("Alpha", "second"), doc("Alpha", "second")], index_dir)
+    assert report["added"] == 2
+    assert sorted(stored(index_dir).values()) == ["first", "second"]
+
+
+def test_no_documents_keeps_the_existing_index(index_dir):
+    update_index([doc("Alpha", "a0")], index_dir)
+    report = update_index([], index_dir, keep=lambda: None)
+    assert report == {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+    assert stored(index_dir) == {"fund:Alpha:0": "a0"}
+
+
+def test_rebuild_embeds_everything_again(index_dir, embedded):
+    update_index([doc("Alpha", "a0")], index_dir)
+    embedded.clear()
+    report = update_index([doc("Alpha", "a0")], index_dir, rebuild=True)
+    assert report["added"] == 1 and embedded == ["a0"]
+    assert load_manifest(index_dir)["version"] == 2
@@ -0,0 +1,104 @@
+# Ingestion: fetcher record/replay and the concurrent source pipeline.
+#
+#   python -m pytest tests/test_ingestion.py -q
+import threading
+
+import pandas as pd
+import pytest
+import yfinance
+from langchain.schema import Document
+
+from app.llm import ingestion
+from app.llm.ingestion import Fetcher, IngestionError, Source, failed_origins, ingestion_report, iter_documents
+
+
+class FakeResponse:
+    def __init__(self, content: bytes, status: int = 200):
+        self.content = content
+        self.status = status
+
+    def raise_for_status(self):
+        if self.status >= 400:
+            raise RuntimeError(f"HTTP {self.status}")
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    monkeypatch.setattr(ingestion.time, "sleep", lambda seconds: None)
+
+
+def test_recorded_responses_replay_offline(tmp_path, monkeypatch):
+    recorder = Fetcher("record", str(tmp_path))
+    monkeypatch.setattr(recorder._session, "get", lambda url, timeout: FakeResponse(f"body of {url}".encode()))
+    monkeypatch.setattr(yfinance, "Ticker", lambda symbol: type("T", (), {"info": {"symbol": symbol, "pe": 21.5}}))
+    history = pd.DataFrame({("AAA", "Close"): [1.0, 2.0]}, index=pd.date_range("2024-01-01", periods=2))
+    monkeypatch.setattr(yfinance, "download", lambda *args, **kwargs: history)
+
+    assert recorder.get_text("https://example.com/a") == "body of https://example.com/a"
+    assert recorder.profile("AAA.NS") == {"symbol": "AAA.NS", "pe": 21.5}
+    recorder.history(["AAA"])
+
+    replayer = Fetcher("replay", str(tmp_path))
+    monkeypatch.setattr(replayer._session, "get", lambda *args, **kwargs: pytest.fail("network used in replay"))
+    assert replayer.get("https://example.com/a") == b"body of https://example.com/a"
+    assert replayer.profile("AAA.NS") == {"symbol": "AAA.NS", "pe": 21.5}
+    pd.testing.assert_frame_equal(replayer.history(["AAA"]), history)
+
+
+def test_replay_without_a_fixture_fails(tmp_path):
+    with pytest.raises(FileNotFoundError, match="https://example.com/missing"):
+        Fetcher("replay", str(tmp_path)).get("https://example.com/missing")
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError, match="Unknown ingestion mode"):
+        Fetcher("offline")
+
+
+def test_transient_failures_are_retried(tmp_path, monkeypatch, no_sleep):
+    fetcher = Fetcher("live", str(tmp_path))
+    responses = iter([FakeResponse(b"", 503), FakeResponse(b"", 502), FakeResponse(b"ok")])
+    monkeypatch.setattr(fetcher._session, "get", lambda url, timeout: next(responses))
+    assert fetcher.get("https://example.com", retries=2) == b"ok"
+
+    monkeypatch.setattr(fetcher._session, "get", lambda url, timeout: FakeResponse(b"", 500))
+    with pytest.raises(RuntimeError, match="HTTP 500"):
+        fetcher.get("https://example.com", retries=1)
+
+
+def docs(*names):
+    return [Document(page_content=name, metadata={"source": name}) for name in names]
+
+
+def test_documents_stream_in_as_tasks_finish():
+    release = threading.Event()
+
+    def slow():
+        release.wait(5)
+        return docs("slow")
+
+    stream = iter_documents([Source("slow", [slow], workers=1), Source("fast", [lambda: docs("a", "b")])])
+    # The fast source is delivered while the slow one is still blocked
+    assert [next(stream).page_content, next(stream).page_content] == ["a", "b"]
+    release.set()
+    assert [doc.page_content for doc in stream] == ["slow"]
+
+
+def test_failures_are_counted_and_scoped():
+    def partial():
+        raise IngestionError("second page failed", ["source:b"], docs("a"))
+
+    articles = Source("articles", [lambda: docs("x"), partial])
+    collected = sorted(doc.page_content for doc in iter_documents([articles]))
+    assert collected == ["a", "x"]
+    assert failed_origins([articles]) == {"source:b"}
+    report = ingestion_report([articles])["articles"]
+    assert report["documents"] == 2 and report["errors"] == 1
+
+    def crash():
+        raise RuntimeError("parser bug")
+
+    pdfs = Source("pdfs", [crash])
+    assert list(iter_documents([pdfs])) == []
+    # An unscoped failure means we cannot tell which documents are gone
+    assert failed_origins([articles, pdfs]) is None
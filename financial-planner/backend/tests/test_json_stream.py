@@ -0,0 +1,86 @@
+# Incremental JSON parsing of streamed recommendations, fed at every split point.
+#
+#   python -m pytest tests/test_json_stream.py -q
+import json
+
+from app.llm.json_stream import JSONStreamParser
+
+DOCUMENT = (
+    'Sure! Here is the portfolio:\n'
+    '{"equity_picks": [{"name": "Axis \\"Bluechip\\"", "weight": 40},'
+    ' {"name": "Path\\\\Fund", "tags": ["a", "b}"]}],\n'
+    ' "note": "Stay {invested}, rebalance [yearly]",'
+    ' "score": 7.5, "active": true, "extra": null,'
+    ' "bond_picks": [], "ra\\u0074io": {"x": [1, 2]}}\n'
+    'Anything after the object is ignored {"note": "no"}'
+)
+
+EXPECTED = [
+    ("item", "equity_picks", {"name": 'Axis "Bluechip"', "weight": 40}),
+    ("item", "equity_picks", {"name": "Path\\Fund", "tags": ["a", "b}"]}),
+    ("field", "note", "Stay {invested}, rebalance [yearly]"),
+    ("field", "score", 7.5),
+    ("field", "active", True),
+    ("field", "extra", None),
+    ("field", "ratio", {"x": [1, 2]}),
+]
+
+
+def parse(chunks, **kwargs):
+    parser = JSONStreamParser(kwargs.pop("item_keys", ("equity_picks", "bond_picks")), **kwargs)
+    events = [event for chunk in chunks for event in parser.feed(chunk)]
+    return parser, events
+
+
+def test_every_single_split_point():
+    for split in range(len(DOCUMENT) + 1):
+        parser, events = parse([DOCUMENT[:split], DOCUMENT[split:]])
+        assert events == EXPECTED, split
+        assert parser.complete and parser.errors == 0, split
+        assert parser.text() == DOCUMENT
+
+
+def test_every_pair_of_split_points_around_escapes():
+    # A backslash or quote at a chunk boundary is where the scanner keeps state
+    for position in [i for i, c in enumerate(DOCUMENT) if c in '\\"']:
+        for first in range(max(0, position - 2), position + 2):
+            for second in range(first, position + 3):
+                chunks = [DOCUMENT[:first], DOCUMENT[first:second], DOCUMENT[second:]]
+                assert parse(chunks)[1] == EXPECTED, (first, second)
+
+
+def test_one_character_at_a_time():
+    parser, events = parse(list(DOCUMENT))
+    assert events == EXPECTED and parser.complete
+
+
+def test_events_arrive_as_soon_as_each_value_closes():
+    first_item_end = DOCUMENT.index('40}') + 3
+    parser = JSONStreamParser(("equity_picks",))
+    assert parser.feed(DOCUMENT[:first_item_end - 1]) == []
+    assert parser.feed(DOCUMENT[first_item_end - 1:first_item_end]) == [EXPECTED[0]]
+
+
+def test_wrapper_members_are_treated_as_top_level():
+    text = json.dumps({"recommendations": {"Equity Picks": [{"name": "A"}], "summary": "ok"}, "model": "m"})
+    _, events = parse(text, item_keys=("equity_picks",), wrappers=("recommendations",),
+                      normalize_key=lambda key: key.lower().replace(" ", "_"))
+    assert events == [("item", "equity_picks", {"name": "A"}), ("field", "summary", "ok"), ("field", "model", "m")]
+
+
+def test_truncated_stream_keeps_what_closed():
+    cut = DOCUMENT.index('"note"') + 12
+    parser, events = parse([DOCUMENT[:cut]])
+    assert events == EXPECTED[:2] and not parser.complete
+
+
+def test_malformed_element_is_skipped():
+    text = '{"equity_picks": [{"name": "A",}, {"name": "B"}], "note": "x"}'
+    parser, events = parse([text[:20], text[20:]])
+    assert events == [("item", "equity_picks", {"name": "B"}), ("field", "note", "x")]
+    assert parser.errors == 1 and parser.complete
+
+
+def test_prose_without_an_object_yields_nothing():
+    parser, events = parse(["I cannot ", "help with that."])
+    assert events == [] and not parser.complete
@@ -0,0 +1,202 @@
+# LLM admission control: priority order, 429/503 rejections, cancellation
+# handoff and promotion of shared generations.
+#
+#   python -m pytest tests/test_llm_scheduler.py -q
+import asyncio
+
+import pytest
+
+from app.llm import single_flight as single_flight_module
+from app.llm.llm_scheduler import LLMQueueFull, LLMQueueTimeout, LLMScheduler, SharedPriority, set_llm_priority
+from app.llm.single_flight import SingleFlight
+
+
+def scheduler(concurrency=1, limit=8, timeout=5.0):
+    return LLMScheduler(concurrency, {p: limit for p in ("interactive", "standard", "batch")},
+                        {p: timeout for p in ("interactive", "standard", "batch")})
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+async def hold(sched, priority, admitted, release, name=None):
+    async with sched.slot(priority):
+        admitted.append(name or priority)
+        await release.wait()
+
+
+def test_freed_slots_go_to_the_most_urgent_then_oldest_waiter():
+    async def run():
+        sched, admitted, release = scheduler(), [], asyncio.Event()
+        holder = asyncio.create_task(hold(sched, "batch", admitted, release, "holder"))
+        await settle()
+        order = [("batch", "b1"), ("standard", "s1"), ("interactive", "i1"), ("batch", "b2"), ("interactive", "i2")]
+        tasks = []
+        for priority, name in order:
+            tasks.append(asyncio.create_task(hold(sched, priority, admitted, release, name)))
+            await settle()
+        assert sched.stats()["queue_depth"] == 5
+        release.set()
+        await asyncio.gather(holder, *tasks)
+        return admitted, sched
+
+    admitted, sched = asyncio.run(run())
+    assert admitted == ["holder", "i1", "i2", "s1", "b1", "b2"]
+    assert sched.active == 0 and sched.stats()["priorities"]["interactive"]["admitted"] == 2
+
+
+def test_full_queue_rejects_with_429():
+    async def run():
+        sched, release = scheduler(limit=1), asyncio.Event()
+        holder = asyncio.create_task(hold(sched, "batch", [], release))
+        queued = asyncio.create_task(hold(sched, "batch", [], release))
+        await settle()
+        with pytest.raises(LLMQueueFull) as rejected:
+            await sched._acquire("batch")
+        # Other priorities have their own queues
+        other = asyncio.create_task(hold(sched, "interactive", [], release))
+        await settle()
+        release.set()
+        await asyncio.gather(holder, queued, other)
+        return rejected.value, sched
+
+    rejected, sched = asyncio.run(run())
+    assert rejected.status_code == 429 and rejected.retry_after == 1
+    assert sched.stats()["priorities"]["batch"]["rejected"] == 1 and sched.active == 0
+
+
+def test_queue_deadline_gives_up_with_503_and_leaves_the_queue():
+    async def run():
+        sched, release = scheduler(timeout=0.05), asyncio.Event()
+        holder = asyncio.create_task(hold(sched, "standard", [], release))
+        await settle()
+        with pytest.raises(LLMQueueTimeout) as timed_out:
+            await sched._acquire("standard")
+        assert sched._waiters == []
+        release.set()
+        await holder
+        return timed_out.value, sched
+
+    timed_out, sched = asyncio.run(run())
+    assert timed_out.status_code == 503 and timed_out.retry_after >= 1
+    stats = sched.stats()["priorities"]["standard"]
+    assert stats["timed_out"] == 1 and stats["queued"] == 0 and sched.active == 0
+
+
+def test_cancelled_waiter_leaves_the_queue():
+    async def run():
+        sched, admitted, release = scheduler(), [], asyncio.Event()
+        holder = asyncio.create_task(hold(sched, "standard", admitted, release, "holder"))
+        await settle()
+        cancelled = asyncio.create_task(hold(sched, "interactive", admitted, release, "cancelled"))
+        waiting = asyncio.create_task(hold(sched, "batch", admitted, release, "waiting"))
+        await settle()
+        cancelled.cancel()
+        await settle()
+        release.set()
+        await asyncio.gather(holder, waiting)
+        return admitted, sched
+
+    admitted, sched = asyncio.run(run())
+    assert admitted == ["holder", "waiting"] and sched.active == 0
+
+
+def test_slot_handed_to_a_cancelled_waiter_is_passed_on():
+    async def run():
+        sched, admitted = scheduler(), []
+        await sched._acquire("standard")
+        first = asyncio.create_task(hold(sched, "interactive", admitted, asyncio.Event(), "first"))
+        second_release = asyncio.Event()
+        second = asyncio.create_task(hold(sched, "batch", admitted, second_release, "second"))
+        await settle()
+        sched._release()   # hands the slot to `first`...
+        first.cancel()     # ...which is cancelled before it gets to run
+        await settle()
+        second_release.set()
+        await second
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return admitted, sched
+
+    admitted, sched = asyncio.run(run())
+    assert admitted == ["second"] and sched.active == 0
+
+
+def test_promoted_request_moves_ahead_and_takes_the_shorter_deadline():
+    async def run():
+        sched = LLMScheduler(1, {"interactive": 8, "standard": 8, "batch": 8},
+                             {"interactive": 0.05, "standard": 5.0, "batch": 5.0})
+        admitted, release = [], asyncio.Event()
+        holder = asyncio.create_task(hold(sched, "standard", admitted, release, "holder"))
+        await settle()
+        standard = asyncio.create_task(hold(sched, "standard", admitted, release, "standard"))
+        shared = SharedPriority("batch")
+
+        async def shared_work():
+            await sched._acquire("batch", shared)
+            admitted.append("shared")
+            sched._release()
+
+        promoted = asyncio.create_task(shared_work())
+        await settle()
+        shared.raise_to("interactive")
+        assert sched.stats()["priorities"]["interactive"]["queued"] == 1
+        shared.raise_to("batch")  # never lowered
+        assert shared.priority == "interactive"
+        release.set()
+        await asyncio.gather(holder, standard, promoted)
+
+        # A promoted request also gives up on the new priority's deadline
+        blocker = asyncio.Event()
+        holder = asyncio.create_task(hold(sched, "standard", [], blocker))
+        await settle()
+        late = SharedPriority("batch")
+        waiting = asyncio.create_task(sched._acquire("batch", late))
+        await settle()
+        late.raise_to("interactive")
+        with pytest.raises(LLMQueueTimeout):
+            await asyncio.wait_for(waiting, 1.0)
+        blocker.set()
+        await holder
+        return admitted, sched
+
+    admitted, sched = asyncio.run(run())
+    assert admitted == ["holder", "shared", "standard"] and sched.active == 0
+
+
+def test_interactive_subscriber_promotes_a_batch_flight(monkeypatch):
+    sched = scheduler()
+
+    async def fake_stream_generate(prompt, model, **options):
+        async with sched.slot():
+            yield f"{prompt} done"
+
+    monkeypatch.setattr(single_flight_module, "stream_generate", fake_stream_generate)
+
+    async def run():
+        flights, admitted, release = SingleFlight(), [], asyncio.Event()
+        holder = asyncio.create_task(hold(sched, "standard", admitted, release, "holder"))
+        await settle()
+        standard = asyncio.create_task(hold(sched, "standard", admitted, release, "standard"))
+        await settle()
+
+        async def subscriber(priority):
+            set_llm_priority(priority)
+            output = await flights.generate("key", "report", "model", {})
+            admitted.append(f"{priority} flight")
+            return output
+
+        batch = asyncio.create_task(subscriber("batch"))
+        await settle()
+        chat = asyncio.create_task(subscriber("interactive"))
+        await settle()
+        release.set()
+        outputs = await asyncio.gather(batch, chat)
+        await standard
+        return outputs, admitted, flights
+
+    outputs, admitted, flights = asyncio.run(run())
+    assert outputs == ["report done", "report done"] and flights.generations == 1
+    assert admitted.index("interactive flight") < admitted.index("standard")
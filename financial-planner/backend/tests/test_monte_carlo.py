@@ -0,0 +1,71 @@
+# Monte Carlo goal simulation: analytic moments, degenerate cases and seeding.
+#
+#   python -m pytest tests/test_monte_carlo.py -q
+import numpy as np
+
+from app.core import monte_carlo
+from app.core.feasibility import project_goals
+from app.core.monte_carlo import simulate_goals
+
+MONTHS = [1, 12, 120, 360]
+SAVINGS = [50000.0, 100000.0, 250000.0, 0.0]
+SIP = [1000.0, 5000.0, 10000.0, 20000.0]
+TARGET = [60000.0, 200000.0, 3e6, 5e7]
+
+
+def expected_wealth(months, savings, sip, annual_return):
+    """E[W_n] = P g^n + SIP (g + ... + g^n), g the mean monthly growth."""
+    g = (1 + annual_return) ** (1 / 12)
+    return [P * g ** n + A * sum(g ** k for k in range(1, n + 1)) for n, P, A in zip(months, savings, sip)]
+
+
+def test_mean_matches_analytic_expectation():
+    result = simulate_goals(MONTHS, SAVINGS, SIP, TARGET, 0.10, 0.15, paths=20000)
+    expected = expected_wealth(MONTHS, SAVINGS, SIP, 0.10)
+    assert np.allclose(result["mean"], expected, rtol=0.02)
+
+
+def test_zero_volatility_is_the_deterministic_projection():
+    # The drift compounds monthly at (1 + r)^(1/12), not r/12, so compare with that rate
+    result = simulate_goals(MONTHS, SAVINGS, SIP, TARGET, 0.10, 0.0, paths=100)
+    expected = expected_wealth(MONTHS, SAVINGS, SIP, 0.10)
+    assert np.allclose(result["percentiles"], np.array(expected)[:, None], rtol=1e-4)
+    assert np.array_equal(result["success_probability"], np.array(expected) >= np.array(TARGET))
+
+
+def test_matches_feasibility_projection_at_zero_volatility():
+    # Same annuity-due convention as feasibility.py, which assumes 10% a year beyond 84 months
+    monthly = 0.10 / 12
+    annual = (1 + monthly) ** 12 - 1
+    simulated = simulate_goals([120], [100000.0], [10000.0], [0.0], annual, 0.0, paths=10)["mean"][0]
+    projected = project_goals([120], [100000.0], [10000.0], [0.0])["projected_value"][0]
+    assert np.isclose(simulated, projected, rtol=1e-4)
+
+
+def test_no_horizon_keeps_current_savings():
+    result = simulate_goals([0, 0], [1000.0, 5.0], [100.0, 100.0], [500.0, 10.0], 0.10, 0.2, paths=50)
+    assert np.allclose(result["percentiles"], [[1000.0] * 5, [5.0] * 5])
+    assert result["success_probability"].tolist() == [1.0, 0.0]
+
+
+def test_seeded_runs_are_reproducible():
+    first = simulate_goals(MONTHS, SAVINGS, SIP, TARGET, 0.08, 0.12, paths=4001, seed=7)
+    second = simulate_goals(MONTHS, SAVINGS, SIP, TARGET, 0.08, 0.12, paths=4001, seed=7)
+    other = simulate_goals(MONTHS, SAVINGS, SIP, TARGET, 0.08, 0.12, paths=4001, seed=8)
+    assert np.array_equal(first["percentiles"], second["percentiles"])
+    assert not np.array_equal(first["percentiles"], other["percentiles"])
+
+
+def test_results_do_not_depend_on_chunking_or_earlier_requests():
+    monte_carlo._shock_cache.clear()
+    short_first = simulate_goals([24], [1e5], [1e3], [2e5], 0.08, 0.12, paths=3000, seed=3)
+    simulate_goals([480], [1e5], [1e3], [2e5], 0.08, 0.12, paths=3000, seed=3)  # grows the cached draws
+    after_long = simulate_goals([24], [1e5], [1e3], [2e5], 0.08, 0.12, paths=3000, seed=3, chunk_paths=500)
+    assert np.allclose(short_first["percentiles"], after_long["percentiles"])
+    assert short_first["success_probability"][0] == after_long["success_probability"][0]
+
+
+def test_success_probability_falls_as_the_target_rises():
+    targets = [1e6, 2e6, 4e6, 8e6]
+    result = simulate_goals([120] * 4, [1e5] * 4, [1e4] * 4, targets, 0.10, 0.15, paths=5000)
+    assert np.all(np.diff(result["success_probability"]) <= 0)
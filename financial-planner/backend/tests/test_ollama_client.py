@@ -0,0 +1,62 @@
+# Pooled Ollama client: per-loop client reuse and streamed response parsing.
+#
+#   python -m pytest tests/test_ollama_client.py -q
+import asyncio
+import json
+
+import httpx
+import pytest
+
+from app.llm import ollama_client
+from app.llm.ollama_client import generate, get_client, stream_generate
+
+
+def ndjson(*records):
+    return "\n".join(record if isinstance(record, str) else json.dumps(record) for record in records)
+
+
+def mock_ollama(handler):
+    """Install a client for the running loop that answers with `handler`."""
+    client = httpx.AsyncClient(base_url="http://ollama.test", transport=httpx.MockTransport(handler))
+    ollama_client._clients[asyncio.get_running_loop()] = client
+    return client
+
+
+def test_one_client_per_event_loop():
+    async def clients():
+        first, second = get_client(), get_client()
+        assert first is second
+        await ollama_client.close_clients()
+        reopened = get_client()
+        assert reopened is not first and first.is_closed
+        return reopened
+
+    assert asyncio.run(clients()) is not asyncio.run(clients())
+
+
+def test_tokens_stream_until_done():
+    requests = []
+
+    def handler(request):
+        requests.append(json.loads(request.content))
+        body = ndjson({"response": "Hel"}, "", "not json", {"response": ""}, {"response": "lo "},
+                      {"response": "", "done": True}, {"response": "ignored"})
+        return httpx.Response(200, text=body)
+
+    async def run():
+        mock_ollama(handler)
+        tokens = [token async for token in stream_generate("hi", model="m", options={"temperature": 0})]
+        return tokens, await generate("hi", model="m")
+
+    tokens, text = asyncio.run(run())
+    assert tokens == ["Hel", "lo "] and text == "Hello"
+    assert requests[0] == {"model": "m", "prompt": "hi", "stream": True, "options": {"temperature": 0}}
+
+
+def test_http_errors_are_raised():
+    async def run():
+        mock_ollama(lambda request: httpx.Response(500, text="model not loaded"))
+        return await generate("hi")
+
+    with pytest.raises(httpx.HTTPStatusError):
+        asyncio.run(run())
@@ -0,0 +1,80 @@
+# Per-partition sub-indexes against brute-force search within the partition.
+#
+#   python -m pytest tests/test_partitioned_index.py -q
+import numpy as np
+import pytest
+from langchain.schema import Document
+from langchain_community.embeddings import DeterministicFakeEmbedding
+from langchain_community.vectorstores import FAISS
+
+from app.llm import resource_registry
+from app.llm.incremental_index import update_index
+from app.llm.partitioned_index import PartitionedIndex, _synthetic_store, get_partitioned_index
+from app.llm.retrieval_cache import cached_similarity_search, retrieval_cache
+
+
+def exact_top_k(store, vector, k, key, field="fund", normalize=False):
+    """Chunk numbers of the k nearest members of one partition by brute force."""
+    vectors = store.index.reconstruct_n(0, store.index.ntotal)
+    query = np.asarray(vector, dtype=np.float32)
+    if normalize:
+        query = query / np.linalg.norm(query)
+    docs = [store.docstore.search(store.index_to_docstore_id[i]) for i in range(store.index.ntotal)]
+    members = [i for i, doc in enumerate(docs) if doc.metadata[field] == key]
+    distances = ((vectors[members] - query) ** 2).sum(axis=1)
+    return [docs[members[i]].metadata["chunk"] for i in np.argsort(distances, kind="stable")[:k]]
+
+
+@pytest.fixture(scope="module")
+def store():
+    return _synthetic_store(n_partitions=20, chunks_per_partition=15, dim=16)
+
+
+def test_results_match_brute_force_within_the_partition(store):
+    partitioned = PartitionedIndex(store, "fund")
+    rng = np.random.default_rng(3)
+    for i in range(25):
+        key, vector = f"fund-{i % 20}", rng.standard_normal(16).tolist()
+        hits = partitioned.search(vector, 4, key)
+        assert all(doc.metadata["fund"] == key for doc in hits)
+        assert [doc.metadata["chunk"] for doc in hits] == exact_top_k(store, vector, 4, key)
+
+
+def test_always_returns_min_k_and_partition_size(store):
+    partitioned = PartitionedIndex(store, "fund")
+    assert partitioned.sizes() == {f"fund-{i}": 15 for i in range(20)}
+    assert len(partitioned.search([0.0] * 16, 50, "fund-3")) == 15
+    assert partitioned.search([0.0] * 16, 4, "fund-missing") == []
+
+
+def test_normalized_stores_normalize_the_query():
+    rng = np.random.default_rng(5)
+    vectors = rng.standard_normal((30, 8)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    store = FAISS.from_embeddings([(f"t{i}", v.tolist()) for i, v in enumerate(vectors)],
+                                  DeterministicFakeEmbedding(size=8), normalize_L2=True,
+                                  metadatas=[{"fund": f"f{i % 3}", "chunk": i} for i in range(30)])
+    vector = (5 * rng.standard_normal(8)).tolist()
+    hits = PartitionedIndex(store, "fund").search(vector, 3, "f1")
+    assert [doc.metadata["chunk"] for doc in hits] == exact_top_k(store, vector, 3, "f1", normalize=True)
+
+
+def test_scoped_queries_use_partitions_of_the_current_version(tmp_path, fake_embeddings):
+    index_dir = str(tmp_path / "funds")
+    documents = [Document(page_content=f"{fund} note {i}", metadata={"fund": fund, "chunk": i})
+                 for fund in ("Alpha", "Beta") for i in range(6)]
+    update_index(documents, index_dir)
+    try:
+        store = resource_registry.get_vector_store(index_dir)
+        partitions = get_partitioned_index(index_dir, store, "fund")
+        hits = cached_similarity_search(index_dir, "note", k=10, filter={"fund": "Beta"}, partition_by="fund")
+        assert len(hits) == 6 and {doc.metadata["fund"] for doc in hits} == {"Beta"}
+        assert get_partitioned_index(index_dir, store, "fund") is partitions
+
+        update_index(documents[:9], index_dir)  # drops three Beta notes
+        store = resource_registry.get_vector_store(index_dir)
+        rebuilt = get_partitioned_index(index_dir, store, "fund")
+        assert rebuilt is not partitions and rebuilt.sizes() == {"Alpha": 6, "Beta": 3}
+    finally:
+        resource_registry.invalidate(resource_registry._vector_store_key(index_dir))
+        retrieval_cache.clear()
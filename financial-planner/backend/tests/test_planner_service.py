@@ -0,0 +1,63 @@
+# Planner stage selection: dependency resolution and skipping unused stages.
+#
+#   python -m pytest tests/test_planner_service.py -q
+import asyncio
+
+import pytest
+
+from app.core import planner_service
+from app.core.planner_service import STAGES, PlannerService, resolve_stages
+from app.models.goal import Goal
+from app.models.user import User
+
+
+def make_user():
+    return User(name="Asha", age=35, income=150000, expenses=60000, dependents=1, emergency_fund=400000,
+                insurances=["health"], loans=[], risk_profile="balanced",
+                goals=[Goal(name="House", target_amount=3e6, months_to_achieve=84, current_savings=5e5,
+                            sip=20000, priority="high")])
+
+
+def test_default_is_every_stage_in_pipeline_order():
+    assert resolve_stages(None) == list(STAGES)
+
+
+def test_dependencies_are_added_and_ordered():
+    assert resolve_stages(["explanation"]) == ["allocation", "explanation"]
+    assert resolve_stages(("monte_carlo", "cash_flow")) == ["cash_flow", "goal_analysis", "allocation", "monte_carlo"]
+    assert resolve_stages(["allocation", "allocation"]) == ["allocation"]
+    assert resolve_stages([]) == []
+
+
+def test_unknown_stage_is_rejected():
+    with pytest.raises(ValueError, match="Unknown planner stage: explain"):
+        resolve_stages(["allocation", "explain"])
+
+
+def test_monte_carlo_is_dropped_when_disabled(monkeypatch):
+    monkeypatch.setattr(planner_service, "MONTE_CARLO_ENABLED", False)
+    assert resolve_stages(["monte_carlo"]) == ["goal_analysis", "allocation"]
+
+
+def test_allocation_only_never_calls_the_llm(monkeypatch):
+    async def explain(self, user, allocation):
+        raise AssertionError("explanation generated for an allocation-only request")
+
+    monkeypatch.setattr(PlannerService, "_explain_allocation_with_llm", explain)
+    summary = asyncio.run(PlannerService().analyze_user(make_user(), stages=("allocation",)))
+    assert set(summary) == {"recommended_allocation"}
+    assert sum(summary["recommended_allocation"].values()) == 100
+
+
+def test_full_analysis_explains_once(monkeypatch):
+    calls = []
+
+    async def explain(self, user, allocation):
+        calls.append(allocation)
+        return "because"
+
+    monkeypatch.setattr(PlannerService, "_explain_allocation_with_llm", explain)
+    summary = asyncio.run(PlannerService().analyze_user(make_user()))
+    assert calls == [summary["recommended_allocation"]]
+    assert summary["allocation_explanation"] == "because"
+    assert {"monthly_surplus", "emergency_fund_ok", "goal_analysis"} <= set(summary)
@@ -0,0 +1,123 @@
+# LLM response cache: TTL, LRU eviction, invalidation across workers, pruning
+# and the `cacheable` veto.
+#
+#   python -m pytest tests/test_response_cache.py -q
+import asyncio
+import time
+
+import pytest
+
+from app.llm import response_cache as cache_module
+from app.llm.response_cache import ResponseCache, cached_generate, make_cache_key
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "responses.sqlite3")
+
+
+def rows(cache):
+    return cache._db().execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+
+def test_cache_key_is_canonical():
+    assert make_cache_key("m", {"a": 1, "b": [1, 2]}) == make_cache_key("m", {"b": [1, 2], "a": 1})
+    assert make_cache_key("m", {"a": 1}) != make_cache_key("other", {"a": 1})
+    assert make_cache_key("m", {"a": 1}, {"format": "json"}) != make_cache_key("m", {"a": 1})
+
+
+def test_hit_survives_restart(path):
+    ResponseCache(path).put("k", "v")
+    restarted = ResponseCache(path)
+    assert restarted.get("k") == "v"
+    assert restarted.get("missing") is None
+    assert (restarted.hits, restarted.misses) == (1, 1)
+
+
+def test_entries_expire_after_ttl(path):
+    cache = ResponseCache(path, ttl_seconds=0.05)
+    cache.put("k", "v")
+    assert cache.get("k") == "v"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+
+
+def test_memory_lru_evicts_least_recently_used(path):
+    cache = ResponseCache(path, max_entries=2)
+    cache.put("a", "1")
+    cache.put("b", "2")
+    cache.get("a")
+    cache.put("c", "3")
+    assert list(cache._memory) == ["a", "c"] and cache.evictions == 1
+    assert cache.get("b") == "2" and cache.memory_hits == 1  # still on disk
+
+
+def test_tag_invalidation_reaches_other_workers(path, monkeypatch):
+    monkeypatch.setattr(cache_module, "_TAG_REFRESH_SECONDS", 0.0)
+    worker, rebuild = ResponseCache(path), ResponseCache(path)
+    worker.put("market", "m", tag="market_index")
+    worker.put("fund", "f", tag="fund_index")
+    assert worker.get("market") == "m"  # now in the worker's LRU
+
+    rebuild.invalidate("market_index")
+    assert worker.get("market") is None
+    assert worker.get("fund") == "f"
+    worker.put("market", "m2", tag="market_index")
+    assert worker.get("market") == "m2"
+
+
+def test_untagged_invalidation_reaches_other_workers(path, monkeypatch):
+    monkeypatch.setattr(cache_module, "_TAG_REFRESH_SECONDS", 0.0)
+    worker, admin = ResponseCache(path), ResponseCache(path)
+    worker.put("plain", "p")
+    worker.put("tagged", "t", tag="fund_index")
+    assert worker.get("plain") == "p"
+
+    admin.invalidate()
+    assert worker.get("plain") is None and worker.get("tagged") is None
+    worker.put("plain", "p2")
+    assert worker.get("plain") == "p2"
+
+
+def test_writes_prune_expired_rows_and_cap_rows(path, monkeypatch):
+    monkeypatch.setattr(cache_module, "_PRUNE_INTERVAL_SECONDS", 0.0)
+    cache = ResponseCache(path, ttl_seconds=0.05, max_rows=3)
+    cache.put("old", "x")
+    time.sleep(0.1)
+    cache.put("new", "y")
+    assert rows(cache) == 1 and cache.pruned == 1
+
+    cache.ttl_seconds = 3600
+    for i in range(5):
+        cache.put(f"k{i}", str(i))
+    keys = {key for (key,) in cache._db().execute("SELECT key FROM responses")}
+    assert keys == {"k2", "k3", "k4"}
+
+
+def test_pruning_is_periodic(path):
+    cache = ResponseCache(path, ttl_seconds=3600, max_rows=1)
+    cache.put("a", "1")  # first write prunes
+    cache.put("b", "2")
+    assert rows(cache) == 2
+
+
+def test_cacheable_veto(path, monkeypatch):
+    outputs = iter(["partial {", '{"ok": true}'])
+    calls = []
+
+    async def fake_generate(prompt, model, **options):
+        calls.append(prompt)
+        return next(outputs)
+
+    monkeypatch.setattr(cache_module, "response_cache", ResponseCache(path))
+    monkeypatch.setattr(cache_module, "LLM_SINGLE_FLIGHT_ENABLED", False)
+    monkeypatch.setattr(cache_module, "generate", fake_generate)
+
+    def complete(output):
+        return output.endswith("}")
+
+    async def run():
+        return [await cached_generate("p", {"q": 1}, cacheable=complete) for _ in range(3)]
+
+    assert asyncio.run(run()) == ["partial {", '{"ok": true}', '{"ok": true}']
+    assert len(calls) == 2  # the vetoed output was not stored; the good one was
@@ -0,0 +1,76 @@
+# Retrieval caching keyed on the on-disk index version.
+#
+#   python -m pytest tests/test_retrieval_cache.py -q
+import pytest
+from langchain.schema import Document
+
+from app.llm import resource_registry
+from app.llm.incremental_index import load_manifest, save_manifest, update_index
+from app.llm.resource_registry import get_vector_store, index_version
+from app.llm.retrieval_cache import cached_similarity_search, retrieval_cache
+
+
+def fund_docs(text):
+    return [Document(page_content=f"{fund} {text}", metadata={"fund": fund, "chunk": 0})
+            for fund in ("Alpha", "Beta")]
+
+
+def rebuild_in_other_process(index_dir, documents):
+    """What a rebuild by the CLI looks like to the server: new files, nothing in this registry."""
+    from langchain_community.vectorstores import FAISS
+
+    from app.llm.incremental_index import document_fingerprint, document_id
+
+    FAISS.from_documents(documents, resource_registry.get_embeddings()).save_local(index_dir)
+    manifest = load_manifest(index_dir)
+    ids = [document_id(doc) for doc in documents]
+    save_manifest(index_dir, {"version": manifest["version"] + 1, "embedding_model": manifest["embedding_model"],
+                              "documents": {i: document_fingerprint(i, doc) for i, doc in zip(ids, documents)}})
+
+
+@pytest.fixture
+def index_dir(tmp_path, fake_embeddings):
+    directory = str(tmp_path / "index")
+    update_index(fund_docs("old commentary"), directory)
+    yield directory
+    resource_registry.invalidate(resource_registry._vector_store_key(directory))
+    retrieval_cache.clear()
+
+
+def search(index_dir):
+    return [doc.page_content for doc in cached_similarity_search(index_dir, "commentary", k=2)]
+
+
+def test_index_version_follows_the_manifest(index_dir):
+    assert index_version(index_dir) == 1
+    manifest = load_manifest(index_dir)
+    save_manifest(index_dir, dict(manifest, version=7))
+    assert index_version(index_dir) == 7
+    assert index_version(index_dir + "-missing") == 0
+
+
+def test_results_are_cached_per_version(index_dir):
+    first = search(index_dir)
+    hits = retrieval_cache.hits
+    assert search(index_dir) == first
+    assert retrieval_cache.hits == hits + 1
+
+
+def test_rebuild_in_another_process_reloads_store_and_results(index_dir):
+    assert sorted(search(index_dir)) == ["Alpha old commentary", "Beta old commentary"]
+    before = get_vector_store(index_dir)
+
+    rebuild_in_other_process(index_dir, fund_docs("new commentary"))
+
+    assert sorted(search(index_dir)) == ["Alpha new commentary", "Beta new commentary"]
+    after = get_vector_store(index_dir)
+    assert after is not before and after.version == 2
+
+
+def test_results_are_keyed_on_the_version_of_the_store_searched(index_dir):
+    # A store loaded before a swap caches under its own version, not the newer one on disk
+    stale = get_vector_store(index_dir)
+    rebuild_in_other_process(index_dir, fund_docs("new commentary"))
+    stale_results = cached_similarity_search(index_dir, "commentary", k=2, load_store=lambda _: stale)
+    assert all("old" in doc.page_content for doc in stale_results)
+    assert all("new" in text for text in search(index_dir))
@@ -0,0 +1,56 @@
+# Micro-batched headline scoring (model stubbed out) and its ingestion wrapper.
+#
+#   python -m pytest tests/test_sentiment_engine.py -q
+import pytest
+
+from app.llm import headline_sentiment
+from app.llm.ingestion import IngestionError
+from app.llm.sentiment_engine import SentimentEngine
+
+
+class StubEngine(SentimentEngine):
+    """SentimentEngine without FinBERT: labels a headline by its length."""
+
+    def __init__(self, batch_size, fail_on=None):
+        self.batch_size = batch_size
+        self.failed_batches = 0
+        self.batches = []
+        self.fail_on = fail_on
+
+    def _score_batch(self, texts):
+        self.batches.append(texts)
+        if self.fail_on in texts:
+            raise RuntimeError("out of memory")
+        return [{"label": f"len{len(text)}", "score": 0.9} for text in texts]
+
+
+HEADLINES = ["a" * n for n in (9, 1, 7, 3, 8, 2, 6)]
+
+
+def test_results_come_back_in_input_order():
+    results = StubEngine(batch_size=3).score(HEADLINES)
+    assert [result["label"] for result in results] == [f"len{len(h)}" for h in HEADLINES]
+
+
+def test_batches_group_similar_lengths():
+    engine = StubEngine(batch_size=3)
+    engine.score(HEADLINES)
+    assert [[len(text) for text in batch] for batch in engine.batches] == [[1, 2, 3], [6, 7, 8], [9]]
+
+
+def test_failed_batch_only_loses_its_own_headlines():
+    engine = StubEngine(batch_size=3, fail_on="a" * 7)
+    results = engine.score(HEADLINES)
+    lost = [len(h) for h, result in zip(HEADLINES, results) if result is None]
+    assert sorted(lost) == [6, 7, 8] and engine.failed_batches == 1
+
+
+def test_partially_scored_headlines_keep_their_indexed_documents(monkeypatch):
+    engine = StubEngine(batch_size=2, fail_on="Gold slips")
+    monkeypatch.setattr(headline_sentiment, "get_sentiment_engine", lambda: engine)
+    monkeypatch.setattr(headline_sentiment, "fetch_yahoo_finance_headlines",
+                        lambda fetcher=None: ["Gold slips", "Nifty rallies", "Fed holds rates"])
+    with pytest.raises(IngestionError) as failure:
+        headline_sentiment.get_sentiment_documents()
+    assert failure.value.origins == ["source:Yahoo Finance"]
+    assert [doc.page_content for doc in failure.value.documents] == ["Fed holds rates"]
@@ -0,0 +1,152 @@
+# Single-flight coalescing: shared generations, late joins and cancellation.
+#
+#   python -m pytest tests/test_single_flight.py -q
+import asyncio
+
+import pytest
+
+from app.llm import single_flight as single_flight_module
+from app.llm.single_flight import SingleFlight
+
+
+class FakeModel:
+    """stream_generate stand-in that emits a token each time `step` is set."""
+
+    def __init__(self, tokens=("a", "b", "c"), fail=False):
+        self.tokens = tokens
+        self.fail = fail
+        self.step = asyncio.Event()
+        self.started = 0
+        self.cancelled = 0
+
+    async def stream_generate(self, prompt, model, **options):
+        self.started += 1
+        try:
+            for token in self.tokens:
+                await self.step.wait()
+                self.step.clear()
+                yield token
+            if self.fail:
+                raise RuntimeError("model crashed")
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+
+    async def emit(self, count=1):
+        for _ in range(count):
+            self.step.set()
+            await settle()
+
+
+async def settle():
+    for _ in range(5):
+        await asyncio.sleep(0)
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    def install(**kwargs):
+        model = FakeModel(**kwargs)
+        monkeypatch.setattr(single_flight_module, "stream_generate", model.stream_generate)
+        return model
+    return install
+
+
+async def collect(flights, key="key", on_complete=None):
+    return [chunk async for chunk in flights.stream(key, "prompt", "model", {}, on_complete)]
+
+
+def test_concurrent_callers_share_one_generation(fake):
+    async def run():
+        model, flights, stored = fake(), SingleFlight(), []
+
+        async def store(output):
+            stored.append(output)
+
+        first = asyncio.create_task(collect(flights, on_complete=store))
+        await settle()
+        second = asyncio.create_task(flights.generate("key", "prompt", "model", {}, store))
+        other = asyncio.create_task(collect(flights, key="other"))
+        await settle()
+        await model.emit(6)
+        return await asyncio.gather(first, second, other), model, flights, stored
+
+    (first, second, other), model, flights, stored = asyncio.run(run())
+    assert first == ["a", "b", "c"] and second == "abc" and other == ["a", "b", "c"]
+    assert model.started == 2 and stored == ["abc"]
+    stats = flights.stats()
+    assert stats["generations"] == 2 and stats["generations_saved"] == 1 and stats["in_flight"] == 0
+
+
+def test_late_joiner_replays_missed_tokens_then_follows(fake):
+    async def run():
+        model, flights = fake(), SingleFlight()
+        first = asyncio.create_task(collect(flights))
+        await settle()
+        await model.emit(2)
+        late = asyncio.create_task(collect(flights))
+        await settle()
+        await model.emit()
+        return await asyncio.gather(first, late), model, flights
+
+    (first, late), model, flights = asyncio.run(run())
+    assert first == late == ["a", "b", "c"]
+    assert model.started == 1 and flights.late_joins == 1 and flights.max_subscribers == 2
+
+
+def test_generation_survives_one_subscriber_leaving(fake):
+    async def run():
+        model, flights = fake(), SingleFlight()
+        leaving = asyncio.create_task(collect(flights))
+        staying = asyncio.create_task(collect(flights))
+        await settle()
+        await model.emit()
+        leaving.cancel()
+        await settle()
+        await model.emit(2)
+        return await staying, model, flights
+
+    staying, model, flights = asyncio.run(run())
+    assert staying == ["a", "b", "c"] and model.cancelled == 0 and flights.cancelled == 0
+
+
+def test_last_subscriber_leaving_cancels_the_generation(fake):
+    async def run():
+        model, flights, stored = fake(), SingleFlight(), []
+
+        async def store(output):
+            stored.append(output)
+
+        subscribers = [asyncio.create_task(collect(flights, on_complete=store)) for _ in range(2)]
+        await settle()
+        await model.emit()
+        for task in subscribers:
+            task.cancel()
+        await settle()
+        # The key is free again: the next caller starts a fresh generation
+        again = asyncio.create_task(collect(flights))
+        await settle()
+        await model.emit(3)
+        return await again, model, flights, stored
+
+    again, model, flights, stored = asyncio.run(run())
+    assert again == ["a", "b", "c"]
+    assert model.cancelled == 1 and model.started == 2 and flights.cancelled == 1 and stored == []
+
+
+def test_errors_reach_every_subscriber_and_nothing_is_stored(fake):
+    async def run():
+        model, flights, stored = fake(tokens=("a",), fail=True), SingleFlight(), []
+
+        async def store(output):
+            stored.append(output)
+
+        subscribers = [asyncio.create_task(collect(flights, on_complete=store)) for _ in range(2)]
+        await settle()
+        await model.emit()
+        results = await asyncio.gather(*subscribers, return_exceptions=True)
+        return results, flights, stored
+
+    results, flights, stored = asyncio.run(run())
+    assert all(isinstance(r, RuntimeError) for r in results)
+    assert stored == [] and flights.stats()["in_flight"] == 0
@@ -0,0 +1,30 @@
+# Profile chunking for the market RAG index.
+#
+#   python -m pytest tests/test_stock_features.py -q
+from app.llm.stock_features import chunk_text
+
+
+def test_sentences_are_packed_up_to_the_limit():
+    text = "First sentence here. Second one! Third? " * 20
+    chunks = chunk_text(text, max_chars=100)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert all(chunk.endswith((".", "!", "?")) for chunk in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+def test_long_sentence_is_wrapped_on_whitespace():
+    sentence = " ".join(f"word{i}" for i in range(200)) + "."
+    chunks = chunk_text(f"Short intro. {sentence} Short outro.", max_chars=120)
+    assert all(len(chunk) <= 120 for chunk in chunks)
+    # No word is split, and nothing is lost
+    assert " ".join(chunks).split() == f"Short intro. {sentence} Short outro.".split()
+
+
+def test_unbroken_text_is_split_at_the_limit():
+    chunks = chunk_text("x" * 250, max_chars=100)
+    assert [len(chunk) for chunk in chunks] == [100, 100, 50]
+
+
+def test_empty_text_has_no_chunks():
+    assert chunk_text("   ") == []
@@ -0,0 +1,70 @@
+# NDJSON streaming endpoints for the allocation explanation and chat.
+#
+#   python -m pytest tests/test_streaming_endpoints.py -q
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app import main
+from app.llm.llm_scheduler import LLMQueueFull, llm_priority
+from tests.test_planner_service import make_user
+
+
+@pytest.fixture
+def client():
+    return TestClient(main.app)
+
+
+def events(response):
+    assert response.headers["content-type"].startswith(main.NDJSON_MEDIA_TYPE)
+    return [json.loads(line) for line in response.iter_lines() if line]
+
+
+def tokens(*chunks, error=None):
+    async def stream(*args, **kwargs):
+        for chunk in chunks:
+            yield chunk
+        if error is not None:
+            raise error
+    return stream
+
+
+def test_analysis_summary_arrives_before_the_explanation(client, monkeypatch):
+    monkeypatch.setattr(main.planner, "stream_allocation_explanation", tokens("Because ", "diversify."))
+    with client.stream("POST", "/analyze/stream", json=make_user().model_dump()) as response:
+        received = events(response)
+    assert [e["event"] for e in received] == ["summary", "token", "token", "done"]
+    assert "recommended_allocation" in received[0]["data"]
+    assert "".join(e["data"] for e in received if e["event"] == "token") == "Because diversify."
+
+
+def test_explanation_failure_is_reported_in_band(client, monkeypatch):
+    monkeypatch.setattr(main.planner, "stream_allocation_explanation", tokens("Part", error=RuntimeError("boom")))
+    with client.stream("POST", "/analyze/stream", json=make_user().model_dump()) as response:
+        received = events(response)
+    assert response.status_code == 200
+    assert [e["event"] for e in received] == ["summary", "token", "error", "done"]
+    assert received[2]["data"] == main.EXPLANATION_UNAVAILABLE
+
+
+def test_chat_streams_tokens_at_interactive_priority(client, monkeypatch):
+    priorities = []
+
+    async def stream_chatbot(message, profile, fund_query):
+        priorities.append(llm_priority.get())
+        yield f"echo: {message}"
+
+    monkeypatch.setattr(main, "stream_chatbot", stream_chatbot)
+    body = {"message": "hi", "user_profile": {}}
+    with client.stream("POST", "/chat/stream", json=body) as response:
+        received = events(response)
+    assert received == [{"event": "token", "data": "echo: hi"}, {"event": "done", "data": None}]
+    assert priorities == ["interactive"]
+
+
+def test_chat_overload_is_reported_in_band(client, monkeypatch):
+    monkeypatch.setattr(main, "stream_chatbot", tokens(error=LLMQueueFull("LLM queue is full")))
+    with client.stream("POST", "/chat/stream", json={"message": "hi", "user_profile": {}}) as response:
+        received = events(response)
+    assert received == [{"event": "error", "data": "LLM queue is full"}, {"event": "done", "data": None}]